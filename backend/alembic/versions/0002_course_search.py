@@ -0,0 +1,52 @@
+"""Course full-text search
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2024-02-01 00:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Триграммы для автодополнения и ILIKE '%...%' по индексу
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    # Поисковый вектор курса: название (вес A) и описание (вес B),
+    # русская и английская морфология
+    op.execute("""
+        ALTER TABLE courses ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('russian'::regconfig, coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english'::regconfig, coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('russian'::regconfig, coalesce(description, '')), 'B') ||
+            setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'B')
+        ) STORED
+    """)
+    op.create_index(
+        'ix_courses_search_vector', 'courses', ['search_vector'],
+        postgresql_using='gin'
+    )
+    op.create_index(
+        'ix_courses_title_trgm', 'courses', ['title'],
+        postgresql_using='gin',
+        postgresql_ops={'title': 'gin_trgm_ops'}
+    )
+    op.create_index(
+        'ix_courses_description_trgm', 'courses', ['description'],
+        postgresql_using='gin',
+        postgresql_ops={'description': 'gin_trgm_ops'}
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_courses_description_trgm', table_name='courses')
+    op.drop_index('ix_courses_title_trgm', table_name='courses')
+    op.drop_index('ix_courses_search_vector', table_name='courses')
+    op.drop_column('courses', 'search_vector')
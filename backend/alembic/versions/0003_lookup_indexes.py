@@ -0,0 +1,146 @@
+"""Composite indexes for hot lookups and created_at DESC listings
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2024-02-15 00:00:00.000000
+
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+# (имя, таблица, колонки, unique) - совпадают с __table_args__ моделей.
+# ORDER BY created_at DESC, id DESC обслуживается обратным обходом индекса.
+INDEXES = [
+    # Точечные выборки по паре колонок
+    ('uq_course_progress_user_course', 'course_progress', ['user_id', 'course_id'], True),
+    ('uq_lesson_progress_user_lesson', 'lesson_progress', ['user_id', 'lesson_id'], True),
+    ('ix_user_course_access_user_course_status', 'user_course_access', ['user_id', 'course_id', 'status'], False),
+    ('ix_test_attempts_student_test_created', 'test_attempts', ['student_id', 'test_id', 'created_at'], False),
+    ('ix_assignment_submissions_student_assignment', 'assignment_submissions', ['student_id', 'assignment_id'], False),
+    ('uq_payments_external_payment_id', 'payments', ['external_payment_id'], True),
+    # Списки с сортировкой по дате (в том числе keyset пагинация)
+    ('ix_activity_logs_user_created', 'activity_logs', ['user_id', 'created_at', 'id'], False),
+    ('ix_activity_logs_course_created', 'activity_logs', ['course_id', 'created_at', 'id'], False),
+    ('ix_activity_logs_type_created', 'activity_logs', ['activity_type', 'created_at', 'id'], False),
+    ('ix_notifications_user_created', 'notifications', ['user_id', 'created_at', 'id'], False),
+    ('ix_payments_user_created', 'payments', ['user_id', 'created_at', 'id'], False),
+    ('ix_payments_course_created', 'payments', ['course_id', 'created_at', 'id'], False),
+    ('ix_payments_status_created', 'payments', ['status', 'created_at', 'id'], False),
+    ('ix_test_attempts_student_created', 'test_attempts', ['student_id', 'created_at', 'id'], False),
+    ('ix_assignment_submissions_student_created', 'assignment_submissions', ['student_id', 'created_at', 'id'], False),
+]
+
+
+# Таблицы, дубли в которых перед созданием уникального индекса сливаются:
+# остается самая свежая строка, ссылки (таблица, колонка) переводятся на нее.
+# Дубли остальных таблиц (платежи) не удаляются автоматически - миграция
+# останавливается с ошибкой.
+MERGE_DUPLICATES = {
+    'course_progress': [('lesson_progress', 'course_progress_id')],
+    'lesson_progress': [],
+}
+
+
+def _is_covered(inspector, table, name, columns, unique) -> bool:
+    """Индекс уже есть (по имени или с теми же колонками и уникальностью)"""
+    for index in inspector.get_indexes(table):
+        if index['name'] == name:
+            return True
+        if index['column_names'] == columns and (index['unique'] or not unique):
+            return True
+    return any(
+        constraint['column_names'] == columns
+        for constraint in inspector.get_unique_constraints(table)
+    )
+
+
+def _check_duplicates(bind, table, columns) -> None:
+    """Уникальный индекс не создать при дублях - сообщаем понятной ошибкой"""
+    cols = ', '.join(columns)
+    not_null = ' AND '.join(f'{column} IS NOT NULL' for column in columns)
+    duplicate = bind.execute(sa.text(
+        f'SELECT {cols} FROM {table} WHERE {not_null} GROUP BY {cols} HAVING count(*) > 1 LIMIT 1'
+    )).first()
+    if duplicate is not None:
+        raise RuntimeError(
+            f'Cannot create unique index on {table}({cols}): duplicate rows for {tuple(duplicate)}'
+        )
+
+
+def _merge_duplicates(bind, inspector, table, columns) -> None:
+    """Слить дубли: оставить самую свежую строку группы и перевести на нее ссылки"""
+    cols = ', '.join(columns)
+    not_null = ' AND '.join(f'{column} IS NOT NULL' for column in columns)
+    duplicates = bind.execute(sa.text(
+        f'SELECT id, keep_id FROM ('
+        f' SELECT id, first_value(id) OVER ('
+        f'  PARTITION BY {cols}'
+        f'  ORDER BY CASE WHEN updated_at IS NULL THEN 1 ELSE 0 END, updated_at DESC, id DESC'
+        f' ) AS keep_id'
+        f' FROM {table} WHERE {not_null}'
+        f') ranked WHERE id <> keep_id'
+    )).all()
+    if not duplicates:
+        return
+
+    params = [{'id': id, 'keep_id': keep_id} for id, keep_id in duplicates]
+    tables = set(inspector.get_table_names())
+    for ref_table, ref_column in MERGE_DUPLICATES[table]:
+        if ref_table in tables and ref_column in {column['name'] for column in inspector.get_columns(ref_table)}:
+            bind.execute(sa.text(f'UPDATE {ref_table} SET {ref_column} = :keep_id WHERE {ref_column} = :id'), params)
+    bind.execute(sa.text(f'DELETE FROM {table} WHERE id = :id'), params)
+    logger.info(f'Merged {len(params)} duplicate rows in {table}({cols})')
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = set(inspector.get_table_names())
+    is_postgres = bind.dialect.name == 'postgresql'
+
+    pending = []
+    for name, table, columns, unique in INDEXES:
+        # Схема 0001 расходится с моделями (create_all) - пропускаем отсутствующие колонки
+        if table not in tables:
+            continue
+        existing_columns = {column['name'] for column in inspector.get_columns(table)}
+        if not set(columns) <= existing_columns:
+            continue
+        if _is_covered(inspector, table, name, columns, unique):
+            continue
+        if unique and table in MERGE_DUPLICATES:
+            _merge_duplicates(bind, inspector, table, columns)
+        elif unique:
+            _check_duplicates(bind, table, columns)
+        pending.append((name, table, columns, unique))
+
+    if not pending:
+        return
+
+    if is_postgres:
+        # CREATE INDEX CONCURRENTLY не блокирует запись, но требует autocommit
+        with op.get_context().autocommit_block():
+            for name, table, columns, unique in pending:
+                op.create_index(name, table, columns, unique=unique, postgresql_concurrently=True)
+    else:
+        for name, table, columns, unique in pending:
+            op.create_index(name, table, columns, unique=unique)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = set(inspector.get_table_names())
+    for name, table, columns, unique in reversed(INDEXES):
+        if table in tables and any(index['name'] == name for index in inspector.get_indexes(table)):
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,44 @@
+"""Index for the course access expiry sweep
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2024-02-22 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+# Совпадает с __table_args__ модели UserCourseAccess
+NAME = 'ix_user_course_access_status_expires'
+TABLE = 'user_course_access'
+COLUMNS = ['status', 'expires_at']
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if TABLE not in inspector.get_table_names():
+        return
+    if any(index['name'] == NAME for index in inspector.get_indexes(TABLE)):
+        return
+
+    if bind.dialect.name == 'postgresql':
+        # CREATE INDEX CONCURRENTLY не блокирует запись, но требует autocommit
+        with op.get_context().autocommit_block():
+            op.create_index(NAME, TABLE, COLUMNS, postgresql_concurrently=True)
+    else:
+        op.create_index(NAME, TABLE, COLUMNS)
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if TABLE in inspector.get_table_names() and any(
+        index['name'] == NAME for index in inspector.get_indexes(TABLE)
+    ):
+        op.drop_index(NAME, table_name=TABLE)
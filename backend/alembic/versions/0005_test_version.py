@@ -0,0 +1,33 @@
+"""Test version for cached answer keys
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2024-03-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if 'tests' not in inspector.get_table_names():
+        return
+    if any(column['name'] == 'version' for column in inspector.get_columns('tests')):
+        return
+    # server_default заполняет существующие строки без отдельного UPDATE
+    op.add_column('tests', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if 'tests' in inspector.get_table_names() and any(
+        column['name'] == 'version' for column in inspector.get_columns('tests')
+    ):
+        op.drop_column('tests', 'version')
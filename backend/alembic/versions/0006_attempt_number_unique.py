@@ -0,0 +1,66 @@
+"""Unique attempt number per student and test
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2024-03-08 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+# Совпадает с __table_args__ модели TestAttempt
+NAME = 'uq_test_attempts_test_student_number'
+TABLE = 'test_attempts'
+COLUMNS = ['test_id', 'student_id', 'attempt_number']
+
+
+def _renumber_duplicates(bind) -> None:
+    """
+    Попытки, созданные одновременными стартами, могли получить одинаковый
+    номер - перенумеровываем такие группы по времени создания
+    """
+    groups = bind.execute(sa.text(
+        f'SELECT test_id, student_id FROM {TABLE} '
+        f'GROUP BY test_id, student_id, attempt_number HAVING count(*) > 1'
+    )).all()
+    for test_id, student_id in set(groups):
+        ids = bind.execute(sa.text(
+            f'SELECT id FROM {TABLE} WHERE test_id = :test_id AND student_id = :student_id '
+            f'ORDER BY created_at, id'
+        ), {'test_id': test_id, 'student_id': student_id}).scalars().all()
+        bind.execute(
+            sa.text(f'UPDATE {TABLE} SET attempt_number = :number WHERE id = :id'),
+            [{'id': id, 'number': number} for number, id in enumerate(ids, start=1)]
+        )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if TABLE not in inspector.get_table_names():
+        return
+    if any(index['name'] == NAME for index in inspector.get_indexes(TABLE)):
+        return
+
+    _renumber_duplicates(bind)
+
+    if bind.dialect.name == 'postgresql':
+        # autocommit_block сначала фиксирует перенумерацию
+        with op.get_context().autocommit_block():
+            op.create_index(NAME, TABLE, COLUMNS, unique=True, postgresql_concurrently=True)
+    else:
+        op.create_index(NAME, TABLE, COLUMNS, unique=True)
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if TABLE in inspector.get_table_names() and any(
+        index['name'] == NAME for index in inspector.get_indexes(TABLE)
+    ):
+        op.drop_index(NAME, table_name=TABLE)
@@ -0,0 +1,56 @@
+"""Track sent course access expiry notifications
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2024-03-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+TABLE = 'user_course_access'
+COLUMN = 'expiry_notified_at'
+# Совпадает с __table_args__ модели UserCourseAccess
+NAME = 'ix_user_course_access_status_expiry_notified'
+COLUMNS = ['status', COLUMN]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if TABLE not in inspector.get_table_names():
+        return
+
+    if not any(column['name'] == COLUMN for column in inspector.get_columns(TABLE)):
+        op.add_column(TABLE, sa.Column(COLUMN, sa.DateTime(), nullable=True))
+        # Об уже истекших доступах уведомления отправлены прежним кодом.
+        # Enum модели хранит имя значения (EXPIRED), схема 0001 - само значение
+        bind.execute(sa.text(
+            f"UPDATE {TABLE} SET {COLUMN} = COALESCE(updated_at, CURRENT_TIMESTAMP) "
+            f"WHERE CAST(status AS VARCHAR) IN ('EXPIRED', 'expired')"
+        ))
+
+    if any(index['name'] == NAME for index in inspector.get_indexes(TABLE)):
+        return
+    if bind.dialect.name == 'postgresql':
+        # autocommit_block сначала фиксирует новую колонку
+        with op.get_context().autocommit_block():
+            op.create_index(NAME, TABLE, COLUMNS, postgresql_concurrently=True)
+    else:
+        op.create_index(NAME, TABLE, COLUMNS)
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if TABLE not in inspector.get_table_names():
+        return
+    if any(index['name'] == NAME for index in inspector.get_indexes(TABLE)):
+        op.drop_index(NAME, table_name=TABLE)
+    if any(column['name'] == COLUMN for column in inspector.get_columns(TABLE)):
+        op.drop_column(TABLE, COLUMN)
@@ -3,12 +3,16 @@
 Основной модуль приложения
 """
 
+import asyncio
+import logging
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
 from app.core.config import settings
-from app.core.database import engine
+from app.core.database import SessionLocal, engine, get_pool_stats
+from app.core.security import password_hash_executor
 from app.models import Base
 from app.api.v1.api import api_router
 
@@ -32,6 +36,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
 # Подключение статических файлов
@@ -40,6 +45,107 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 # Подключение API роутера
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+logger = logging.getLogger(__name__)
+
+# In-process воркер уведомлений (для очереди в памяти)
+notification_worker = None
+
+# Периодическая перестройка поискового индекса каталога
+search_index_refresh_task = None
+
+
+@app.on_event("startup")
+async def start_notification_worker():
+    """Запуск доставки уведомлений в процессе приложения"""
+    global notification_worker
+    if settings.NOTIFICATION_QUEUE_BACKEND == "memory":
+        from app.core.notification_worker import NotificationWorker
+        from app.core.notifications import notification_manager
+
+        await notification_manager.start()
+        notification_worker = NotificationWorker()
+        await notification_worker.start()
+
+
+@app.on_event("shutdown")
+async def stop_notification_worker():
+    """Остановка доставки уведомлений"""
+    if notification_worker is not None:
+        await notification_worker.stop()
+
+    from app.core.notifications import notification_manager
+    await notification_manager.close()
+
+
+@app.on_event("startup")
+async def start_search_index():
+    """Загрузка поискового индекса каталога (снимок или построение из БД)"""
+    global search_index_refresh_task
+    if not settings.SEARCH_INDEX_ENABLED:
+        return
+    from app.core.search_index import run_refresh_loop, warm_up_index
+
+    def warm_up():
+        with SessionLocal() as db:
+            warm_up_index(db)
+
+    try:
+        await asyncio.to_thread(warm_up)
+    except Exception as e:
+        # Без индекса поиск работает через базу данных
+        logger.error(f"Course search index warm-up failed: {e}")
+    search_index_refresh_task = asyncio.create_task(run_refresh_loop())
+
+
+@app.on_event("shutdown")
+async def stop_search_index():
+    """Остановка перестройки индекса и сохранение снимка"""
+    if search_index_refresh_task is None:
+        return
+    search_index_refresh_task.cancel()
+    from app.core.search_index import course_search_index
+
+    if course_search_index.ready and settings.SEARCH_INDEX_SNAPSHOT_PATH:
+        course_search_index.save_snapshot(settings.SEARCH_INDEX_SNAPSHOT_PATH)
+
+
+@app.on_event("startup")
+async def start_access_expiry_sweeper():
+    """Запуск фонового истечения доступов к курсам"""
+    from app.core.access_expiry import access_expiry_sweeper
+
+    access_expiry_sweeper.start()
+
+
+@app.on_event("shutdown")
+async def stop_access_expiry_sweeper():
+    """Остановка истечения доступов"""
+    from app.core.access_expiry import access_expiry_sweeper
+
+    await access_expiry_sweeper.stop()
+
+
+@app.on_event("startup")
+async def start_position_flusher():
+    """Запуск фоновой записи позиций просмотра уроков"""
+    from app.core.position_buffer import position_flusher
+
+    await position_flusher.start()
+
+
+@app.on_event("shutdown")
+async def stop_position_flusher():
+    """Запись накопленных позиций перед остановкой"""
+    from app.core.position_buffer import position_flusher
+
+    await position_flusher.stop()
+
+
+@app.on_event("shutdown")
+async def stop_password_hash_executor():
+    """Остановка пула потоков bcrypt"""
+    password_hash_executor.shutdown()
+
 @app.get("/")
 async def root():
     """Корневой endpoint"""
@@ -53,4 +159,28 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Проверка здоровья приложения"""
-    return {"status": "healthy", "timestamp": "2024-01-01T00:00:00Z"} 
\ No newline at end of file
+    return {"status": "healthy", "timestamp": "2024-01-01T00:00:00Z"} 
+
+@app.get("/health/db-pool")
+async def db_pool_stats():
+    """Статистика пула соединений с базой данных текущего воркера"""
+    return get_pool_stats()
+
+@app.get("/health/password-hash")
+async def password_hash_stats():
+    """Очередь пула потоков bcrypt текущего воркера"""
+    return password_hash_executor.stats()
+
+@app.get("/health/position-buffer")
+async def position_buffer_stats():
+    """Буфер позиций просмотра: принятые, объединенные и записанные heartbeat"""
+    from app.core.position_buffer import position_flusher
+
+    return await position_flusher.get_stats()
+
+@app.get("/health/access-expiry")
+async def access_expiry_stats():
+    """Истечение доступов: истекшие доступы, пачки и уведомления"""
+    from app.core.access_expiry import access_expiry_sweeper
+
+    return access_expiry_sweeper.get_stats()
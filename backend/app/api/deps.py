@@ -1,42 +1,97 @@
 from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.core.auth_cache import cache_token, cache_user, get_cached_user, get_cached_user_async, get_cached_user_id
 from app.core.config import settings
-from app.core.database import get_db
-from app.crud.user import user_crud
+from app.core.database import get_db, get_async_db
+from app.core.pagination import PageCursor, decode_cursor
+from app.crud.user import async_user_crud, user_crud
 from app.models.user import User, UserRole
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
 
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Не удалось проверить учетные данные",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+
+def get_token_user_id(token: str) -> int:
+    """id пользователя из токена (проверенный ранее токен не декодируется повторно)"""
+    user_id = get_cached_user_id(token)
+    if user_id is None:
+        try:
+            payload = jwt.decode(
+                token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+            )
+            subject: str = payload.get("sub")
+            if subject is None:
+                raise credentials_exception
+        except JWTError:
+            raise credentials_exception
+        user_id = int(subject)
+        cache_token(token, user_id, expires_at=payload.get("exp"))
+    return user_id
+
+
 def get_current_user(
     db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
 ) -> User:
     """Получить текущего пользователя из токена"""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Не удалось проверить учетные данные",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        user_id: str = payload.get("sub")
-        if user_id is None:
+    user_id = get_token_user_id(token)
+    user = get_cached_user(db, user_id)
+    if user is None:
+        user = user_crud.get(db, id=user_id)
+        if user is None:
             raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    user = user_crud.get(db, id=int(user_id))
+        cache_user(user)
+    return user
+
+
+async def get_current_user_async(
+    db: AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)
+) -> User:
+    """
+    Текущий пользователь для async def эндпоинтов: использует ту же
+    асинхронную сессию, что и обработчик (одно соединение на запрос)
+    """
+    user_id = get_token_user_id(token)
+    user = await get_cached_user_async(db, user_id)
     if user is None:
-        raise credentials_exception
+        user = await async_user_crud.get(db, id=user_id)
+        if user is None:
+            raise credentials_exception
+        cache_user(user)
     return user
 
 
+async def get_current_active_user_async(
+    current_user: User = Depends(get_current_user_async),
+) -> User:
+    """Текущий активный пользователь (async def эндпоинты)"""
+    if not user_crud.is_active(current_user):
+        raise HTTPException(status_code=400, detail="Неактивный пользователь")
+    return current_user
+
+
+async def get_current_active_superuser(
+    current_user: User = Depends(get_current_active_user_async),
+) -> User:
+    """Текущий администратор (async def эндпоинты)"""
+    if not user_crud.is_admin(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Недостаточно прав"
+        )
+    return current_user
+
+
 def get_current_active_user(
     current_user: User = Depends(get_current_user),
 ) -> User:
@@ -93,4 +148,23 @@ def check_user_permissions(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Недостаточно прав"
             )
-    return current_user 
\ No newline at end of file
+    return current_user 
+
+
+def get_page_cursor(
+    cursor: Optional[str] = Query(
+        None,
+        description="Курсор keyset пагинации: пустое значение - первая страница, "
+                    "далее значение заголовка X-Next-Cursor. Вместо skip."
+    ),
+) -> Optional[PageCursor]:
+    """Курсор страницы (None - обычная пагинация через skip)"""
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный курсор пагинации"
+        )
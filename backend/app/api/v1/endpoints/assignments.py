@@ -1,8 +1,9 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 
 from app.api import deps
+from app.core.pagination import PageCursor, set_next_cursor
 from app.crud import assignment_crud, submission_crud, user_crud
 from app.core.notifications import notification_manager, NotificationTemplate, NotificationType
 from app.schemas.assignment import Assignment, AssignmentCreate, AssignmentUpdate, AssignmentSubmission, AssignmentSubmissionCreate, AssignmentSubmissionUpdate
@@ -15,9 +16,11 @@ router = APIRouter()
 
 @router.get("/", response_model=List[Assignment])
 def read_assignments(
+    response: Response,
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[PageCursor] = Depends(deps.get_page_cursor),
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
@@ -28,7 +31,8 @@ def read_assignments(
             status_code=403,
             detail="Недостаточно прав",
         )
-    assignments = assignment_crud.get_multi(db, skip=skip, limit=limit)
+    assignments = assignment_crud.get_multi(db, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, assignments, limit, cursor)
     return assignments
 
 
@@ -261,15 +265,18 @@ def submit_assignment(
 
 @router.get("/submissions/my", response_model=List[AssignmentSubmission])
 def read_my_submissions(
+    response: Response,
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[PageCursor] = Depends(deps.get_page_cursor),
     current_user: User = Depends(deps.get_current_student_user),
 ) -> Any:
     """
     Получить отправки текущего студента.
     """
-    submissions = submission_crud.get_by_student(db, student_id=current_user.id, skip=skip, limit=limit)
+    submissions = submission_crud.get_by_student(db, student_id=current_user.id, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, submissions, limit, cursor)
     return submissions
 
 
@@ -6,13 +6,14 @@ from datetime import timedelta
 from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
-from app.core.database import get_db
-from app.core.security import create_access_token, get_password_hash, verify_password
+from app.core.database import get_async_db, get_db
+from app.core.security import create_access_token, get_password_hash_async, verify_and_update_password
 from app.core.notifications import notification_manager, NotificationTemplate, NotificationType
-from app.crud.user import user_crud
+from app.crud.user import async_user_crud, user_crud
 from app.schemas.auth import Token, UserCreate, UserLogin
 from app.schemas.user import User
 
@@ -22,13 +23,13 @@ router = APIRouter()
 @router.post("/register", response_model=User, status_code=status.HTTP_201_CREATED)
 async def register(
     user_in: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Any:
     """
     Регистрация нового пользователя
     """
     # Проверка существования пользователя
-    user = user_crud.get_by_email(db, email=user_in.email)
+    user = await async_user_crud.get_by_email(db, email=user_in.email)
     if user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -36,15 +37,16 @@ async def register(
         )
     
     # Проверка username
-    user = user_crud.get_by_username(db, username=user_in.username)
+    user = await async_user_crud.get_by_username(db, username=user_in.username)
     if user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Пользователь с таким username уже существует"
         )
     
-    # Создание пользователя
-    user = user_crud.create(db, obj_in=user_in)
+    # Создание пользователя (bcrypt считается в отдельном пуле потоков)
+    hashed_password = await get_password_hash_async(user_in.password)
+    user = await async_user_crud.create(db, obj_in=user_in, hashed_password=hashed_password)
     
     # Отправляем приветственное уведомление
     await notification_manager.send_notification(
@@ -74,11 +76,14 @@ def login(
         )
     
     # Проверка пароля
-    if not verify_password(user_in.password, user.hashed_password):
+    verified, new_hash = verify_and_update_password(user_in.password, user.hashed_password)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Неверный email или пароль"
         )
+    if new_hash:
+        user_crud.update_password_hash(db, user=user, hashed_password=new_hash)
     
     # Проверка активности
     if not user.is_active:
@@ -111,8 +116,8 @@ def login_oauth(
     """
     OAuth2 совместимый endpoint для входа
     """
-    user = user_crud.get_by_email(db, email=form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = user_crud.authenticate(db, email=form_data.username, password=form_data.password)
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Неверный email или пароль",
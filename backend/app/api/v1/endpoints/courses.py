@@ -1,11 +1,17 @@
 from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api import deps
-from app.crud import course_crud, module_crud, lesson_crud
+from app.crud import course_crud, module_crud, lesson_crud, async_lesson_crud, async_access_crud
 from app.core.notifications import notification_manager, NotificationTemplate, NotificationType
-from app.schemas.course import Course, CourseCreate, CourseUpdate, Module, ModuleCreate, ModuleUpdate, Lesson, LessonCreate, LessonUpdate
+from app.core.http_cache import conditional_response, make_objects_etag
+from app.core.position_buffer import position_flusher
+from app.core.response_cache import COURSES_NAMESPACE, response_cache
+from app.core.search_index import course_search_index, reindex_course
+from app.schemas.course import Course, CourseCreate, CourseSearchResult, CourseSuggestion, CourseTree, CourseUpdate, Module, ModuleCreate, ModuleUpdate, Lesson, LessonCreate, LessonUpdate
+from app.schemas.activity import LessonPositionUpdate
 from app.models.user import User
 
 router = APIRouter()
@@ -23,8 +29,11 @@ def read_courses(
     """
     Получить список курсов.
     """
-    courses = course_crud.get_published(db, skip=skip, limit=limit)
-    return courses
+    return response_cache.get_or_set(
+        COURSES_NAMESPACE, "published", {"skip": skip, "limit": limit},
+        lambda: course_crud.get_published(db, skip=skip, limit=limit),
+        response_model=List[Course]
+    )
 
 
 @router.get("/featured", response_model=List[Course])
@@ -36,11 +45,14 @@ def read_featured_courses(
     """
     Получить рекомендуемые курсы (публичный доступ).
     """
-    courses = course_crud.get_featured(db, skip=skip, limit=limit)
-    return courses
+    return response_cache.get_or_set(
+        COURSES_NAMESPACE, "featured", {"skip": skip, "limit": limit},
+        lambda: course_crud.get_featured(db, skip=skip, limit=limit),
+        response_model=List[Course]
+    )
 
 
-@router.get("/search", response_model=List[Course])
+@router.get("/search", response_model=List[CourseSearchResult])
 def search_courses(
     *,
     db: Session = Depends(deps.get_db),
@@ -50,9 +62,43 @@ def search_courses(
 ) -> Any:
     """
     Поиск курсов (публичный доступ).
+    Результаты отсортированы по релевантности, snippet - фрагмент описания с подсветкой.
+    """
+    if course_search_index.ready:
+        return course_search_index.search(q, skip=skip, limit=limit)
+
+    def search() -> List[CourseSearchResult]:
+        hits = course_crud.search_ranked(db, search_term=q, skip=skip, limit=limit)
+        return [
+            CourseSearchResult.model_validate(course).model_copy(update={"rank": rank, "snippet": snippet})
+            for course, rank, snippet in hits
+        ]
+
+    return response_cache.get_or_set(
+        COURSES_NAMESPACE, "search", {"q": q, "skip": skip, "limit": limit},
+        search,
+        response_model=List[CourseSearchResult]
+    )
+
+
+@router.get("/search/suggest", response_model=List[CourseSuggestion])
+def suggest_courses(
+    *,
+    db: Session = Depends(deps.get_db),
+    q: str,
+    limit: int = 10,
+) -> Any:
     """
-    courses = course_crud.search_courses(db, search_term=q, skip=skip, limit=limit)
-    return courses
+    Автодополнение названий курсов (публичный доступ).
+    """
+    if course_search_index.ready:
+        return course_search_index.suggest(q, limit=min(limit, 20))
+
+    return response_cache.get_or_set(
+        COURSES_NAMESPACE, "suggest", {"q": q, "limit": limit},
+        lambda: course_crud.suggest_titles(db, prefix=q, limit=min(limit, 20)),
+        response_model=List[CourseSuggestion]
+    )
 
 
 @router.post("/", response_model=Course)
@@ -72,6 +118,8 @@ def create_course(
             detail="Курс с таким slug уже существует.",
         )
     course = course_crud.create(db, obj_in=course_in)
+    response_cache.invalidate(COURSES_NAMESPACE)
+    reindex_course(db, course.id)
     return course
 
 
@@ -79,6 +127,7 @@ def create_course(
 def read_course(
     *,
     db: Session = Depends(deps.get_db),
+    request: Request,
     course_id: int,
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
@@ -96,7 +145,44 @@ def read_course(
             status_code=404,
             detail="Курс не найден",
         )
-    return course
+    etag = make_objects_etag("course", [course])
+    return conditional_response(request, etag, course, Course)
+
+
+@router.get("/{course_id}/tree", response_model=CourseTree)
+def read_course_tree(
+    *,
+    db: Session = Depends(deps.get_db),
+    request: Request,
+    course_id: int,
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Получить курс целиком: модули, уроки, тесты и задания (оглавление).
+    """
+    course = course_crud.get_tree(db, course_id=course_id)
+    if not course:
+        raise HTTPException(
+            status_code=404,
+            detail="Курс не найден",
+        )
+    if course.status != "published" and not current_user.is_admin:
+        raise HTTPException(
+            status_code=404,
+            detail="Курс не найден",
+        )
+    lessons = [lesson for module in course.modules for lesson in module.lessons]
+    etag = make_objects_etag(
+        "course-tree",
+        [
+            course,
+            *course.modules,
+            *lessons,
+            *(test for lesson in lessons for test in lesson.tests),
+            *(assignment for lesson in lessons for assignment in lesson.assignments),
+        ]
+    )
+    return conditional_response(request, etag, course, CourseTree)
 
 
 @router.put("/{course_id}", response_model=Course)
@@ -122,6 +208,8 @@ def update_course(
             detail="Недостаточно прав для редактирования этого курса",
         )
     course = course_crud.update(db, db_obj=course, obj_in=course_in)
+    response_cache.invalidate(COURSES_NAMESPACE)
+    reindex_course(db, course_id)
     return course
 
 
@@ -147,6 +235,8 @@ def delete_course(
             detail="Недостаточно прав для удаления этого курса",
         )
     course_crud.remove(db, id=course_id)
+    response_cache.invalidate(COURSES_NAMESPACE)
+    course_search_index.remove_course(course_id)
     return {"message": "Курс успешно удален"}
 
 
@@ -170,6 +260,7 @@ def read_my_courses(
 def read_modules(
     *,
     db: Session = Depends(deps.get_db),
+    request: Request,
     course_id: int,
     skip: int = 0,
     limit: int = 100,
@@ -185,7 +276,8 @@ def read_modules(
             detail="Курс не найден",
         )
     modules = module_crud.get_by_course(db, course_id=course_id, skip=skip, limit=limit)
-    return modules
+    etag = make_objects_etag("modules", modules, course_id, skip, limit)
+    return conditional_response(request, etag, modules, List[Module])
 
 
 @router.post("/{course_id}/modules", response_model=Module)
@@ -284,6 +376,7 @@ def delete_module(
             detail="Недостаточно прав для удаления этого модуля",
         )
     module_crud.remove(db, id=module_id)
+    reindex_course(db, module.course_id)
     return {"message": "Модуль успешно удален"}
 
 
@@ -293,6 +386,7 @@ def delete_module(
 def read_lessons(
     *,
     db: Session = Depends(deps.get_db),
+    request: Request,
     module_id: int,
     skip: int = 0,
     limit: int = 100,
@@ -308,7 +402,8 @@ def read_lessons(
             detail="Модуль не найден",
         )
     lessons = lesson_crud.get_by_module(db, module_id=module_id, skip=skip, limit=limit)
-    return lessons
+    etag = make_objects_etag("lessons", lessons, module_id, skip, limit)
+    return conditional_response(request, etag, lessons, List[Lesson])
 
 
 @router.post("/modules/{module_id}/lessons", response_model=Lesson)
@@ -336,6 +431,7 @@ def create_lesson(
         )
     lesson_in.module_id = module_id
     lesson = lesson_crud.create(db, obj_in=lesson_in)
+    reindex_course(db, module.course_id)
     return lesson
 
 
@@ -343,6 +439,7 @@ def create_lesson(
 def read_lesson(
     *,
     db: Session = Depends(deps.get_db),
+    request: Request,
     lesson_id: int,
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
@@ -355,7 +452,8 @@ def read_lesson(
             status_code=404,
             detail="Урок не найден",
         )
-    return lesson
+    etag = make_objects_etag("lesson", [lesson])
+    return conditional_response(request, etag, lesson, Lesson)
 
 
 @router.put("/lessons/{lesson_id}", response_model=Lesson)
@@ -383,6 +481,7 @@ def update_lesson(
             detail="Недостаточно прав для редактирования этого урока",
         )
     lesson = lesson_crud.update(db, db_obj=lesson, obj_in=lesson_in)
+    reindex_course(db, module.course_id)
     return lesson
 
 
@@ -410,6 +509,7 @@ def delete_lesson(
             detail="Недостаточно прав для удаления этого урока",
         )
     lesson_crud.remove(db, id=lesson_id)
+    reindex_course(db, module.course_id)
     return {"message": "Урок успешно удален"}
 
 
@@ -434,18 +534,51 @@ def read_free_lessons(
     return lessons
 
 
+@router.put("/lessons/{lesson_id}/position", response_model=dict)
+async def update_lesson_position(
+    *,
+    db: AsyncSession = Depends(deps.get_async_db),
+    lesson_id: int,
+    position_in: LessonPositionUpdate,
+    current_user: User = Depends(deps.get_current_active_user_async),
+) -> Any:
+    """
+    Сохранить позицию просмотра урока (heartbeat плеера).
+    Позиция записывается в базу данных пачкой в фоне, а не на каждый запрос.
+    """
+    lesson = await async_lesson_crud.get_with_course(db, lesson_id=lesson_id)
+    if not lesson:
+        raise HTTPException(
+            status_code=404,
+            detail="Урок не найден",
+        )
+
+    course_id = lesson.module.course_id
+    has_access = await async_access_crud.check_access(db, user_id=current_user.id, course_id=course_id)
+    if not has_access:
+        raise HTTPException(
+            status_code=403,
+            detail="Нет доступа к этому курсу",
+        )
+
+    await position_flusher.record(
+        user_id=current_user.id, lesson_id=lesson_id, course_id=course_id, position=position_in.position
+    )
+    return {"position": position_in.position}
+
+
 @router.post("/lessons/{lesson_id}/complete", response_model=dict)
 async def complete_lesson(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_db),
     lesson_id: int,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: User = Depends(deps.get_current_active_user_async),
 ) -> Any:
     """
     Отметить урок как завершенный.
     """
     # Проверяем существование урока
-    lesson = lesson_crud.get(db, id=lesson_id)
+    lesson = await async_lesson_crud.get_with_course(db, lesson_id=lesson_id)
     if not lesson:
         raise HTTPException(
             status_code=404,
@@ -453,14 +586,16 @@ async def complete_lesson(
         )
     
     # Проверяем доступ к курсу
-    from app.crud import access_crud
-    has_access = access_crud.check_access(db, user_id=current_user.id, course_id=lesson.module.course_id)
+    has_access = await async_access_crud.check_access(db, user_id=current_user.id, course_id=lesson.module.course_id)
     if not has_access:
         raise HTTPException(
             status_code=403,
             detail="Нет доступа к этому курсу",
         )
     
+    # Несохраненная позиция просмотра записывается сразу
+    await position_flusher.flush_lesson(current_user.id, lesson_id)
+
     # Отмечаем урок как завершенный (здесь должна быть логика сохранения прогресса)
     # lesson_progress_crud.mark_completed(db, user_id=current_user.id, lesson_id=lesson_id)
     
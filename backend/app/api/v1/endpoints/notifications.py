@@ -3,12 +3,14 @@ API эндпоинты для управления уведомлениями
 """
 
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api import deps
+from app.core.pagination import PageCursor, set_next_cursor
 from app.core.notifications import notification_manager, NotificationTemplate, NotificationType
-from app.crud.notification import notification_crud
+from app.crud.notification import async_notification_crud
 from app.schemas.notification import (
     Notification as NotificationSchema,
     NotificationCreate,
@@ -22,43 +24,40 @@ router = APIRouter()
 
 @router.get("/", response_model=List[NotificationSchema])
 async def get_notifications(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[PageCursor] = Depends(deps.get_page_cursor),
     is_read: Optional[bool] = None,
-    current_user: User = Depends(deps.get_current_user),
-    db: Session = Depends(deps.get_db)
+    current_user: User = Depends(deps.get_current_active_user_async),
+    db: AsyncSession = Depends(deps.get_async_db)
 ):
     """Получить уведомления пользователя"""
-    filters = {"user_id": current_user.id}
-    if is_read is not None:
-        filters["is_read"] = is_read
-    
-    notifications = notification_crud.get_multi(
-        db, skip=skip, limit=limit, filters=filters
+    notifications = await async_notification_crud.get_by_user(
+        db, user_id=current_user.id, skip=skip, limit=limit, cursor=cursor, is_read=is_read
     )
+    set_next_cursor(response, notifications, limit, cursor)
     return notifications
 
 
 @router.get("/unread", response_model=List[NotificationSchema])
 async def get_unread_notifications(
-    current_user: User = Depends(deps.get_current_user),
-    db: Session = Depends(deps.get_db)
+    current_user: User = Depends(deps.get_current_active_user_async),
+    db: AsyncSession = Depends(deps.get_async_db)
 ):
     """Получить непрочитанные уведомления пользователя"""
-    notifications = notification_crud.get_multi(
-        db, filters={"user_id": current_user.id, "is_read": False}
-    )
+    notifications = await async_notification_crud.get_unread_by_user(db, user_id=current_user.id)
     return notifications
 
 
 @router.get("/{notification_id}", response_model=NotificationSchema)
 async def get_notification(
     notification_id: int,
-    current_user: User = Depends(deps.get_current_user),
-    db: Session = Depends(deps.get_db)
+    current_user: User = Depends(deps.get_current_active_user_async),
+    db: AsyncSession = Depends(deps.get_async_db)
 ):
     """Получить конкретное уведомление"""
-    notification = notification_crud.get(db, id=notification_id)
+    notification = await async_notification_crud.get(db, id=notification_id)
     if not notification or notification.user_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -70,11 +69,11 @@ async def get_notification(
 @router.put("/{notification_id}/read", response_model=NotificationSchema)
 async def mark_as_read(
     notification_id: int,
-    current_user: User = Depends(deps.get_current_user),
-    db: Session = Depends(deps.get_db)
+    current_user: User = Depends(deps.get_current_active_user_async),
+    db: AsyncSession = Depends(deps.get_async_db)
 ):
     """Отметить уведомление как прочитанное"""
-    notification = notification_crud.get(db, id=notification_id)
+    notification = await async_notification_crud.get(db, id=notification_id)
     if not notification or notification.user_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -82,45 +81,45 @@ async def mark_as_read(
         )
     
     notification_update = NotificationUpdate(is_read=True)
-    notification = notification_crud.update(db, db_obj=notification, obj_in=notification_update)
+    notification = await async_notification_crud.update(db, db_obj=notification, obj_in=notification_update)
     return notification
 
 
 @router.put("/read-all", response_model=dict)
 async def mark_all_as_read(
-    current_user: User = Depends(deps.get_current_user),
-    db: Session = Depends(deps.get_db)
+    current_user: User = Depends(deps.get_current_active_user_async),
+    db: AsyncSession = Depends(deps.get_async_db)
 ):
     """Отметить все уведомления как прочитанные"""
-    count = notification_crud.mark_all_as_read(db, user_id=current_user.id)
+    count = await async_notification_crud.mark_all_as_read(db, user_id=current_user.id)
     return {"message": f"Отмечено {count} уведомлений как прочитанные"}
 
 
 @router.delete("/{notification_id}")
 async def delete_notification(
     notification_id: int,
-    current_user: User = Depends(deps.get_current_user),
-    db: Session = Depends(deps.get_db)
+    current_user: User = Depends(deps.get_current_active_user_async),
+    db: AsyncSession = Depends(deps.get_async_db)
 ):
     """Удалить уведомление"""
-    notification = notification_crud.get(db, id=notification_id)
+    notification = await async_notification_crud.get(db, id=notification_id)
     if not notification or notification.user_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Уведомление не найдено"
         )
     
-    notification_crud.remove(db, id=notification_id)
+    await async_notification_crud.remove(db, id=notification_id)
     return {"message": "Уведомление удалено"}
 
 
 @router.delete("/")
 async def delete_all_notifications(
-    current_user: User = Depends(deps.get_current_user),
-    db: Session = Depends(deps.get_db)
+    current_user: User = Depends(deps.get_current_active_user_async),
+    db: AsyncSession = Depends(deps.get_async_db)
 ):
     """Удалить все уведомления пользователя"""
-    count = notification_crud.delete_all_by_user(db, user_id=current_user.id)
+    count = await async_notification_crud.delete_all_by_user(db, user_id=current_user.id)
     return {"message": f"Удалено {count} уведомлений"}
 
 
@@ -133,11 +132,11 @@ async def send_notification(
     data: Optional[dict] = None,
     priority: int = 1,
     current_user: User = Depends(deps.get_current_active_superuser),
-    db: Session = Depends(deps.get_db)
+    db: AsyncSession = Depends(deps.get_async_db)
 ):
     """Отправить уведомление пользователю (только для админов)"""
     # Проверяем, что пользователь существует
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -166,12 +165,12 @@ async def send_bulk_notification(
     data: Optional[dict] = None,
     priority: int = 1,
     current_user: User = Depends(deps.get_current_active_superuser),
-    db: Session = Depends(deps.get_db)
+    db: AsyncSession = Depends(deps.get_async_db)
 ):
     """Отправить уведомление нескольким пользователям (только для админов)"""
     # Проверяем, что все пользователи существуют
-    users = db.query(User).filter(User.id.in_(user_ids)).all()
-    if len(users) != len(user_ids):
+    found = await db.scalar(select(func.count(User.id)).filter(User.id.in_(user_ids)))
+    if found != len(set(user_ids)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Некоторые пользователи не найдены"
@@ -198,13 +197,13 @@ async def send_system_announcement(
     user_ids: Optional[List[int]] = None,
     notification_types: List[NotificationType] = [NotificationType.INTERNAL],
     current_user: User = Depends(deps.get_current_active_superuser),
-    db: Session = Depends(deps.get_db)
+    db: AsyncSession = Depends(deps.get_async_db)
 ):
     """Отправить системное объявление (только для админов)"""
     if user_ids:
         # Проверяем, что все пользователи существуют
-        users = db.query(User).filter(User.id.in_(user_ids)).all()
-        if len(users) != len(user_ids):
+        found = await db.scalar(select(func.count(User.id)).filter(User.id.in_(user_ids)))
+        if found != len(set(user_ids)):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Некоторые пользователи не найдены"
@@ -243,14 +242,14 @@ async def get_notification_templates(
 @router.get("/stats", response_model=dict)
 async def get_notification_stats(
     current_user: User = Depends(deps.get_current_active_superuser),
-    db: Session = Depends(deps.get_db)
+    db: AsyncSession = Depends(deps.get_async_db)
 ):
     """Получить статистику уведомлений (только для админов)"""
-    total_notifications = notification_crud.count(db)
-    unread_notifications = notification_crud.count(db, filters={"is_read": False})
+    total_notifications = await async_notification_crud.count(db)
+    unread_notifications = await async_notification_crud.count_unread(db)
     
     # Статистика по типам
-    type_stats = notification_crud.get_stats_by_type(db)
+    type_stats = await async_notification_crud.get_stats_by_type(db)
     
     return {
         "total_notifications": total_notifications,
@@ -1,9 +1,10 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Request
 from sqlalchemy.orm import Session
 import uuid
 
 from app.api import deps
+from app.core.pagination import PageCursor, set_next_cursor
 from app.crud import payment_crud, access_crud, user_crud, course_crud
 from app.schemas.payment import Payment, PaymentCreate, PaymentUpdate, UserCourseAccess, UserCourseAccessCreate, UserCourseAccessUpdate
 from app.schemas.payment_request import (
@@ -23,29 +24,35 @@ router = APIRouter()
 
 @router.get("/", response_model=List[Payment])
 def read_payments(
+    response: Response,
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[PageCursor] = Depends(deps.get_page_cursor),
     current_user: User = Depends(deps.get_current_admin_user),
 ) -> Any:
     """
     Получить список платежей (только для администраторов).
     """
-    payments = payment_crud.get_multi(db, skip=skip, limit=limit)
+    payments = payment_crud.get_multi(db, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, payments, limit, cursor)
     return payments
 
 
 @router.get("/my", response_model=List[Payment])
 def read_my_payments(
+    response: Response,
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[PageCursor] = Depends(deps.get_page_cursor),
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Получить платежи текущего пользователя.
     """
-    payments = payment_crud.get_by_user(db, user_id=current_user.id, skip=skip, limit=limit)
+    payments = payment_crud.get_by_user(db, user_id=current_user.id, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, payments, limit, cursor)
     return payments
 
 
@@ -115,32 +122,38 @@ def update_payment(
 @router.get("/course/{course_id}", response_model=List[Payment])
 def read_course_payments(
     *,
+    response: Response,
     db: Session = Depends(deps.get_db),
     course_id: int,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[PageCursor] = Depends(deps.get_page_cursor),
     current_user: User = Depends(deps.get_current_admin_user),
 ) -> Any:
     """
     Получить платежи за курс (только для администраторов).
     """
-    payments = payment_crud.get_by_course(db, course_id=course_id, skip=skip, limit=limit)
+    payments = payment_crud.get_by_course(db, course_id=course_id, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, payments, limit, cursor)
     return payments
 
 
 @router.get("/status/{status}", response_model=List[Payment])
 def read_payments_by_status(
     *,
+    response: Response,
     db: Session = Depends(deps.get_db),
     status: str,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[PageCursor] = Depends(deps.get_page_cursor),
     current_user: User = Depends(deps.get_current_admin_user),
 ) -> Any:
     """
     Получить платежи по статусу (только для администраторов).
     """
-    payments = payment_crud.get_by_status(db, status=status, skip=skip, limit=limit)
+    payments = payment_crud.get_by_status(db, status=status, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, payments, limit, cursor)
     return payments
 
 
@@ -182,15 +195,18 @@ def get_total_revenue(
 
 @router.get("/access/", response_model=List[UserCourseAccess])
 def read_course_accesses(
+    response: Response,
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[PageCursor] = Depends(deps.get_page_cursor),
     current_user: User = Depends(deps.get_current_admin_user),
 ) -> Any:
     """
     Получить список доступов к курсам (только для администраторов).
     """
-    accesses = access_crud.get_multi(db, skip=skip, limit=limit)
+    accesses = access_crud.get_multi(db, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, accesses, limit, cursor)
     return accesses
 
 
@@ -1,10 +1,13 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 
 from app.api import deps
+from app.core.pagination import PageCursor, set_next_cursor
+from app.core.test_scoring import check_answers, get_answer_key
 from app.crud import test_crud, question_crud, answer_crud, test_attempt_crud, user_crud
-from app.schemas.test import Test, TestCreate, TestUpdate, Question, QuestionCreate, QuestionUpdate, Answer, AnswerCreate, AnswerUpdate, TestAttempt, TestAttemptCreate, TestAttemptUpdate
+from app.crud.test import AttemptAdmissionConflict
+from app.schemas.test import Test, TestCreate, TestUpdate, Question, QuestionCreate, QuestionUpdate, Answer, AnswerCreate, AnswerUpdate, TestAttempt, TestAttemptUpdate, TestAnswerBatch, TestAnswerBatchResult
 from app.models.user import User
 
 router = APIRouter()
@@ -14,9 +17,11 @@ router = APIRouter()
 
 @router.get("/", response_model=List[Test])
 def read_tests(
+    response: Response,
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[PageCursor] = Depends(deps.get_page_cursor),
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
@@ -27,7 +32,8 @@ def read_tests(
             status_code=403,
             detail="Недостаточно прав",
         )
-    tests = test_crud.get_multi(db, skip=skip, limit=limit)
+    tests = test_crud.get_multi(db, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, tests, limit, cursor)
     return tests
 
 
@@ -405,36 +411,37 @@ def start_test_attempt(
             detail="Тест недоступен для прохождения",
         )
     
-    # Проверяем количество попыток
-    existing_attempts = test_attempt_crud.get_by_student_and_test(
-        db, student_id=current_user.id, test_id=test_id
-    )
-    if len(existing_attempts) >= test.max_attempts:
+    # Лимит попыток проверяется атомарно при вставке попытки
+    try:
+        attempt = test_attempt_crud.admit_attempt(db, test=test, student_id=current_user.id)
+    except AttemptAdmissionConflict:
+        raise HTTPException(
+            status_code=409,
+            detail="Попытка начинается в параллельном запросе, повторите через секунду",
+            headers={"Retry-After": "1"},
+        )
+    if attempt is None:
         raise HTTPException(
             status_code=400,
             detail=f"Превышено максимальное количество попыток ({test.max_attempts})",
         )
-    
-    attempt_in = TestAttemptCreate(
-        test_id=test_id,
-        student_id=current_user.id,
-        attempt_number=len(existing_attempts) + 1
-    )
-    attempt = test_attempt_crud.create(db, obj_in=attempt_in)
     return attempt
 
 
 @router.get("/attempts/my", response_model=List[TestAttempt])
 def read_my_test_attempts(
+    response: Response,
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[PageCursor] = Depends(deps.get_page_cursor),
     current_user: User = Depends(deps.get_current_student_user),
 ) -> Any:
     """
     Получить попытки прохождения тестов текущего студента.
     """
-    attempts = test_attempt_crud.get_by_student(db, student_id=current_user.id, skip=skip, limit=limit)
+    attempts = test_attempt_crud.get_by_student(db, student_id=current_user.id, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, attempts, limit, cursor)
     return attempts
 
 
@@ -479,12 +486,54 @@ def complete_test_attempt(
     *,
     db: Session = Depends(deps.get_db),
     attempt_id: int,
-    score: float,
-    is_passed: bool,
     current_user: User = Depends(deps.get_current_student_user),
 ) -> Any:
     """
     Завершить попытку прохождения теста (для студентов).
+    Оценка считается на сервере по ключу ответов теста.
+    """
+    attempt = test_attempt_crud.get(db, id=attempt_id)
+    if not attempt:
+        raise HTTPException(
+            status_code=404,
+            detail="Попытка не найдена",
+        )
+    
+    if attempt.student_id != current_user.id:
+        raise HTTPException(
+            status_code=403,
+            detail="Недостаточно прав",
+        )
+    
+    if attempt.completed_at:
+        raise HTTPException(
+            status_code=400,
+            detail="Попытка уже завершена",
+        )
+    
+    test = test_crud.get(db, id=attempt.test_id)
+    # Завершенность проверяется повторно под блокировкой строки попытки
+    attempt = test_attempt_crud.grade_and_complete(db, attempt_id=attempt_id, test=test)
+    if attempt is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Попытка уже завершена",
+        )
+    return attempt
+
+
+@router.post("/attempts/{attempt_id}/answers:batch", response_model=TestAnswerBatchResult)
+def submit_test_answers(
+    *,
+    db: Session = Depends(deps.get_db),
+    attempt_id: int,
+    batch_in: TestAnswerBatch,
+    current_user: User = Depends(deps.get_current_student_user),
+) -> Any:
+    """
+    Отправить все ответы попытки одним запросом (для студентов).
+    Ответы сохраняются одной транзакцией; complete=True сразу
+    проверяет их и завершает попытку.
     """
     attempt = test_attempt_crud.get(db, id=attempt_id)
     if not attempt:
@@ -505,17 +554,24 @@ def complete_test_attempt(
             detail="Попытка уже завершена",
         )
     
+    # Вопросы и варианты проверяются по кэшированному ключу теста
     test = test_crud.get(db, id=attempt.test_id)
-    if score < 0 or score > 100:
+    error = check_answers(get_answer_key(db, test), batch_in.answers)
+    if error:
         raise HTTPException(
             status_code=400,
-            detail="Оценка должна быть от 0 до 100",
+            detail=error,
         )
     
-    attempt = test_attempt_crud.complete_attempt(
-        db, attempt_id=attempt_id, score=score, is_passed=is_passed
+    attempt = test_attempt_crud.submit_answers(
+        db, attempt_id=attempt_id, test=test, answers=batch_in.answers, complete=batch_in.complete
     )
-    return attempt
+    if attempt is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Попытка уже завершена",
+        )
+    return {"saved": len(batch_in.answers), "attempt": attempt}
 
 
 @router.get("/{test_id}/attempts", response_model=List[TestAttempt])
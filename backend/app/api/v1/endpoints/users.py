@@ -1,8 +1,9 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 
 from app.api import deps
+from app.core.pagination import PageCursor, set_next_cursor
 from app.crud import user_crud
 from app.schemas.user import User, UserCreate, UserUpdate
 from app.models.user import UserRole
@@ -12,15 +13,18 @@ router = APIRouter()
 
 @router.get("/", response_model=List[User])
 def read_users(
+    response: Response,
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[PageCursor] = Depends(deps.get_page_cursor),
     current_user: User = Depends(deps.get_current_admin_user),
 ) -> Any:
     """
     Получить список пользователей (только для администраторов).
     """
-    users = user_crud.get_multi(db, skip=skip, limit=limit)
+    users = user_crud.get_multi(db, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, users, limit, cursor)
     return users
 
 
@@ -0,0 +1,158 @@
+"""
+Кэш доступов пользователей к курсам
+Для каждого пользователя хранится набор {course_id: expires_at};
+проверка доступа выполняется в памяти без запросов к базе данных
+"""
+
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# course_id -> срок действия (unix time) или None для бессрочного доступа
+AccessSet = Dict[int, Optional[float]]
+
+
+def to_timestamp(value: datetime) -> float:
+    """Unix time для даты из БД (наивные даты хранятся в UTC, см. datetime.utcnow)"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def make_access_set(rows: Iterable) -> AccessSet:
+    """Набор доступов из строк (course_id, expires_at)"""
+    accesses: AccessSet = {}
+    for course_id, expires_at in rows:
+        expires = to_timestamp(expires_at) if isinstance(expires_at, datetime) else expires_at
+        if course_id in accesses:
+            current = accesses[course_id]
+            # Из нескольких активных доступов действует самый долгий
+            expires = None if current is None or expires is None else max(current, expires)
+        accesses[course_id] = expires
+    return accesses
+
+
+def has_course_access(accesses: AccessSet, course_id: int, now: Optional[float] = None) -> bool:
+    """Есть ли в наборе действующий доступ к курсу"""
+    if course_id not in accesses:
+        return False
+    expires = accesses[course_id]
+    return expires is None or expires > (now if now is not None else time.time())
+
+
+class BaseAccessCacheBackend:
+    """Базовый класс хранилища наборов доступов"""
+
+    # Хранилище в памяти процесса можно вызывать прямо из event loop
+    is_local = True
+
+    def get(self, user_id: int) -> Optional[AccessSet]:
+        raise NotImplementedError
+
+    def set(self, user_id: int, accesses: AccessSet) -> None:
+        raise NotImplementedError
+
+    def delete(self, user_id: int) -> None:
+        raise NotImplementedError
+
+
+class InMemoryAccessCacheBackend(BaseAccessCacheBackend):
+    """Кэш в памяти процесса; в других воркерах запись устареет по TTL"""
+
+    def __init__(self, maxsize: int = settings.ACCESS_CACHE_SIZE, ttl: float = settings.ACCESS_CACHE_TTL):
+        self._data = TTLCache(maxsize, ttl)
+
+    def get(self, user_id: int) -> Optional[AccessSet]:
+        return self._data.get(user_id)
+
+    def set(self, user_id: int, accesses: AccessSet) -> None:
+        self._data.set(user_id, accesses)
+
+    def delete(self, user_id: int) -> None:
+        self._data.delete(user_id)
+
+
+class RedisAccessCacheBackend(BaseAccessCacheBackend):
+    """Кэш на Redis: инвалидация сразу видна всем воркерам"""
+
+    is_local = False
+    prefix = "access"
+
+    def __init__(self, redis_url: str = settings.REDIS_URL, ttl: float = settings.ACCESS_CACHE_TTL):
+        import redis
+
+        self.redis = redis.Redis.from_url(redis_url)
+        self.ttl = int(ttl)
+
+    def get(self, user_id: int) -> Optional[AccessSet]:
+        data = self.redis.get(f"{self.prefix}:{user_id}")
+        if data is None:
+            return None
+        return {int(course_id): expires for course_id, expires in json.loads(data).items()}
+
+    def set(self, user_id: int, accesses: AccessSet) -> None:
+        self.redis.set(f"{self.prefix}:{user_id}", json.dumps(accesses), ex=self.ttl)
+
+    def delete(self, user_id: int) -> None:
+        self.redis.delete(f"{self.prefix}:{user_id}")
+
+
+class AccessCache:
+    """
+    Кэш наборов доступов. Ошибки хранилища не ломают проверку доступа:
+    набор просто загружается из базы данных.
+    """
+
+    def __init__(self, backend: BaseAccessCacheBackend):
+        self.backend = backend
+
+    def get(self, user_id: int) -> Optional[AccessSet]:
+        try:
+            return self.backend.get(user_id)
+        except Exception as e:
+            logger.warning(f"Access cache read failed for user {user_id}: {e}")
+            return None
+
+    def set(self, user_id: int, accesses: AccessSet) -> None:
+        try:
+            self.backend.set(user_id, accesses)
+        except Exception as e:
+            logger.warning(f"Access cache write failed for user {user_id}: {e}")
+
+    def invalidate(self, user_id: int) -> None:
+        """Сбросить набор доступов пользователя (после выдачи, отзыва или истечения)"""
+        try:
+            self.backend.delete(user_id)
+        except Exception as e:
+            logger.error(f"Access cache invalidation failed for user {user_id}: {e}")
+
+    async def aget(self, user_id: int) -> Optional[AccessSet]:
+        if self.backend.is_local:
+            return self.get(user_id)
+        return await asyncio.to_thread(self.get, user_id)
+
+    async def aset(self, user_id: int, accesses: AccessSet) -> None:
+        if self.backend.is_local:
+            self.set(user_id, accesses)
+        else:
+            await asyncio.to_thread(self.set, user_id, accesses)
+
+
+def create_access_cache() -> AccessCache:
+    """Создать кэш доступов согласно настройкам"""
+    if settings.ACCESS_CACHE_BACKEND == "redis":
+        return AccessCache(RedisAccessCacheBackend())
+    return AccessCache(InMemoryAccessCacheBackend())
+
+
+# Глобальный кэш доступов
+access_cache = create_access_cache()
+
@@ -0,0 +1,184 @@
+"""
+Фоновое истечение доступов к курсам
+Просроченные доступы переводятся в статус expired пачками (один UPDATE
+на пачку), кэш доступов сбрасывается. Уведомления отправляются по
+истекшим доступам без отметки expiry_notified_at, поэтому сбой постановки
+в очередь или падение процесса не теряют их: они уйдут при следующем проходе
+"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AccessExpirySweeper:
+    """Периодическое пакетное истечение доступов"""
+
+    def __init__(
+        self,
+        interval: float = settings.ACCESS_EXPIRY_SWEEP_INTERVAL,
+        batch_size: int = settings.ACCESS_EXPIRY_BATCH_SIZE
+    ):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+        self._sweep_lock = asyncio.Lock()
+        self.stats = {
+            "expired": 0,        # доступов переведено в expired
+            "batches": 0,
+            "notified": 0,       # получателей уведомлений поставлено в очередь
+            "notify_failures": 0,  # не поставлено в очередь, повтор при следующем проходе
+            "sweeps": 0,
+            "failed_sweeps": 0,
+            "last_sweep_seconds": 0.0,
+        }
+
+    def _expire_batch(self) -> int:
+        """Истечь одну пачку доступов; возвращает их количество"""
+        from app.core.database import SessionLocal
+        from app.crud.payment import access_crud
+
+        with SessionLocal() as db:
+            return len(access_crud.expire_overdue(db, limit=self.batch_size))
+
+    def _claim_pending(self):
+        """
+        Пачка ожидающих уведомлений: (сессия, [(id, user_id, course_id)], названия курсов).
+        Строки остаются заблокированными в сессии до _finish.
+        """
+        from sqlalchemy import select
+
+        from app.core.database import SessionLocal
+        from app.crud.payment import access_crud
+        from app.models.course import Course
+
+        db = SessionLocal()
+        try:
+            pending = access_crud.get_pending_expiry_notifications(db, limit=self.batch_size)
+            course_ids = {course_id for _, _, course_id in pending}
+            titles = dict(db.execute(
+                select(Course.id, Course.title).where(Course.id.in_(course_ids))
+            ).all()) if course_ids else {}
+        except Exception:
+            db.close()
+            raise
+        return db, pending, titles
+
+    @staticmethod
+    def _finish(db, access_ids: List[int]) -> None:
+        """Отметить отправленные уведомления и снять блокировки"""
+        from app.crud.payment import access_crud
+
+        try:
+            access_crud.mark_expiry_notified(db, access_ids=access_ids)
+            db.commit()
+        finally:
+            db.close()
+
+    async def _notify(self, pending: List[Tuple[int, int, int]], titles: Dict[int, str]) -> List[int]:
+        """Одно пакетное уведомление на курс; возвращает id доступов, уведомления которых в очереди"""
+        from app.core.notifications import NotificationTemplate, NotificationType, notification_manager
+
+        accesses_by_course: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+        for access_id, user_id, course_id in pending:
+            accesses_by_course[course_id].append((access_id, user_id))
+
+        notified: List[int] = []
+        for course_id, accesses in accesses_by_course.items():
+            user_ids = list(dict.fromkeys(user_id for _, user_id in accesses))
+            try:
+                results = await notification_manager.send_bulk_notification(
+                    user_ids=user_ids,
+                    template=NotificationTemplate.COURSE_ACCESS_EXPIRED,
+                    notification_types=[NotificationType.INTERNAL, NotificationType.EMAIL],
+                    data={"course_name": titles.get(course_id, "")},
+                    priority=2
+                )
+            except Exception as e:
+                logger.error(f"Failed to enqueue access expiry notifications for course {course_id}: {e}")
+                results = {}
+            enqueued_users = {
+                user_id for user_id, user_results in results.items()
+                if user_results and all(user_results.values())
+            }
+            enqueued = [access_id for access_id, user_id in accesses if user_id in enqueued_users]
+            notified.extend(enqueued)
+            self.stats["notified"] += len(enqueued)
+            if len(enqueued) < len(accesses):
+                self.stats["notify_failures"] += len(accesses) - len(enqueued)
+                logger.error(
+                    f"{len(accesses) - len(enqueued)} access expiry notifications for course {course_id} "
+                    f"were not enqueued, retrying on the next sweep"
+                )
+        return notified
+
+    async def _send_pending(self) -> None:
+        """Поставить в очередь уведомления по истекшим доступам, пачками"""
+        while True:
+            db, pending, titles = await asyncio.to_thread(self._claim_pending)
+            notified: List[int] = []
+            try:
+                if pending:
+                    notified = await self._notify(pending, titles)
+            finally:
+                await asyncio.to_thread(self._finish, db, notified)
+            # Неотправленные остаются первыми в выборке - повторяем при следующем проходе
+            if len(pending) < self.batch_size or len(notified) < len(pending):
+                break
+
+    async def sweep(self) -> int:
+        """Истечь все просроченные доступы и уведомить пользователей; возвращает число истекших"""
+        async with self._sweep_lock:
+            started = time.perf_counter()
+            total = 0
+            while True:
+                expired = await asyncio.to_thread(self._expire_batch)
+                if not expired:
+                    break
+                total += expired
+                self.stats["expired"] += expired
+                self.stats["batches"] += 1
+                if expired < self.batch_size:
+                    break
+            await self._send_pending()
+            self.stats["sweeps"] += 1
+            self.stats["last_sweep_seconds"] = round(time.perf_counter() - started, 4)
+            return total
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                expired = await self.sweep()
+                if expired:
+                    logger.info(f"Expired {expired} course accesses")
+            except Exception as e:
+                self.stats["failed_sweeps"] += 1
+                logger.error(f"Course access expiry sweep failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Запустить периодическое истечение доступов"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Course access expiry sweeper started: every {self.interval}s")
+
+    async def stop(self) -> None:
+        """Остановить истечение доступов"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def get_stats(self) -> Dict:
+        """Метрики истечения доступов"""
+        return dict(self.stats)
+
+
+# Глобальная задача истечения доступов
+access_expiry_sweeper = AccessExpirySweeper()
@@ -0,0 +1,75 @@
+"""
+Кэш аутентификации: разобранные JWT и данные текущего пользователя
+"""
+
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.user import User
+
+# token -> id пользователя (запись живет не дольше самого токена)
+token_cache = TTLCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL)
+
+# id пользователя -> значения колонок User (роль, активность и т.д.)
+user_cache = TTLCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL)
+
+
+def get_cached_user_id(token: str) -> Optional[int]:
+    """Получить id пользователя для уже проверенного токена"""
+    return token_cache.get(token)
+
+
+def cache_token(token: str, user_id: int, expires_at: Optional[float] = None) -> None:
+    """Запомнить проверенный токен до истечения его срока"""
+    ttl = None if expires_at is None else expires_at - time.time()
+    token_cache.set(token, user_id, ttl=ttl)
+
+
+def get_cached_user(db: Session, user_id: int) -> Optional[User]:
+    """
+    Получить пользователя из кэша, привязанного к сессии запроса.
+
+    В кэше хранятся только значения колонок; для каждого запроса
+    создается свой экземпляр User и присоединяется к сессии через
+    merge(load=False) без обращения к базе данных.
+    """
+    user = _detached_user(user_id)
+    return db.merge(user, load=False) if user is not None else None
+
+
+async def get_cached_user_async(db: AsyncSession, user_id: int) -> Optional[User]:
+    """То же, что get_cached_user, для асинхронной сессии"""
+    user = _detached_user(user_id)
+    return await db.merge(user, load=False) if user is not None else None
+
+
+def _detached_user(user_id: int) -> Optional[User]:
+    values = user_cache.get(user_id)
+    if values is None:
+        return None
+    user = User(**values)
+    make_transient_to_detached(user)
+    return user
+
+
+def cache_user(user: User) -> None:
+    """Сохранить значения колонок пользователя"""
+    values: Dict[str, Any] = {
+        attr.key: getattr(user, attr.key)
+        for attr in inspect(User).column_attrs
+    }
+    user_cache.set(user.id, values)
+
+
+def invalidate_user(user_id: int) -> None:
+    """
+    Сбросить кэш пользователя (после изменения, деактивации или удаления).
+    Кэш локален для процесса: в других воркерах запись устареет по TTL.
+    """
+    user_cache.delete(user_id)
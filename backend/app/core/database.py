@@ -2,24 +2,169 @@
 Настройки базы данных
 """
 
-from sqlalchemy import create_engine
+import threading
+import time
+from typing import Tuple
+
+from sqlalchemy import create_engine, exc
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import QueuePool, StaticPool
 
 from app.core.config import settings
 
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool со счетчиками ожидания свободного соединения"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._waiting = 0
+        self._wait_count = 0
+        self._wait_time_total = 0.0
+        self._timeouts = 0
+
+    def _do_get(self):
+        # Быстрый путь: есть свободное соединение или запас overflow
+        if self.checkedin() > 0 or self._max_overflow < 0 or self._overflow < self._max_overflow:
+            return super()._do_get()
+
+        with self._stats_lock:
+            self._waiting += 1
+            self._wait_count += 1
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self._timeouts += 1
+            raise
+        finally:
+            with self._stats_lock:
+                self._waiting -= 1
+                self._wait_time_total += time.perf_counter() - started
+
+    def stats(self) -> dict:
+        """Статистика пула"""
+        with self._stats_lock:
+            return {
+                "pool_size": self.size(),
+                "max_overflow": self._max_overflow,
+                "checked_out": self.checkedout(),
+                "idle": self.checkedin(),
+                "overflow": self.overflow(),
+                "waiting": self._waiting,
+                "wait_count": self._wait_count,
+                "wait_time_total_ms": round(self._wait_time_total * 1000, 2),
+                "timeouts": self._timeouts,
+            }
+
+
+def get_pool_size() -> int:
+    """Размер пула (без overflow) для одного воркера uvicorn"""
+    if settings.DB_POOL_SIZE is not None:
+        return settings.DB_POOL_SIZE
+
+    # Делим общий бюджет соединений между воркерами, оставляя место под overflow
+    workers = max(settings.WEB_CONCURRENCY, 1)
+    per_worker = settings.DB_MAX_CONNECTIONS // workers - settings.DB_MAX_OVERFLOW
+    return max(per_worker, 1)
+
+
+def get_pool_limits(is_async: bool = False) -> Tuple[int, int]:
+    """
+    (pool_size, max_overflow) одного движка одного воркера.
+
+    Соединения воркера (get_pool_size + DB_MAX_OVERFLOW) делятся между
+    синхронным и асинхронным движком в пропорции DB_ASYNC_POOL_SHARE,
+    так что вместе они не превышают долю воркера в DB_MAX_CONNECTIONS.
+    """
+    pool_size = get_pool_size()
+    max_overflow = settings.DB_MAX_OVERFLOW
+    async_pool_size = max(round(pool_size * settings.DB_ASYNC_POOL_SHARE), 1)
+    async_max_overflow = round(max_overflow * settings.DB_ASYNC_POOL_SHARE)
+    if is_async:
+        return async_pool_size, async_max_overflow
+    return max(pool_size - async_pool_size, 1), max_overflow - async_max_overflow
+
+
+def create_db_engine(database_url: str = settings.DATABASE_URL):
+    """Создать движок базы данных"""
+    if database_url.startswith("sqlite"):
+        # SQLite (тесты и локальная разработка) не поддерживает пул соединений
+        return create_engine(
+            database_url,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+            echo=settings.DEBUG
+        )
+
+    pool_size, max_overflow = get_pool_limits()
+    return create_engine(
+        database_url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=True,
+        echo=settings.DEBUG
+    )
+
+
+def get_async_database_url(database_url: str = settings.DATABASE_URL) -> str:
+    """URL базы данных с асинхронным драйвером"""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    if database_url.startswith("postgresql://"):
+        return database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    if database_url.startswith("sqlite://"):
+        return database_url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return database_url
+
+
+def create_async_db_engine(database_url: str = settings.DATABASE_URL):
+    """Создать асинхронный движок базы данных"""
+    async_url = get_async_database_url(database_url)
+    if async_url.startswith("sqlite"):
+        return create_async_engine(
+            async_url,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+            echo=settings.DEBUG
+        )
+
+    pool_size, max_overflow = get_pool_limits(is_async=True)
+    return create_async_engine(
+        async_url,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=True,
+        echo=settings.DEBUG
+    )
+
+
 # Создание движка базы данных
-engine = create_engine(
-    settings.DATABASE_URL,
-    poolclass=StaticPool,
-    pool_pre_ping=True,
-    echo=settings.DEBUG
-)
+engine = create_db_engine()
+
+# Асинхронный движок для async def эндпоинтов
+async_engine = create_async_db_engine()
 
 # Создание фабрики сессий
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Фабрика асинхронных сессий
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Базовый класс для моделей
 Base = declarative_base()
 
@@ -33,10 +178,24 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """Dependency для получения асинхронной сессии базы данных"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_pool_stats() -> dict:
+    """Получить статистику пула соединений"""
+    pool = engine.pool
+    if isinstance(pool, InstrumentedQueuePool):
+        return pool.stats()
+    return {"pool_class": type(pool).__name__, "status": pool.status()}
+
+
 def init_db():
     """Инициализация базы данных"""
     # Импорт всех моделей для создания таблиц
     from app.models import user, course, module, lesson, assignment, test, payment, activity
-    
+
     # Создание всех таблиц
-    Base.metadata.create_all(bind=engine) 
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
\ No newline at end of file
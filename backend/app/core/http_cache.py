@@ -0,0 +1,65 @@
+"""
+Условные GET запросы (ETag / If-None-Match) и сериализация ответов
+"""
+
+import hashlib
+from functools import lru_cache
+from typing import Any, Iterable, Optional
+
+from fastapi import Request, Response, status
+from pydantic import TypeAdapter
+
+from app.core.config import settings
+
+
+@lru_cache(maxsize=128)
+def get_type_adapter(response_model: Any) -> TypeAdapter:
+    """TypeAdapter для модели ответа (создается один раз на модель)"""
+    return TypeAdapter(response_model)
+
+
+def dump_json(response_model: Any, value: Any) -> bytes:
+    """Сериализовать ORM объекты в JSON по модели ответа"""
+    adapter = get_type_adapter(response_model)
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+
+def make_etag(*parts: Any) -> str:
+    """Сильный ETag из значений, однозначно определяющих содержимое ответа"""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def make_objects_etag(kind: str, objects: Iterable[Any], *parts: Any) -> str:
+    """ETag для набора записей по их id и updated_at"""
+    versions = [f"{obj.id}@{obj.updated_at.isoformat() if obj.updated_at else ''}" for obj in objects]
+    return make_etag(kind, *parts, *versions)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Сравнить ETag с заголовком If-None-Match (слабое сравнение:
+    nginx при gzip сжатии превращает сильный ETag в слабый W/"...")
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def conditional_response(request: Request, etag: str, value: Any, response_model: Any) -> Response:
+    """Ответ 304 если у клиента актуальная версия, иначе JSON с ETag"""
+    headers = {
+        "ETag": etag,
+        "Cache-Control": settings.HTTP_CACHE_CONTROL,
+        "Vary": "Authorization",
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(
+        content=dump_json(response_model, value),
+        media_type="application/json",
+        headers=headers
+    )
@@ -0,0 +1,243 @@
+"""
+Очередь исходящих уведомлений
+Redis в продакшене, in-memory реализация для тестов и одного узла
+"""
+
+import asyncio
+import logging
+import random
+import socket
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationJob(BaseModel):
+    """Задача на доставку уведомления одним провайдером"""
+    id: str
+    notification_type: str
+    payload: Dict
+    attempts: int = 0
+    enqueued_at: float
+
+    @classmethod
+    def create(cls, notification_type: str, payload: Dict) -> "NotificationJob":
+        return cls(
+            id=uuid.uuid4().hex,
+            notification_type=notification_type,
+            payload=payload,
+            enqueued_at=time.time()
+        )
+
+
+def get_retry_delay(attempts: int) -> float:
+    """Экспоненциальная задержка перед повторной попыткой (с джиттером)"""
+    delay = settings.NOTIFICATION_RETRY_BASE_DELAY * (2 ** max(attempts - 1, 0))
+    delay = min(delay, settings.NOTIFICATION_RETRY_MAX_DELAY)
+    return delay * random.uniform(0.8, 1.2)
+
+
+class BaseNotificationQueue:
+    """Базовый класс очереди уведомлений"""
+
+    async def enqueue(self, job: NotificationJob, delay: float = 0) -> None:
+        """Поставить задачу в очередь"""
+        raise NotImplementedError
+
+    async def enqueue_many(self, jobs: List[NotificationJob]) -> None:
+        """Поставить несколько задач в очередь"""
+        for job in jobs:
+            await self.enqueue(job)
+
+    async def dequeue(self, notification_type: str, timeout: float = 1.0) -> Optional[NotificationJob]:
+        """Забрать задачу из очереди провайдера"""
+        raise NotImplementedError
+
+    async def ack(self, job: NotificationJob) -> None:
+        """Подтвердить успешную обработку задачи"""
+
+    async def retry(self, job: NotificationJob, delay: float) -> None:
+        """Вернуть задачу в очередь с задержкой"""
+        await self.ack(job)
+        await self.enqueue(job, delay=delay)
+
+    async def dead_letter(self, job: NotificationJob) -> None:
+        """Переместить задачу в очередь недоставленных"""
+        await self.ack(job)
+
+    async def promote_delayed(self) -> int:
+        """Перенести задачи с истекшей задержкой в рабочие очереди"""
+        return 0
+
+    async def recover(self) -> int:
+        """Вернуть в очередь задачи, зависшие после падения воркера"""
+        return 0
+
+    async def stats(self) -> Dict[str, int]:
+        """Размеры очередей"""
+        return {}
+
+    async def close(self) -> None:
+        """Закрыть соединения"""
+
+
+class InMemoryNotificationQueue(BaseNotificationQueue):
+    """Очередь в памяти процесса (тесты и развертывание на одном узле)"""
+
+    def __init__(self):
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._delayed: List[tuple] = []
+        self.dead_letters: List[NotificationJob] = []
+
+    def _get_queue(self, notification_type: str) -> asyncio.Queue:
+        if notification_type not in self._queues:
+            self._queues[notification_type] = asyncio.Queue()
+        return self._queues[notification_type]
+
+    async def enqueue(self, job: NotificationJob, delay: float = 0) -> None:
+        if delay > 0:
+            self._delayed.append((time.time() + delay, job))
+        else:
+            self._get_queue(job.notification_type).put_nowait(job)
+
+    async def dequeue(self, notification_type: str, timeout: float = 1.0) -> Optional[NotificationJob]:
+        try:
+            return await asyncio.wait_for(self._get_queue(notification_type).get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def dead_letter(self, job: NotificationJob) -> None:
+        self.dead_letters.append(job)
+
+    async def promote_delayed(self) -> int:
+        now = time.time()
+        due = [job for ready_at, job in self._delayed if ready_at <= now]
+        self._delayed = [(ready_at, job) for ready_at, job in self._delayed if ready_at > now]
+        for job in due:
+            self._get_queue(job.notification_type).put_nowait(job)
+        return len(due)
+
+    async def stats(self) -> Dict[str, int]:
+        result = {name: queue.qsize() for name, queue in self._queues.items()}
+        result["delayed"] = len(self._delayed)
+        result["dead"] = len(self.dead_letters)
+        return result
+
+
+class RedisNotificationQueue(BaseNotificationQueue):
+    """
+    Очередь на Redis.
+
+    Задача перемещается из рабочего списка в список обработки воркера
+    (BLMOVE) и удаляется из него только после подтверждения, поэтому
+    задачи упавшего воркера возвращаются в очередь при его перезапуске.
+    """
+
+    prefix = "notifications"
+
+    def __init__(self, redis_url: str = settings.REDIS_URL, worker_name: Optional[str] = None):
+        import redis.asyncio as redis
+
+        self.redis = redis.from_url(redis_url, decode_responses=True)
+        self.worker_name = worker_name or settings.NOTIFICATION_WORKER_NAME or socket.gethostname()
+        self._raw: Dict[str, str] = {}
+
+    def _queue_key(self, notification_type: str) -> str:
+        return f"{self.prefix}:queue:{notification_type}"
+
+    def _processing_key(self, notification_type: str) -> str:
+        return f"{self.prefix}:processing:{notification_type}:{self.worker_name}"
+
+    @property
+    def _delayed_key(self) -> str:
+        return f"{self.prefix}:delayed"
+
+    @property
+    def _dead_key(self) -> str:
+        return f"{self.prefix}:dead"
+
+    async def enqueue(self, job: NotificationJob, delay: float = 0) -> None:
+        data = job.model_dump_json()
+        if delay > 0:
+            await self.redis.zadd(self._delayed_key, {data: time.time() + delay})
+        else:
+            await self.redis.lpush(self._queue_key(job.notification_type), data)
+
+    async def enqueue_many(self, jobs: List[NotificationJob]) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for job in jobs:
+                pipe.lpush(self._queue_key(job.notification_type), job.model_dump_json())
+            await pipe.execute()
+
+    async def dequeue(self, notification_type: str, timeout: float = 1.0) -> Optional[NotificationJob]:
+        data = await self.redis.blmove(
+            self._queue_key(notification_type),
+            self._processing_key(notification_type),
+            timeout,
+            "RIGHT",
+            "LEFT"
+        )
+        if data is None:
+            return None
+        job = NotificationJob.model_validate_json(data)
+        self._raw[job.id] = data
+        return job
+
+    async def ack(self, job: NotificationJob) -> None:
+        data = self._raw.pop(job.id, None)
+        if data is not None:
+            await self.redis.lrem(self._processing_key(job.notification_type), 1, data)
+
+    async def dead_letter(self, job: NotificationJob) -> None:
+        await self.ack(job)
+        await self.redis.lpush(self._dead_key, job.model_dump_json())
+
+    async def promote_delayed(self) -> int:
+        due = await self.redis.zrangebyscore(self._delayed_key, 0, time.time(), start=0, num=500)
+        promoted = 0
+        for data in due:
+            # ZREM гарантирует, что задачу перенесет только один воркер
+            if await self.redis.zrem(self._delayed_key, data):
+                job = NotificationJob.model_validate_json(data)
+                await self.redis.lpush(self._queue_key(job.notification_type), data)
+                promoted += 1
+        return promoted
+
+    async def recover(self) -> int:
+        recovered = 0
+        pattern = f"{self.prefix}:processing:*:{self.worker_name}"
+        async for key in self.redis.scan_iter(match=pattern):
+            notification_type = key.split(":")[2]
+            while await self.redis.lmove(key, self._queue_key(notification_type), "RIGHT", "LEFT"):
+                recovered += 1
+        if recovered:
+            logger.warning(f"Recovered {recovered} unacknowledged notification jobs")
+        return recovered
+
+    async def stats(self) -> Dict[str, int]:
+        result = {}
+        async for key in self.redis.scan_iter(match=f"{self.prefix}:queue:*"):
+            result[key.split(":")[2]] = await self.redis.llen(key)
+        result["delayed"] = await self.redis.zcard(self._delayed_key)
+        result["dead"] = await self.redis.llen(self._dead_key)
+        return result
+
+    async def close(self) -> None:
+        await self.redis.close()
+
+
+def create_notification_queue() -> BaseNotificationQueue:
+    """Создать очередь согласно настройкам"""
+    if settings.NOTIFICATION_QUEUE_BACKEND == "redis":
+        return RedisNotificationQueue()
+    return InMemoryNotificationQueue()
+
+
+# Глобальная очередь уведомлений
+notification_queue = create_notification_queue()
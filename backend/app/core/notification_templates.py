@@ -0,0 +1,49 @@
+"""
+Компиляция шаблонов уведомлений
+Шаблоны используют подстановки вида {name}
+"""
+
+import re
+from functools import lru_cache
+from typing import Any, Mapping
+
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+
+class CompiledTemplate:
+    """
+    Шаблон, заранее разобранный на литералы и поля.
+
+    Рендеринг - один проход со склейкой частей вместо str.replace
+    на каждый ключ. Поля, для которых нет значения, остаются в тексте
+    как есть, чтобы их мог подставить следующий этап (провайдер).
+    """
+
+    __slots__ = ("source", "fields", "_literals")
+
+    def __init__(self, source: str):
+        parts = _PLACEHOLDER.split(source)
+        self.source = source
+        self._literals = parts[0::2]
+        self.fields = tuple(parts[1::2])
+
+    def render(self, values: Mapping[str, Any]) -> str:
+        """Подставить значения в шаблон"""
+        if not self.fields:
+            return self.source
+
+        literals = self._literals
+        chunks = [literals[0]]
+        for index, field in enumerate(self.fields, start=1):
+            if field in values:
+                chunks.append(str(values[field]))
+            else:
+                chunks.append("{" + field + "}")
+            chunks.append(literals[index])
+        return "".join(chunks)
+
+
+@lru_cache(maxsize=4096)
+def compile_template(source: str) -> CompiledTemplate:
+    """Скомпилировать шаблон (результат кэшируется по тексту шаблона)"""
+    return CompiledTemplate(source)
@@ -0,0 +1,155 @@
+"""
+Воркер доставки уведомлений из очереди
+Запуск отдельным процессом: python -m app.core.notification_worker
+"""
+
+import asyncio
+import logging
+import signal
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.core.notification_queue import (
+    BaseNotificationQueue,
+    NotificationJob,
+    get_retry_delay,
+    notification_queue,
+)
+from app.core.notifications import NotificationManager, NotificationType, notification_manager
+from app.core.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+def get_provider_concurrency() -> Dict[NotificationType, int]:
+    """Количество параллельных обработчиков для каждого провайдера"""
+    return {
+        NotificationType.EMAIL: settings.NOTIFICATION_EMAIL_CONCURRENCY,
+        NotificationType.TELEGRAM: settings.NOTIFICATION_TELEGRAM_CONCURRENCY,
+        NotificationType.INTERNAL: settings.NOTIFICATION_INTERNAL_CONCURRENCY,
+    }
+
+
+def get_provider_rate_limits() -> Dict[NotificationType, TokenBucket]:
+    """
+    Лимиты скорости отправки внешних провайдеров.
+    Telegram ограничивается в самом провайдере (глобально и по чатам).
+    """
+    return {
+        NotificationType.EMAIL: TokenBucket(settings.NOTIFICATION_EMAIL_RATE_LIMIT),
+    }
+
+
+class NotificationWorker:
+    """Пул обработчиков, разбирающих очередь уведомлений"""
+
+    def __init__(
+        self,
+        queue: BaseNotificationQueue = notification_queue,
+        manager: NotificationManager = notification_manager,
+        concurrency: Optional[Dict[NotificationType, int]] = None,
+        rate_limits: Optional[Dict[NotificationType, TokenBucket]] = None
+    ):
+        self.queue = queue
+        self.manager = manager
+        self.concurrency = concurrency or get_provider_concurrency()
+        self.rate_limits = rate_limits if rate_limits is not None else get_provider_rate_limits()
+        self._tasks: List[asyncio.Task] = []
+        self._running = False
+        self.stats = {"delivered": 0, "retried": 0, "dead": 0}
+
+    async def start(self) -> None:
+        """Запустить обработчики"""
+        if self._running:
+            return
+        self._running = True
+        await self.queue.recover()
+
+        for notification_type, workers in self.concurrency.items():
+            for _ in range(workers):
+                self._tasks.append(asyncio.create_task(self._consume(notification_type)))
+        self._tasks.append(asyncio.create_task(self._promote_delayed()))
+        logger.info(f"Notification worker started: {dict((t.value, n) for t, n in self.concurrency.items())}")
+
+    async def stop(self) -> None:
+        """Остановить обработчики, дождавшись текущих отправок"""
+        self._running = False
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Notification worker stopped")
+
+    async def _consume(self, notification_type: NotificationType) -> None:
+        while self._running:
+            try:
+                job = await self.queue.dequeue(notification_type.value, timeout=1.0)
+            except Exception as e:
+                logger.error(f"Failed to dequeue {notification_type.value} notification: {e}")
+                await asyncio.sleep(1)
+                continue
+            if job is None:
+                continue
+            try:
+                await self._process(job)
+            except Exception as e:
+                # Сбой ack/retry/dead_letter не должен останавливать обработчик канала;
+                # неподтвержденная задача Redis-очереди вернется через recover
+                logger.error(f"Failed to process {notification_type.value} notification job {job.id}: {e}")
+                await asyncio.sleep(1)
+
+    async def _process(self, job: NotificationJob) -> None:
+        rate_limit = self.rate_limits.get(NotificationType(job.notification_type))
+        if rate_limit is not None:
+            await rate_limit.acquire()
+
+        job.attempts += 1
+        try:
+            delivered = await self.manager.deliver(job.payload)
+        except Exception as e:
+            logger.error(f"Notification job {job.id} crashed: {e}")
+            delivered = False
+
+        if delivered:
+            await self.queue.ack(job)
+            self.stats["delivered"] += 1
+        elif job.attempts < settings.NOTIFICATION_MAX_RETRIES:
+            delay = get_retry_delay(job.attempts)
+            await self.queue.retry(job, delay=delay)
+            self.stats["retried"] += 1
+            logger.warning(
+                f"Notification job {job.id} ({job.notification_type}) failed, "
+                f"retry {job.attempts}/{settings.NOTIFICATION_MAX_RETRIES} in {delay:.1f}s"
+            )
+        else:
+            await self.queue.dead_letter(job)
+            self.stats["dead"] += 1
+            logger.error(f"Notification job {job.id} ({job.notification_type}) moved to dead letters")
+
+    async def _promote_delayed(self) -> None:
+        while self._running:
+            try:
+                await self.queue.promote_delayed()
+            except Exception as e:
+                logger.error(f"Failed to promote delayed notifications: {e}")
+            await asyncio.sleep(1)
+
+
+async def run_worker() -> None:
+    """Запустить воркер до получения SIGINT/SIGTERM"""
+    worker = NotificationWorker()
+    stop_event = asyncio.Event()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    await notification_manager.start()
+    await worker.start()
+    await stop_event.wait()
+    await worker.stop()
+    await notification_manager.close()
+    await notification_queue.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=settings.LOG_LEVEL)
+    asyncio.run(run_worker())
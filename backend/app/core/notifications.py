@@ -5,21 +5,26 @@
 
 import asyncio
 import logging
-from typing import Optional, List, Dict, Any
+import time
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, AsyncIterator, Callable
 from enum import Enum
 from datetime import datetime
 
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import aiohttp
 from pydantic import BaseModel
 
 from app.core.config import settings
+from app.core.notification_queue import BaseNotificationQueue, NotificationJob, notification_queue
+from app.core.notification_templates import compile_template
+from app.core.rate_limit import TokenBucket
+from app.core.smtp_pool import SMTPConnectionPool
 from app.models.user import User
-from app.models.notification import Notification
-from app.crud.notification import notification_crud
-from app.core.database import get_db
+from app.crud.notification import async_notification_crud
+from app.crud.user import async_user_crud
+from app.core.database import AsyncSessionLocal
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +40,7 @@ class NotificationTemplate(str, Enum):
     """Шаблоны уведомлений"""
     WELCOME = "welcome"
     COURSE_ACCESS_GRANTED = "course_access_granted"
+    COURSE_ACCESS_EXPIRED = "course_access_expired"
     LESSON_COMPLETED = "lesson_completed"
     ASSIGNMENT_SUBMITTED = "assignment_submitted"
     TEST_COMPLETED = "test_completed"
@@ -56,30 +62,68 @@ class NotificationData(BaseModel):
     priority: int = 1  # 1-5, где 5 - высший приоритет
 
 
+class BulkNotificationData(BaseModel):
+    """Одно уведомление для группы пользователей (пакетная доставка)"""
+    user_ids: List[int]
+    notification_type: NotificationType
+    template: NotificationTemplate
+    subject: str
+    message: str
+    data: Optional[Dict[str, Any]] = None
+    priority: int = 1
+
+
 class BaseNotificationProvider:
     """Базовый класс для провайдеров уведомлений"""
     
+    # Провайдер умеет доставлять уведомление группе пользователей за раз
+    supports_bulk = False
+    
     async def send(self, notification_data: NotificationData) -> bool:
         """Отправить уведомление"""
         raise NotImplementedError
+    
+    async def send_many(self, bulk_data: BulkNotificationData) -> bool:
+        """Отправить уведомление группе пользователей"""
+        raise NotImplementedError
+    
+    async def start(self) -> None:
+        """Подготовить ресурсы провайдера"""
+    
+    async def close(self) -> None:
+        """Освободить ресурсы провайдера"""
+    
+    async def get_user(self, user_id: int) -> Optional[User]:
+        """Получить получателя через асинхронную сессию (не блокирует цикл событий)"""
+        async with AsyncSessionLocal() as db:
+            return await async_user_crud.get(db, id=user_id)
 
 
 class EmailNotificationProvider(BaseNotificationProvider):
     """Провайдер для Email уведомлений"""
     
     def __init__(self):
-        self.smtp_server = settings.SMTP_SERVER
-        self.smtp_port = settings.SMTP_PORT
-        self.smtp_username = settings.SMTP_USERNAME
-        self.smtp_password = settings.SMTP_PASSWORD
         self.from_email = settings.FROM_EMAIL
+        self._pool: Optional[SMTPConnectionPool] = None
+    
+    @property
+    def pool(self) -> SMTPConnectionPool:
+        """Пул SMTP соединений (создается при первой отправке)"""
+        if self._pool is None:
+            self._pool = SMTPConnectionPool()
+        return self._pool
+    
+    async def close(self) -> None:
+        """Закрыть SMTP соединения"""
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
     
     async def send(self, notification_data: NotificationData) -> bool:
         """Отправить Email уведомление"""
         try:
             # Получаем данные пользователя
-            db = next(get_db())
-            user = db.query(User).filter(User.id == notification_data.user_id).first()
+            user = await self.get_user(notification_data.user_id)
             if not user or not user.email:
                 logger.warning(f"User {notification_data.user_id} not found or has no email")
                 return False
@@ -99,11 +143,8 @@ class EmailNotificationProvider(BaseNotificationProvider):
             
             msg.attach(MIMEText(formatted_message, 'html'))
             
-            # Отправляем через SMTP
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_username, self.smtp_password)
-                server.send_message(msg)
+            # Отправляем через пул SMTP соединений
+            await self.pool.send_message(msg)
             
             logger.info(f"Email sent to {user.email}: {notification_data.subject}")
             return True
@@ -114,16 +155,10 @@ class EmailNotificationProvider(BaseNotificationProvider):
     
     def _format_message(self, template: str, user: User, data: Optional[Dict[str, Any]] = None) -> str:
         """Форматировать сообщение с данными пользователя"""
-        # Простая замена переменных в шаблоне
-        message = template
-        message = message.replace("{user_name}", user.full_name or user.username)
-        message = message.replace("{user_email}", user.email)
-        
-        if data:
-            for key, value in data.items():
-                message = message.replace(f"{{{key}}}", str(value))
-        
-        return message
+        values = dict(data) if data else {}
+        values["user_name"] = user.full_name or user.username
+        values["user_email"] = user.email
+        return compile_template(template).render(values)
 
 
 class TelegramNotificationProvider(BaseNotificationProvider):
@@ -132,13 +167,55 @@ class TelegramNotificationProvider(BaseNotificationProvider):
     def __init__(self):
         self.bot_token = settings.TELEGRAM_BOT_TOKEN
         self.api_url = f"https://api.telegram.org/bot{self.bot_token}"
+        self._session: Optional[aiohttp.ClientSession] = None
+        
+        # Лимиты Bot API: глобальный и на отдельный чат
+        self.global_rate_limit = TokenBucket(settings.TELEGRAM_GLOBAL_RATE_LIMIT)
+        self._chat_rate_limits: "OrderedDict[str, TokenBucket]" = OrderedDict()
+    
+    async def start(self) -> None:
+        """Открыть общую HTTP сессию на все время жизни приложения"""
+        if self._session is not None and not self._session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=settings.TELEGRAM_CONNECTION_LIMIT,
+            ttl_dns_cache=settings.TELEGRAM_DNS_CACHE_TTL,
+            keepalive_timeout=settings.TELEGRAM_KEEPALIVE_TIMEOUT
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=settings.TELEGRAM_REQUEST_TIMEOUT)
+        )
+    
+    async def close(self) -> None:
+        """Закрыть HTTP сессию"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+    
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Общая HTTP сессия (открывается при первом использовании, если не открыта в startup)"""
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
+    
+    def _get_chat_rate_limit(self, chat_id: str) -> TokenBucket:
+        """Лимит сообщений для конкретного чата"""
+        bucket = self._chat_rate_limits.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(settings.TELEGRAM_CHAT_RATE_LIMIT, capacity=1)
+            self._chat_rate_limits[chat_id] = bucket
+            if len(self._chat_rate_limits) > settings.TELEGRAM_CHAT_LIMITS_CACHE_SIZE:
+                self._chat_rate_limits.popitem(last=False)
+        else:
+            self._chat_rate_limits.move_to_end(chat_id)
+        return bucket
     
     async def send(self, notification_data: NotificationData) -> bool:
         """Отправить Telegram уведомление"""
         try:
             # Получаем данные пользователя
-            db = next(get_db())
-            user = db.query(User).filter(User.id == notification_data.user_id).first()
+            user = await self.get_user(notification_data.user_id)
             if not user or not user.telegram_chat_id:
                 logger.warning(f"User {notification_data.user_id} not found or has no telegram_chat_id")
                 return False
@@ -150,21 +227,30 @@ class TelegramNotificationProvider(BaseNotificationProvider):
                 notification_data.data
             )
             
+            await self._get_chat_rate_limit(user.telegram_chat_id).acquire()
+            await self.global_rate_limit.acquire()
+            
             # Отправляем через Telegram API
-            async with aiohttp.ClientSession() as session:
-                payload = {
-                    'chat_id': user.telegram_chat_id,
-                    'text': formatted_message,
-                    'parse_mode': 'HTML'
-                }
-                
-                async with session.post(f"{self.api_url}/sendMessage", json=payload) as response:
-                    if response.status == 200:
-                        logger.info(f"Telegram message sent to user {notification_data.user_id}")
-                        return True
-                    else:
-                        logger.error(f"Telegram API error: {response.status}")
-                        return False
+            session = await self.get_session()
+            payload = {
+                'chat_id': user.telegram_chat_id,
+                'text': formatted_message,
+                'parse_mode': 'HTML'
+            }
+            
+            async with session.post(f"{self.api_url}/sendMessage", json=payload) as response:
+                if response.status == 200:
+                    logger.info(f"Telegram message sent to user {notification_data.user_id}")
+                    return True
+                if response.status == 429:
+                    # Превышен лимит: ждем retry_after, задача вернется в очередь
+                    body = await response.json(content_type=None)
+                    retry_after = body.get("parameters", {}).get("retry_after", 1)
+                    logger.warning(f"Telegram rate limit hit, retry after {retry_after}s")
+                    await asyncio.sleep(retry_after)
+                    return False
+                logger.error(f"Telegram API error: {response.status}")
+                return False
                         
         except Exception as e:
             logger.error(f"Failed to send Telegram message to user {notification_data.user_id}: {e}")
@@ -172,52 +258,67 @@ class TelegramNotificationProvider(BaseNotificationProvider):
     
     def _format_message(self, template: str, user: User, data: Optional[Dict[str, Any]] = None) -> str:
         """Форматировать сообщение для Telegram"""
-        message = template
-        message = message.replace("{user_name}", user.full_name or user.username)
-        
-        if data:
-            for key, value in data.items():
-                message = message.replace(f"{{{key}}}", str(value))
-        
-        return message
+        values = dict(data) if data else {}
+        values["user_name"] = user.full_name or user.username
+        return compile_template(template).render(values)
 
 
 class InternalNotificationProvider(BaseNotificationProvider):
     """Провайдер для внутренних уведомлений"""
     
+    supports_bulk = True
+    
+    def __init__(self):
+        self.stats = {"batches": 0, "rows": 0, "seconds": 0.0}
+    
     async def send(self, notification_data: NotificationData) -> bool:
         """Создать внутреннее уведомление"""
+        return await self.send_many(BulkNotificationData(
+            user_ids=[notification_data.user_id],
+            **notification_data.model_dump(exclude={"user_id"})
+        ))
+    
+    async def send_many(self, bulk_data: BulkNotificationData) -> bool:
+        """Создать внутренние уведомления пачкой (один INSERT на пачку)"""
+        created_at = datetime.utcnow()
+        rows = [
+            {
+                "user_id": user_id,
+                "title": bulk_data.subject,
+                "message": bulk_data.message,
+                "notification_type": bulk_data.notification_type.value,
+                "data": bulk_data.data,
+                "priority": bulk_data.priority,
+                "is_read": False,
+                "created_at": created_at
+            }
+            for user_id in bulk_data.user_ids
+        ]
+        
+        started = time.perf_counter()
         try:
-            db = next(get_db())
-            
-            # Создаем запись в базе данных
-            notification = Notification(
-                user_id=notification_data.user_id,
-                title=notification_data.subject,
-                message=notification_data.message,
-                notification_type=notification_data.notification_type.value,
-                data=notification_data.data,
-                priority=notification_data.priority,
-                is_read=False,
-                created_at=datetime.utcnow()
-            )
-            
-            db.add(notification)
-            db.commit()
-            db.refresh(notification)
-            
-            logger.info(f"Internal notification created for user {notification_data.user_id}")
-            return True
-            
+            async with AsyncSessionLocal() as db:
+                ids = await async_notification_crud.create_many(db, objs_in=rows)
         except Exception as e:
-            logger.error(f"Failed to create internal notification for user {notification_data.user_id}: {e}")
+            logger.error(f"Failed to create {len(rows)} internal notifications: {e}")
             return False
+        elapsed = time.perf_counter() - started
+        
+        self.stats["batches"] += 1
+        self.stats["rows"] += len(ids)
+        self.stats["seconds"] += elapsed
+        logger.info(
+            f"Internal notifications created: {len(ids)} rows in {elapsed * 1000:.1f} ms "
+            f"({len(ids) / elapsed if elapsed else 0:.0f} rows/s)"
+        )
+        return True
 
 
 class NotificationManager:
     """Менеджер уведомлений"""
     
-    def __init__(self):
+    def __init__(self, queue: BaseNotificationQueue = notification_queue):
+        self.queue = queue
         self.providers = {
             NotificationType.EMAIL: EmailNotificationProvider(),
             NotificationType.TELEGRAM: TelegramNotificationProvider(),
@@ -249,6 +350,14 @@ class NotificationManager:
                 <p>Начните обучение прямо сейчас!</p>
                 """
             },
+            NotificationTemplate.COURSE_ACCESS_EXPIRED: {
+                "subject": "Доступ к курсу истек",
+                "message": """
+                <h2>Срок доступа истек</h2>
+                <p>Срок вашего доступа к курсу "{course_name}" закончился.</p>
+                <p>Чтобы продолжить обучение, продлите доступ.</p>
+                """
+            },
             NotificationTemplate.LESSON_COMPLETED: {
                 "subject": "Урок завершен",
                 "message": """
@@ -313,6 +422,77 @@ class NotificationManager:
                 """
             }
         }
+        
+        # Шаблоны компилируются один раз, результаты рендеринга кэшируются
+        self.compiled_templates = {
+            template: (
+                compile_template(template_data["subject"]),
+                compile_template(template_data["message"])
+            )
+            for template, template_data in self.templates.items()
+        }
+        self._render_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+    
+    def _render(
+        self,
+        template: NotificationTemplate,
+        data: Optional[Dict[str, Any]] = None
+    ) -> Optional[tuple]:
+        """Получить тему и текст уведомления по шаблону"""
+        compiled = self.compiled_templates.get(template)
+        if not compiled:
+            logger.error(f"Template {template} not found")
+            return None
+        
+        values = data or {}
+        cache_key = (template, tuple(sorted((key, str(value)) for key, value in values.items())))
+        rendered = self._render_cache.get(cache_key)
+        if rendered is not None:
+            self._render_cache.move_to_end(cache_key)
+            return rendered
+        
+        subject_template, message_template = compiled
+        rendered = (subject_template.render(values), message_template.render(values))
+        
+        self._render_cache[cache_key] = rendered
+        if len(self._render_cache) > settings.NOTIFICATION_RENDER_CACHE_SIZE:
+            self._render_cache.popitem(last=False)
+        return rendered
+    
+    def _build_jobs(
+        self,
+        user_id: int,
+        template: NotificationTemplate,
+        notification_types: List[NotificationType],
+        subject: str,
+        message: str,
+        data: Optional[Dict[str, Any]],
+        priority: int
+    ) -> tuple:
+        """Подготовить задачи очереди для пользователя (по одной на провайдер)"""
+        results = {}
+        jobs = []
+        for notification_type in notification_types:
+            if notification_type not in self.providers:
+                logger.warning(f"Provider for {notification_type} not found")
+                results[notification_type] = False
+                continue
+            
+            notification_data = NotificationData(
+                user_id=user_id,
+                notification_type=notification_type,
+                template=template,
+                subject=subject,
+                message=message,
+                data=data,
+                priority=priority
+            )
+            jobs.append(NotificationJob.create(
+                notification_type.value,
+                notification_data.model_dump(mode="json")
+            ))
+            results[notification_type] = True
+        return results, jobs
     
     async def send_notification(
         self,
@@ -327,101 +507,213 @@ class NotificationManager:
         if notification_types is None:
             notification_types = [NotificationType.INTERNAL]
         
-        # Получаем шаблон
-        template_data = self.templates.get(template)
-        if not template_data:
-            logger.error(f"Template {template} not found")
+        rendered = self._render(template, data)
+        if rendered is None:
             return {}
+        subject, message = rendered
         
-        # Форматируем сообщение
-        subject = template_data["subject"]
-        message = template_data["message"]
-        
-        if data:
-            for key, value in data.items():
-                subject = subject.replace(f"{{{key}}}", str(value))
-                message = message.replace(f"{{{key}}}", str(value))
-        
-        # Создаем данные уведомления
-        notification_data = NotificationData(
-            user_id=user_id,
-            notification_type=NotificationType.INTERNAL,  # Будет переопределено для каждого провайдера
-            template=template,
-            subject=subject,
-            message=message,
-            data=data,
-            priority=priority
+        # Ставим в очередь по задаче на каждый провайдер,
+        # доставку выполняет воркер (app.core.notification_worker)
+        results, jobs = self._build_jobs(
+            user_id, template, notification_types, subject, message, data, priority
         )
-        
-        # Отправляем через все указанные провайдеры
-        results = {}
-        for notification_type in notification_types:
-            provider = self.providers.get(notification_type)
-            if provider:
-                notification_data.notification_type = notification_type
-                results[notification_type] = await provider.send(notification_data)
-            else:
-                logger.warning(f"Provider for {notification_type} not found")
-                results[notification_type] = False
+        try:
+            await self.queue.enqueue_many(jobs)
+        except Exception as e:
+            logger.error(f"Failed to enqueue notifications for user {user_id}: {e}")
+            return {notification_type: False for notification_type in results}
         
         return results
     
+    async def deliver(self, payload: Dict[str, Any]) -> bool:
+        """Доставить уведомление из очереди через соответствующий провайдер"""
+        if "user_ids" in payload:
+            bulk_data = BulkNotificationData.model_validate(payload)
+            provider = self.providers.get(bulk_data.notification_type)
+            if not provider or not provider.supports_bulk:
+                logger.warning(f"Bulk provider for {bulk_data.notification_type} not found")
+                return False
+            return await provider.send_many(bulk_data)
+        
+        notification_data = NotificationData.model_validate(payload)
+        provider = self.providers.get(notification_data.notification_type)
+        if not provider:
+            logger.warning(f"Provider for {notification_data.notification_type} not found")
+            return False
+        return await provider.send(notification_data)
+    
+    async def start(self) -> None:
+        """Подготовить ресурсы провайдеров (общая сессия aiohttp для Telegram)"""
+        for provider in self.providers.values():
+            await provider.start()
+    
+    async def close(self) -> None:
+        """Освободить ресурсы провайдеров (в том числе пул SMTP соединений)"""
+        for notification_type, provider in self.providers.items():
+            try:
+                await provider.close()
+            except Exception as e:
+                logger.error(f"Failed to close {notification_type.value} provider: {e}")
+    
     async def send_bulk_notification(
         self,
         user_ids: List[int],
         template: NotificationTemplate,
         notification_types: List[NotificationType] = None,
         data: Optional[Dict[str, Any]] = None,
-        priority: int = 1
+        priority: int = 1,
+        progress_callback: Optional[Callable[[int, int], Any]] = None
     ) -> Dict[int, Dict[NotificationType, bool]]:
-        """Отправить уведомление нескольким пользователям"""
+        """
+        Отправить уведомление нескольким пользователям.
+        
+        Получатели обрабатываются пачками по NOTIFICATION_BULK_CHUNK_SIZE,
+        не более NOTIFICATION_BULK_CONCURRENCY пачек одновременно;
+        задачи пачки строятся только когда она взята в работу, поэтому
+        в памяти одновременно не больше задач, чем в этих пачках.
+        Скорость доставки ограничивает воркер (лимиты провайдеров).
+        Провайдеры с пакетной доставкой (внутренние уведомления)
+        получают одну задачу на пачку вместо задачи на пользователя.
+        """
+        
+        if notification_types is None:
+            notification_types = [NotificationType.INTERNAL]
+        
+        rendered = self._render(template, data)
+        if rendered is None:
+            return {}
+        subject, message = rendered
+        
+        bulk_types = [
+            notification_type for notification_type in notification_types
+            if notification_type in self.providers and self.providers[notification_type].supports_bulk
+        ]
+        per_user_types = [
+            notification_type for notification_type in notification_types
+            if notification_type not in bulk_types
+        ]
         
         results = {}
-        tasks = []
+        total = len(user_ids)
+        processed = 0
+        chunk_size = settings.NOTIFICATION_BULK_CHUNK_SIZE
         
-        for user_id in user_ids:
-            task = self.send_notification(
-                user_id=user_id,
-                template=template,
-                notification_types=notification_types,
-                data=data,
-                priority=priority
-            )
-            tasks.append((user_id, task))
+        async def enqueue_chunk(chunk: List[int]) -> None:
+            nonlocal processed
+            chunk_results = {}
+            chunk_jobs = []
+            for user_id in chunk:
+                user_results, jobs = self._build_jobs(
+                    user_id, template, per_user_types, subject, message, data, priority
+                )
+                for notification_type in bulk_types:
+                    user_results[notification_type] = True
+                chunk_results[user_id] = user_results
+                chunk_jobs.extend(jobs)
+            for notification_type in bulk_types:
+                bulk_data = BulkNotificationData(
+                    user_ids=chunk,
+                    notification_type=notification_type,
+                    template=template,
+                    subject=subject,
+                    message=message,
+                    data=data,
+                    priority=priority
+                )
+                chunk_jobs.append(NotificationJob.create(
+                    notification_type.value,
+                    bulk_data.model_dump(mode="json")
+                ))
+            
+            try:
+                await self.queue.enqueue_many(chunk_jobs)
+            except Exception as e:
+                logger.error(f"Failed to enqueue bulk notifications chunk: {e}")
+                chunk_results = {
+                    user_id: {notification_type: False for notification_type in user_results}
+                    for user_id, user_results in chunk_results.items()
+                }
+            
+            results.update(chunk_results)
+            processed += len(chunk)
+            logger.info(f"Bulk notification {template.value}: {processed}/{total} recipients enqueued")
+            if progress_callback:
+                progress_callback(processed, total)
         
-        # Выполняем все задачи асинхронно
-        for user_id, task in tasks:
-            results[user_id] = await task
+        pending = set()
+        for i in range(0, total, chunk_size):
+            if len(pending) >= settings.NOTIFICATION_BULK_CONCURRENCY:
+                _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            pending.add(asyncio.create_task(enqueue_chunk(user_ids[i:i + chunk_size])))
+        if pending:
+            await asyncio.gather(*pending)
         
         return results
     
+    async def _iter_recipient_chunks(
+        self,
+        user_ids: Optional[List[int]] = None
+    ) -> AsyncIterator[List[int]]:
+        """Получатели пачками: из списка или потоком активных пользователей из БД"""
+        chunk_size = settings.NOTIFICATION_BULK_CHUNK_SIZE
+        if user_ids is not None:
+            for i in range(0, len(user_ids), chunk_size):
+                yield user_ids[i:i + chunk_size]
+            return
+        
+        async with AsyncSessionLocal() as db:
+            async for chunk in async_user_crud.iter_active_ids(db, chunk_size=chunk_size):
+                yield chunk
+    
     async def send_system_announcement(
         self,
         title: str,
         content: str,
         user_ids: Optional[List[int]] = None,
         notification_types: List[NotificationType] = None
-    ) -> Dict[int, Dict[NotificationType, bool]]:
-        """Отправить системное объявление"""
+    ) -> Dict[str, int]:
+        """
+        Отправить системное объявление.
+        
+        Если user_ids не указан, получатели - все активные пользователи.
+        Их id читаются из БД пачками и ставятся в очередь по мере чтения
+        (не более NOTIFICATION_BULK_CONCURRENCY пачек одновременно),
+        поэтому полный список получателей в памяти не строится.
+        Возвращает сводку по числу получателей и задач.
+        """
         
         data = {
             "announcement_title": title,
             "announcement_content": content
         }
+        summary = {"recipients": 0, "enqueued": 0, "failed": 0}
+        
+        async def enqueue_chunk(chunk: List[int]) -> None:
+            results = await self.send_bulk_notification(
+                user_ids=chunk,
+                template=NotificationTemplate.SYSTEM_ANNOUNCEMENT,
+                notification_types=notification_types,
+                data=data,
+                priority=5  # Высокий приоритет для системных объявлений
+            )
+            summary["recipients"] += len(chunk)
+            for user_results in results.values():
+                for enqueued in user_results.values():
+                    summary["enqueued" if enqueued else "failed"] += 1
         
-        # Если user_ids не указан, отправляем всем активным пользователям
-        if user_ids is None:
-            db = next(get_db())
-            users = db.query(User).filter(User.is_active == True).all()
-            user_ids = [user.id for user in users]
+        pending = set()
+        async for chunk in self._iter_recipient_chunks(user_ids):
+            if len(pending) >= settings.NOTIFICATION_BULK_CONCURRENCY:
+                _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            pending.add(asyncio.create_task(enqueue_chunk(chunk)))
+        if pending:
+            await asyncio.gather(*pending)
         
-        return await self.send_bulk_notification(
-            user_ids=user_ids,
-            template=NotificationTemplate.SYSTEM_ANNOUNCEMENT,
-            notification_types=notification_types,
-            data=data,
-            priority=5  # Высокий приоритет для системных объявлений
+        logger.info(
+            f"System announcement enqueued: {summary['recipients']} recipients, "
+            f"{summary['enqueued']} jobs, {summary['failed']} failed"
         )
+        return summary
 
 
 # Глобальный экземпляр менеджера уведомлений
@@ -0,0 +1,54 @@
+"""
+Keyset (курсорная) пагинация по (created_at, id)
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, NamedTuple, Optional, Sequence
+
+from fastapi import Response
+
+# Заголовок ответа с курсором следующей страницы
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageCursor(NamedTuple):
+    """Позиция в списке: последняя запись предыдущей страницы (пустая - первая страница)"""
+    created_at: Optional[datetime] = None
+    id: Optional[int] = None
+
+    @property
+    def is_first_page(self) -> bool:
+        return self.id is None
+
+
+def encode_cursor(obj: Any) -> str:
+    """Непрозрачный токен курсора для записи"""
+    raw = json.dumps([obj.created_at.isoformat(), obj.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> PageCursor:
+    """Разобрать токен курсора; ValueError если токен поврежден"""
+    if not token:
+        return PageCursor()
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        created_at, id = json.loads(raw)
+        return PageCursor(datetime.fromisoformat(created_at), int(id))
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def set_next_cursor(
+    response: Response, items: Sequence[Any], limit: Optional[int], cursor: Optional[PageCursor]
+) -> None:
+    """
+    Передать курсор следующей страницы в заголовке X-Next-Cursor.
+    Только в режиме курсора: при skip/limit страница отсортирована
+    не по (created_at, id), и курсор по ее последней записи пропускал бы записи.
+    Неполная страница - последняя, заголовок не ставится.
+    """
+    if cursor is not None and items and limit and len(items) >= limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(items[-1])
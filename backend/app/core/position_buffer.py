@@ -0,0 +1,362 @@
+"""
+Буфер позиций просмотра уроков (write-behind)
+Heartbeat плеера пишется в память или Redis; в базу данных уходит
+только последняя позиция по (пользователь, урок) пачкой раз в N секунд
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _key(user_id: int, lesson_id: int) -> str:
+    return f"{user_id}:{lesson_id}"
+
+
+class BasePositionBuffer:
+    """
+    Базовый класс буфера позиций.
+
+    Запись: {"user_id", "lesson_id", "course_id", "position", "ts"}.
+    drain() забирает накопленные записи; после сохранения вызывается
+    ack(), при ошибке - restore() (записи будут сохранены при следующем сбросе).
+    """
+
+    async def put(self, entry: Dict) -> bool:
+        """Записать позицию; True если она заменила еще не сохраненную"""
+        raise NotImplementedError
+
+    async def pop(self, user_id: int, lesson_id: int) -> Optional[Dict]:
+        """Забрать несохраненную позицию одного урока"""
+        raise NotImplementedError
+
+    async def drain(self) -> List[Dict]:
+        """Забрать все несохраненные позиции"""
+        raise NotImplementedError
+
+    async def ack(self) -> None:
+        """Подтвердить сохранение забранных позиций"""
+
+    async def restore(self, entries: List[Dict]) -> None:
+        """Вернуть позиции, которые не удалось сохранить"""
+
+    async def recover(self) -> int:
+        """Вернуть в буфер позиции, зависшие после падения другого процесса"""
+        return 0
+
+    async def size(self) -> int:
+        """Количество несохраненных позиций"""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Закрыть соединения"""
+
+
+class InMemoryPositionBuffer(BasePositionBuffer):
+    """Буфер в памяти процесса (тесты и развертывание на одном узле)"""
+
+    def __init__(self):
+        self._entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    async def put(self, entry: Dict) -> bool:
+        key = _key(entry["user_id"], entry["lesson_id"])
+        with self._lock:
+            replaced = key in self._entries
+            self._entries[key] = entry
+        return replaced
+
+    async def pop(self, user_id: int, lesson_id: int) -> Optional[Dict]:
+        with self._lock:
+            return self._entries.pop(_key(user_id, lesson_id), None)
+
+    async def drain(self) -> List[Dict]:
+        with self._lock:
+            entries, self._entries = self._entries, {}
+        return list(entries.values())
+
+    async def restore(self, entries: List[Dict]) -> None:
+        with self._lock:
+            for entry in entries:
+                # Более новая позиция, пришедшая во время сброса, важнее
+                self._entries.setdefault(_key(entry["user_id"], entry["lesson_id"]), entry)
+
+    async def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisPositionBuffer(BasePositionBuffer):
+    """
+    Буфер на Redis, общий для всех воркеров.
+
+    Позиции лежат в хэше; при сбросе хэш атомарно переименовывается
+    в ключ обработки процесса и удаляется только после записи в базу
+    данных. Ключ обработки у каждого процесса свой и держится арендой:
+    позиции процесса, который упал и не продлил аренду, возвращаются
+    в общий хэш при сбросе любого другого воркера.
+    """
+
+    prefix = "positions"
+    # Аренда ключа обработки, заметно больше времени записи одной пачки
+    lease_seconds = 120
+
+    def __init__(self, redis_url: str = settings.REDIS_URL, worker_name: Optional[str] = None):
+        import redis.asyncio as redis
+
+        self.redis = redis.from_url(redis_url, decode_responses=True)
+        name = worker_name or settings.NOTIFICATION_WORKER_NAME or socket.gethostname()
+        # Воркеры uvicorn/gunicorn одного контейнера делят имя узла
+        self.worker_id = f"{name}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._scanned = False
+
+    @property
+    def _pending_key(self) -> str:
+        return f"{self.prefix}:pending"
+
+    @property
+    def _workers_key(self) -> str:
+        return f"{self.prefix}:workers"
+
+    def _get_processing_key(self, worker_id: str) -> str:
+        return f"{self.prefix}:processing:{worker_id}"
+
+    def _get_lease_key(self, worker_id: str) -> str:
+        return f"{self.prefix}:lease:{worker_id}"
+
+    @property
+    def _processing_key(self) -> str:
+        return self._get_processing_key(self.worker_id)
+
+    async def put(self, entry: Dict) -> bool:
+        created = await self.redis.hset(
+            self._pending_key, _key(entry["user_id"], entry["lesson_id"]), json.dumps(entry)
+        )
+        return created == 0
+
+    async def pop(self, user_id: int, lesson_id: int) -> Optional[Dict]:
+        field = _key(user_id, lesson_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hget(self._pending_key, field)
+            pipe.hdel(self._pending_key, field)
+            data, _ = await pipe.execute()
+        return json.loads(data) if data else None
+
+    async def drain(self) -> List[Dict]:
+        from redis.exceptions import ResponseError
+
+        # Аренда и регистрация до переименования: ключ обработки не останется без владельца
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(self._get_lease_key(self.worker_id), 1, ex=self.lease_seconds)
+            pipe.sadd(self._workers_key, self.worker_id)
+            await pipe.execute()
+        # Сначала дописываем то, что не удалось сохранить в прошлый раз
+        if not await self.redis.exists(self._processing_key):
+            try:
+                await self.redis.rename(self._pending_key, self._processing_key)
+            except ResponseError:
+                # Нет накопленных позиций
+                await self.ack()
+                return []
+        data = await self.redis.hgetall(self._processing_key)
+        return [json.loads(value) for value in data.values()]
+
+    async def ack(self) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(self._processing_key, self._get_lease_key(self.worker_id))
+            pipe.srem(self._workers_key, self.worker_id)
+            await pipe.execute()
+
+    async def restore(self, entries: List[Dict]) -> None:
+        # Ключ обработки остается до успешного сброса; здесь возвращаем
+        # позиции, забранные через pop(), не затирая более новые
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for entry in entries:
+                pipe.hsetnx(self._pending_key, _key(entry["user_id"], entry["lesson_id"]), json.dumps(entry))
+            await pipe.execute()
+
+    async def recover(self) -> int:
+        worker_ids = set(await self.redis.smembers(self._workers_key))
+        if not self._scanned:
+            # При запуске подбираем и ключи обработки, не попавшие в реестр
+            prefix = self._get_processing_key("")
+            async for key in self.redis.scan_iter(match=f"{prefix}*"):
+                worker_ids.add(key[len(prefix):])
+            self._scanned = True
+
+        recovered = 0
+        for worker_id in worker_ids:
+            if worker_id != self.worker_id:
+                recovered += await self._claim(worker_id)
+        if recovered:
+            logger.warning(f"Recovered {recovered} lesson positions of stopped workers")
+        return recovered
+
+    async def _claim(self, worker_id: str) -> int:
+        """Вернуть в общий хэш ключ обработки процесса без аренды"""
+        from redis.exceptions import WatchError
+
+        lease_key = self._get_lease_key(worker_id)
+        processing_key = self._get_processing_key(worker_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            try:
+                # Если владелец жив и успел продлить аренду, транзакция не выполнится
+                await pipe.watch(lease_key, processing_key)
+                if await pipe.exists(lease_key):
+                    return 0
+                data = await pipe.hgetall(processing_key)
+                pipe.multi()
+                for field, value in data.items():
+                    # Позиция, пришедшая после падения процесса, новее
+                    pipe.hsetnx(self._pending_key, field, value)
+                pipe.delete(processing_key)
+                pipe.srem(self._workers_key, worker_id)
+                await pipe.execute()
+            except WatchError:
+                return 0
+        return len(data)
+
+    async def size(self) -> int:
+        return await self.redis.hlen(self._pending_key)
+
+    async def close(self) -> None:
+        await self.redis.close()
+
+
+def create_position_buffer() -> BasePositionBuffer:
+    """Создать буфер согласно настройкам"""
+    if settings.POSITION_BUFFER_BACKEND == "redis":
+        return RedisPositionBuffer()
+    return InMemoryPositionBuffer()
+
+
+class PositionFlusher:
+    """Фоновая запись позиций из буфера в базу данных пачками"""
+
+    def __init__(
+        self,
+        buffer: BasePositionBuffer,
+        interval: float = settings.POSITION_FLUSH_INTERVAL,
+        batch_size: int = settings.POSITION_FLUSH_BATCH_SIZE
+    ):
+        self.buffer = buffer
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self.stats = {
+            "received": 0,     # heartbeat всего
+            "coalesced": 0,    # заменили еще не сохраненную позицию
+            "persisted": 0,    # позиций записано в базу данных
+            "flushes": 0,
+            "failed_flushes": 0,
+            "last_flush_seconds": 0.0,
+        }
+
+    async def record(self, *, user_id: int, lesson_id: int, course_id: int, position: int) -> None:
+        """Принять heartbeat плеера"""
+        replaced = await self.buffer.put({
+            "user_id": user_id,
+            "lesson_id": lesson_id,
+            "course_id": course_id,
+            "position": position,
+            "ts": time.time(),
+        })
+        self.stats["received"] += 1
+        if replaced:
+            self.stats["coalesced"] += 1
+
+    def _persist(self, entries: List[Dict]) -> None:
+        from app.core.database import SessionLocal
+        from app.crud.activity import lesson_progress_crud
+
+        with SessionLocal() as db:
+            for start in range(0, len(entries), self.batch_size):
+                batch = [
+                    {**entry, "updated_at": datetime.utcfromtimestamp(entry["ts"])}
+                    for entry in entries[start:start + self.batch_size]
+                ]
+                lesson_progress_crud.upsert_positions(db, positions=batch)
+
+    async def _write(self, entries: List[Dict]) -> bool:
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(self._persist, entries)
+        except Exception as e:
+            self.stats["failed_flushes"] += 1
+            logger.error(f"Failed to persist {len(entries)} lesson positions: {e}")
+            return False
+        self.stats["persisted"] += len(entries)
+        self.stats["flushes"] += 1
+        self.stats["last_flush_seconds"] = round(time.perf_counter() - started, 4)
+        return True
+
+    async def flush(self) -> int:
+        """Записать все накопленные позиции"""
+        async with self._flush_lock:
+            await self.buffer.recover()
+            entries = await self.buffer.drain()
+            if not entries:
+                return 0
+            if await self._write(entries):
+                await self.buffer.ack()
+                return len(entries)
+            await self.buffer.restore(entries)
+            return 0
+
+    async def flush_lesson(self, user_id: int, lesson_id: int) -> None:
+        """Сразу записать позицию урока (например, при его завершении)"""
+        entry = await self.buffer.pop(user_id, lesson_id)
+        if entry is not None and not await self._write([entry]):
+            await self.buffer.restore([entry])
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Lesson position flush failed: {e}")
+
+    async def start(self) -> None:
+        """Запустить периодический сброс (и дописать оставшееся после падения)"""
+        if self._task is not None:
+            return
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Lesson position flush on startup failed: {e}")
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Lesson position flusher started: every {self.interval}s")
+
+    async def stop(self) -> None:
+        """Остановить сброс и записать все накопленное"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        # Повтор на случай позиций, вернувшихся после неудачного сброса
+        for _ in range(3):
+            await self.flush()
+            if not await self.buffer.size():
+                break
+        await self.buffer.close()
+
+    async def get_stats(self) -> Dict:
+        """Метрики буфера"""
+        return {**self.stats, "pending": await self.buffer.size()}
+
+
+# Глобальный буфер позиций и его сброс
+position_buffer = create_position_buffer()
+position_flusher = PositionFlusher(position_buffer)
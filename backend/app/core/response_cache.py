@@ -0,0 +1,176 @@
+"""
+Кэш ответов API
+Redis в продакшене, in-memory реализация для тестов и одного узла
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import Response
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.http_cache import dump_json
+
+logger = logging.getLogger(__name__)
+
+# Пространства имен кэша
+COURSES_NAMESPACE = "courses"
+
+
+class BaseCacheBackend:
+    """Базовый класс хранилища кэша"""
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Получить значение"""
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        """Сохранить значение на ttl секунд"""
+        raise NotImplementedError
+
+    def get_version(self, namespace: str) -> int:
+        """Текущая версия пространства имен"""
+        raise NotImplementedError
+
+    def bump_version(self, namespace: str) -> int:
+        """Увеличить версию пространства имен (старые ключи перестают читаться)"""
+        raise NotImplementedError
+
+
+class InMemoryCacheBackend(BaseCacheBackend):
+    """Кэш в памяти процесса (тесты и развертывание на одном узле)"""
+
+    def __init__(self, maxsize: int = settings.CACHE_MAX_ENTRIES, ttl: int = settings.CACHE_TTL):
+        self._data = TTLCache(maxsize, ttl)
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._data.get(key)
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        self._data.set(key, value, ttl=ttl)
+
+    def get_version(self, namespace: str) -> int:
+        return self._versions.get(namespace, 0)
+
+    def bump_version(self, namespace: str) -> int:
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+            return self._versions[namespace]
+
+
+class RedisCacheBackend(BaseCacheBackend):
+    """
+    Кэш на Redis, общий для всех воркеров.
+
+    Версия пространства имен хранится отдельным ключом; после ее
+    увеличения старые записи не читаются и удаляются Redis по TTL.
+    """
+
+    prefix = "cache"
+
+    def __init__(self, redis_url: str = settings.REDIS_URL):
+        import redis
+
+        # Короткие таймауты: при недоступном Redis запрос вычисляется заново, а не ждет
+        self.redis = redis.Redis.from_url(
+            redis_url,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT
+        )
+
+    def _version_key(self, namespace: str) -> str:
+        return f"{self.prefix}:version:{namespace}"
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.redis.get(f"{self.prefix}:{key}")
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        self.redis.set(f"{self.prefix}:{key}", value, ex=ttl)
+
+    def get_version(self, namespace: str) -> int:
+        return int(self.redis.get(self._version_key(namespace)) or 0)
+
+    def bump_version(self, namespace: str) -> int:
+        return self.redis.incr(self._version_key(namespace))
+
+
+class ResponseCache:
+    """
+    Кэш сериализованных JSON ответов.
+
+    Ключ включает версию пространства имен, имя эндпоинта и параметры
+    запроса. Ошибки хранилища не ломают запрос: ответ просто
+    вычисляется заново.
+    """
+
+    def __init__(self, backend: BaseCacheBackend, ttl: int = settings.CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+
+    def make_key(self, namespace: str, name: str, params: Dict[str, Any]) -> str:
+        """Ключ кэша для версии пространства имен и параметров запроса"""
+        version = self.backend.get_version(namespace)
+        digest = hashlib.sha1(
+            json.dumps(params, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        return f"{namespace}:v{version}:{name}:{digest}"
+
+    def get_or_set(
+        self,
+        namespace: str,
+        name: str,
+        params: Dict[str, Any],
+        producer: Callable[[], Any],
+        response_model: Any
+    ) -> Response:
+        """Вернуть закэшированный ответ или вычислить и сохранить его"""
+        key = None
+        try:
+            key = self.make_key(namespace, name, params)
+            content = self.backend.get(key)
+            if content is not None:
+                return Response(content=content, media_type="application/json")
+        except Exception as e:
+            logger.warning(f"Response cache read failed for {name}: {e}")
+
+        content = dump_json(response_model, producer())
+
+        if key is not None:
+            try:
+                self.backend.set(key, content, self.ttl)
+            except Exception as e:
+                logger.warning(f"Response cache write failed for {name}: {e}")
+        return Response(content=content, media_type="application/json")
+
+    def invalidate(self, namespace: str) -> None:
+        """Сбросить все ответы пространства имен"""
+        try:
+            self.backend.bump_version(namespace)
+        except Exception as e:
+            logger.error(f"Response cache invalidation failed for {namespace}: {e}")
+
+
+def create_response_cache() -> ResponseCache:
+    """
+    Создать кэш ответов согласно настройкам.
+
+    Кэш в памяти у каждого воркера свой, и сброс версии в одном воркере
+    не виден остальным, поэтому при нескольких воркерах по умолчанию
+    используется Redis, а явно выбранный кэш в памяти живет CACHE_MEMORY_TTL.
+    """
+    multiple_workers = settings.WEB_CONCURRENCY > 1
+    backend = settings.CACHE_BACKEND or ("redis" if multiple_workers else "memory")
+    if backend == "redis":
+        return ResponseCache(RedisCacheBackend())
+    ttl = min(settings.CACHE_TTL, settings.CACHE_MEMORY_TTL) if multiple_workers else settings.CACHE_TTL
+    return ResponseCache(InMemoryCacheBackend(ttl=ttl), ttl=ttl)
+
+
+# Глобальный кэш ответов
+response_cache = create_response_cache()
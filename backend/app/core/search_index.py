@@ -0,0 +1,521 @@
+"""
+Поисковый индекс каталога курсов в памяти процесса
+Инвертированный индекс по названию, описанию, результатам обучения
+и названиям уроков опубликованных курсов
+"""
+
+import asyncio
+import bisect
+import json
+import logging
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+_CYRILLIC = re.compile(r"[а-я]")
+
+# Вес поля при совпадении
+FIELD_WEIGHTS = {
+    "title": 3.0,
+    "lessons": 1.5,
+    "outcomes": 1.0,
+    "description": 1.0,
+}
+
+# Множители для неточных совпадений
+PREFIX_MATCH_WEIGHT = 0.7
+TYPO_MATCH_WEIGHT = 0.5
+MAX_PREFIX_EXPANSIONS = 50
+
+
+# ==================== СТЕММИНГ ====================
+
+# Стеммер Портера для русского языка
+_RU_RV = re.compile(r"^(.*?[аеиоуыэюя])(.*)$")
+_RU_PERFECTIVE_GERUND = re.compile(r"((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$")
+_RU_REFLEXIVE = re.compile(r"(с[яь])$")
+_RU_ADJECTIVE = re.compile(
+    r"(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых|ую|юю|ая|яя|ою|ею)$"
+)
+_RU_PARTICIPLE = re.compile(r"((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$")
+_RU_VERB = re.compile(
+    r"((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)"
+    r"|((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$"
+)
+_RU_NOUN = re.compile(
+    r"(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем|ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$"
+)
+_RU_DERIVATIONAL = re.compile(r".*[^аеиоуыэюя]+[аеиоуыэюя].*ость?$")
+_RU_SUPERLATIVE = re.compile(r"(ейше|ейш)$")
+
+# Упрощенный стеммер для английских слов
+_EN_SUFFIXES = ("ingly", "edly", "ings", "ing", "ies", "ied", "es", "ed", "ly", "s")
+
+
+def _stem_russian(word: str) -> str:
+    match = _RU_RV.match(word)
+    if not match:
+        return word
+    prefix, rv = match.group(1), match.group(2)
+
+    stripped = _RU_PERFECTIVE_GERUND.sub("", rv, 1)
+    if stripped == rv:
+        rv = _RU_REFLEXIVE.sub("", rv, 1)
+        stripped = _RU_ADJECTIVE.sub("", rv, 1)
+        if stripped != rv:
+            rv = _RU_PARTICIPLE.sub("", stripped, 1)
+        else:
+            stripped = _RU_VERB.sub("", rv, 1)
+            rv = _RU_NOUN.sub("", rv, 1) if stripped == rv else stripped
+    else:
+        rv = stripped
+
+    if rv.endswith("и"):
+        rv = rv[:-1]
+    if _RU_DERIVATIONAL.match(rv):
+        rv = re.sub(r"ость?$", "", rv)
+    if rv.endswith("ь"):
+        rv = rv[:-1]
+    else:
+        rv = _RU_SUPERLATIVE.sub("", rv, 1)
+        if rv.endswith("нн"):
+            rv = rv[:-1]
+    return prefix + rv
+
+
+def _stem_english(word: str) -> str:
+    for suffix in _EN_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Слова текста в нижнем регистре (ё -> е)"""
+    if not text:
+        return []
+    return _WORD.findall(text.lower().replace("ё", "е"))
+
+
+def stem(token: str) -> str:
+    """Основа слова (русский или английский стемминг)"""
+    if _CYRILLIC.search(token):
+        return _stem_russian(token)
+    return _stem_english(token)
+
+
+def _deletes(term: str) -> Set[str]:
+    """Варианты слова с одной удаленной буквой (symmetric delete, расстояние 1)"""
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """Расстояние Дамерау-Левенштейна не больше 1"""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diff = [i for i in range(len(a)) if a[i] != b[i]]
+        if len(diff) == 1:
+            return True
+        return (
+            len(diff) == 2 and diff[1] == diff[0] + 1
+            and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]]
+        )
+    if len(a) > len(b):
+        a, b = b, a
+    return any(b[:i] + b[i + 1:] == a for i in range(len(b)))
+
+
+# ==================== ИНДЕКС ====================
+
+class CourseSearchIndex:
+    """
+    Инвертированный индекс опубликованных курсов.
+
+    Поддерживает стемминг, префиксный поиск (автодополнение) и опечатки
+    на одну букву в словах от 4 символов. Все слова запроса должны
+    найтись в курсе; результаты ранжируются по весу поля и idf.
+    Индекс локален для процесса; изменения в других воркерах
+    подхватываются периодической перестройкой.
+    """
+
+    snapshot_version = 2
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._documents: Dict[int, Dict[str, Any]] = {}
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self._delete_variants: Dict[str, Set[str]] = defaultdict(set)
+        self._tokens: List[str] = []
+        self._token_stems: Dict[str, str] = {}
+        self.fingerprint: Optional[List[Any]] = None
+        self.ready = False
+
+    # ---------- наполнение ----------
+
+    def _add_term(self, term: str) -> None:
+        if term not in self._postings and len(term) >= 4:
+            self._delete_variants[term].add(term)
+            for variant in _deletes(term):
+                self._delete_variants[variant].add(term)
+
+    def _add_token(self, token: str, term: str) -> None:
+        if token not in self._token_stems:
+            self._token_stems[token] = term
+            bisect.insort(self._tokens, token)
+
+    def _remove_term(self, term: str) -> None:
+        """Удалить терм без курсов и его варианты для поиска с опечатками"""
+        del self._postings[term]
+        if len(term) >= 4:
+            for variant in _deletes(term) | {term}:
+                terms = self._delete_variants.get(variant)
+                if terms is not None:
+                    terms.discard(term)
+                    if not terms:
+                        del self._delete_variants[variant]
+
+    def _remove_token(self, token: str) -> None:
+        del self._token_stems[token]
+        position = bisect.bisect_left(self._tokens, token)
+        if position < len(self._tokens) and self._tokens[position] == token:
+            del self._tokens[position]
+
+    def add_course(self, document: Dict[str, Any]) -> None:
+        """
+        Добавить или заменить курс.
+        document: {"id", "payload" (данные схемы Course), "fields": {поле: текст}}
+        """
+        course_id = document["id"]
+        weights: Dict[str, float] = {}
+        token_stems: Dict[str, str] = {}
+        for field, text in document["fields"].items():
+            field_weight = FIELD_WEIGHTS.get(field, 1.0)
+            for token in tokenize(text):
+                term = token_stems.get(token) or stem(token)
+                token_stems[token] = term
+                weights[term] = max(weights.get(term, 0.0), field_weight)
+
+        with self._lock:
+            self._remove(course_id)
+            for token, term in token_stems.items():
+                self._add_token(token, term)
+            for term, weight in weights.items():
+                self._add_term(term)
+                self._postings[term][course_id] = weight
+            self._documents[course_id] = {**document, "terms": list(weights), "tokens": list(token_stems)}
+
+    def _remove(self, course_id: int) -> None:
+        """Удалить курс; термы и слова, не встречающиеся в других курсах, удаляются из индекса"""
+        document = self._documents.pop(course_id, None)
+        if document is None:
+            return
+        for term in document["terms"]:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(course_id, None)
+                if not postings:
+                    self._remove_term(term)
+        for token in document["tokens"]:
+            term = self._token_stems.get(token)
+            if term is not None and term not in self._postings:
+                self._remove_token(token)
+
+    def remove_course(self, course_id: int) -> None:
+        """Удалить курс из индекса"""
+        with self._lock:
+            self._remove(course_id)
+
+    def build(self, documents: Iterable[Dict[str, Any]], fingerprint: Optional[List[Any]] = None) -> None:
+        """Построить индекс заново и атомарно заменить текущий"""
+        fresh = CourseSearchIndex()
+        for document in documents:
+            fresh.add_course(document)
+        with self._lock:
+            self._documents = fresh._documents
+            self._postings = fresh._postings
+            self._delete_variants = fresh._delete_variants
+            self._tokens = fresh._tokens
+            self._token_stems = fresh._token_stems
+            self.fingerprint = fingerprint
+            self.ready = True
+
+    # ---------- поиск ----------
+
+    def _expand(self, token: str, allow_prefix: bool) -> Dict[str, float]:
+        """Термы индекса для слова запроса с множителем точности совпадения"""
+        term = stem(token)
+        matches: Dict[str, float] = {}
+        if self._postings.get(term):
+            matches[term] = 1.0
+
+        if allow_prefix:
+            start = bisect.bisect_left(self._tokens, token)
+            for candidate in self._tokens[start:start + MAX_PREFIX_EXPANSIONS]:
+                if not candidate.startswith(token):
+                    break
+                candidate_term = self._token_stems[candidate]
+                if self._postings.get(candidate_term):
+                    matches.setdefault(candidate_term, PREFIX_MATCH_WEIGHT)
+
+        if not matches and len(term) >= 4:
+            candidates = set(self._delete_variants.get(term, ()))
+            for variant in _deletes(term):
+                candidates |= self._delete_variants.get(variant, set())
+            for candidate in candidates:
+                if self._postings.get(candidate) and _within_one_edit(term, candidate):
+                    matches.setdefault(candidate, TYPO_MATCH_WEIGHT)
+        return matches
+
+    def _snippet(self, text: Optional[str], terms: Set[str], max_words: int = 35) -> Optional[str]:
+        if not text:
+            return None
+        words = text.split()
+        marked = [bool(set(stem(token) for token in tokenize(word)) & terms) for word in words]
+        first = marked.index(True) if True in marked else 0
+        start = max(first - max_words // 3, 0)
+        fragment = []
+        for word, is_match in zip(words[start:start + max_words], marked[start:start + max_words]):
+            word = word.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+            fragment.append(f"<mark>{word}</mark>" if is_match else word)
+        return " ".join(fragment)
+
+    def search(self, query: str, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """Найти курсы; последнее слово запроса ищется и как префикс"""
+        tokens = tokenize(query)[:10]
+        if not tokens:
+            return []
+
+        with self._lock:
+            total = max(len(self._documents), 1)
+            scores: Optional[Dict[int, float]] = None
+            matched_terms: Set[str] = set()
+            for index, token in enumerate(tokens):
+                expansions = self._expand(token, allow_prefix=index == len(tokens) - 1)
+                token_scores: Dict[int, float] = {}
+                for term, accuracy in expansions.items():
+                    postings = self._postings[term]
+                    idf = math.log(1 + total / len(postings))
+                    for course_id, field_weight in postings.items():
+                        score = accuracy * field_weight * idf
+                        if score > token_scores.get(course_id, 0.0):
+                            token_scores[course_id] = score
+                matched_terms.update(expansions)
+
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {
+                        course_id: score + token_scores[course_id]
+                        for course_id, score in scores.items()
+                        if course_id in token_scores
+                    }
+                if not scores:
+                    return []
+
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[skip:skip + limit]
+            results = []
+            for course_id, score in ranked:
+                document = self._documents[course_id]
+                results.append({
+                    **document["payload"],
+                    "rank": round(score, 4),
+                    "snippet": self._snippet(document["fields"].get("description"), matched_terms),
+                })
+            return results
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Автодополнение: курсы, в названии которых есть слова с таким началом"""
+        tokens = tokenize(prefix)
+        if not tokens:
+            return []
+        results = self.search(prefix, limit=limit * 3)
+        title_matches = [
+            result for result in results
+            if any(token.startswith(tokens[-1]) for token in tokenize(result["title"]))
+        ]
+        return [
+            {"id": result["id"], "title": result["title"], "slug": result["slug"]}
+            for result in (title_matches or results)[:limit]
+        ]
+
+    # ---------- снимок ----------
+
+    def save_snapshot(self, path: str) -> None:
+        """Сохранить документы индекса в файл (атомарная замена)"""
+        with self._lock:
+            data = {
+                "version": self.snapshot_version,
+                "fingerprint": self.fingerprint,
+                "documents": [
+                    {key: value for key, value in document.items() if key not in ("terms", "tokens")}
+                    for document in self._documents.values()
+                ],
+            }
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        # Свой временный файл у каждого воркера: одновременные сохранения не смешиваются
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def get_document(self, course_id: int) -> Optional[Dict[str, Any]]:
+        """Документ курса в индексе"""
+        with self._lock:
+            return self._documents.get(course_id)
+
+    def load_snapshot(self, path: str, fingerprint: Optional[List[Any]] = None) -> bool:
+        """Загрузить индекс из файла, если он соответствует текущему состоянию БД"""
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != self.snapshot_version:
+            return False
+        if fingerprint is not None and data.get("fingerprint") != fingerprint:
+            return False
+        self.build(data["documents"], fingerprint=data.get("fingerprint"))
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Размер индекса"""
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "courses": len(self._documents),
+                "terms": sum(1 for postings in self._postings.values() if postings),
+                "tokens": len(self._tokens),
+            }
+
+
+# ==================== СВЯЗЬ С БАЗОЙ ДАННЫХ ====================
+
+def make_document(course) -> Dict[str, Any]:
+    """Документ индекса для курса с загруженными модулями и уроками"""
+    from app.schemas.course import Course as CourseSchema
+
+    lesson_titles = [lesson.title for module in course.modules for lesson in module.lessons]
+    return {
+        "id": course.id,
+        "payload": CourseSchema.model_validate(course).model_dump(mode="json"),
+        "fields": {
+            "title": course.title,
+            "description": course.description,
+            "outcomes": course.learning_outcomes,
+            "lessons": " ".join(lesson_titles),
+        },
+        # Доля курса в отпечатке каталога (см. reindex_course)
+        "lesson_count": len(lesson_titles),
+    }
+
+
+def rebuild_index(db, index: Optional[CourseSearchIndex] = None) -> None:
+    """Построить индекс из базы данных"""
+    from app.crud.course import course_crud
+
+    index = index or course_search_index
+    started = time.perf_counter()
+    fingerprint = course_crud.get_search_fingerprint(db)
+    courses = course_crud.get_search_documents(db)
+    index.build((make_document(course) for course in courses), fingerprint=fingerprint)
+    logger.info(f"Course search index built: {len(courses)} courses in {time.perf_counter() - started:.2f}s")
+
+
+def warm_up_index(db, snapshot_path: str = settings.SEARCH_INDEX_SNAPSHOT_PATH) -> None:
+    """Загрузить индекс из снимка или построить заново"""
+    from app.crud.course import course_crud
+
+    if snapshot_path and course_search_index.load_snapshot(
+        snapshot_path, fingerprint=course_crud.get_search_fingerprint(db)
+    ):
+        logger.info(f"Course search index loaded from snapshot {snapshot_path}")
+        return
+    rebuild_index(db)
+    if snapshot_path:
+        course_search_index.save_snapshot(snapshot_path)
+
+
+def reindex_course(db, course_id: int) -> None:
+    """Обновить курс в индексе после изменения курса, модуля или урока"""
+    if not course_search_index.ready:
+        return
+    from app.crud.course import course_crud
+
+    stored = course_search_index.fingerprint
+    previous = course_search_index.get_document(course_id)
+    fingerprint = course_crud.get_search_fingerprint(db)
+    courses = course_crud.get_search_documents(db, course_id=course_id)
+    if courses:
+        course_search_index.add_course(make_document(courses[0]))
+    else:
+        # Курс удален или снят с публикации
+        course_search_index.remove_course(course_id)
+
+    # Если каталог изменился только за счет этого курса, индекс актуален:
+    # запоминаем новый отпечаток, чтобы периодическая проверка не перестраивала индекс
+    if stored is not None and _only_course_changed(
+        stored, course_crud.get_search_fingerprint(db, exclude_course_id=course_id), previous
+    ):
+        course_search_index.fingerprint = fingerprint
+
+
+def _only_course_changed(
+    stored: List[Any], others: List[Any], previous: Optional[Dict[str, Any]]
+) -> bool:
+    """
+    Остальные курсы не менялись с момента отпечатка stored: их число и число
+    их уроков равно прежнему без этого курса, и ни один не изменен позже
+    """
+    old_lessons = previous.get("lesson_count") if previous is not None else 0
+    if old_lessons is None:
+        return False
+    count, course_changed, lessons, lesson_changed = stored
+    other_count, other_course_changed, other_lessons, other_lesson_changed = others
+    return (
+        int(other_count) == int(count) - (previous is not None)
+        and int(other_lessons) == int(lessons) - old_lessons
+        and (other_course_changed == "None" or other_course_changed <= course_changed)
+        and (other_lesson_changed == "None" or other_lesson_changed <= lesson_changed)
+    )
+
+
+async def run_refresh_loop(interval: float = settings.SEARCH_INDEX_REFRESH_INTERVAL) -> None:
+    """Периодически перестраивать индекс (изменения, сделанные другими воркерами)"""
+    from app.core.database import SessionLocal
+    from app.crud.course import course_crud
+
+    def refresh() -> None:
+        with SessionLocal() as db:
+            # Каталог не менялся с последней перестройки
+            if course_crud.get_search_fingerprint(db) == course_search_index.fingerprint:
+                return
+            rebuild_index(db)
+
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(refresh)
+        except Exception as e:
+            logger.error(f"Course search index refresh failed: {e}")
+
+
+# Глобальный индекс каталога (наполняется при старте, если SEARCH_INDEX_ENABLED)
+course_search_index = CourseSearchIndex()
@@ -1,10 +1,91 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union, Optional
+from typing import Any, Callable, Dict, Union, Optional, Tuple
 from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Хеши с другим количеством раундов считаются устаревшими
+# и пересчитываются при успешном входе (verify_and_update_password)
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS
+)
+
+
+class PasswordHashExecutor:
+    """
+    Ограниченный пул потоков для bcrypt.
+
+    Хеширование занимает сотни миллисекунд CPU; выделенный пул не дает
+    ему блокировать event loop и ограничивает число одновременных
+    вычислений, остальные запросы ждут в очереди пула.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="password-hash"
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._completed = 0
+        self._wait_time_total = 0.0
+        self._run_time_total = 0.0
+
+    def _call(self, func: Callable, args: tuple, submitted_at: float) -> Any:
+        started_at = time.monotonic()
+        with self._lock:
+            self._running += 1
+            self._wait_time_total += started_at - submitted_at
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._pending -= 1
+                self._completed += 1
+                self._run_time_total += time.monotonic() - started_at
+
+    def _submit(self, func: Callable, *args):
+        with self._lock:
+            self._pending += 1
+        return self._executor.submit(self._call, func, args, time.monotonic())
+
+    def run(self, func: Callable, *args) -> Any:
+        """Выполнить в пуле и дождаться результата (для синхронного кода)"""
+        return self._submit(func, *args).result()
+
+    async def run_async(self, func: Callable, *args) -> Any:
+        """Выполнить в пуле, не блокируя event loop"""
+        return await asyncio.wrap_future(self._submit(func, *args))
+
+    def stats(self) -> Dict[str, Any]:
+        """Глубина очереди и время ожидания/выполнения"""
+        with self._lock:
+            completed = self._completed or 1
+            return {
+                "workers": self.max_workers,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                "completed": self._completed,
+                "avg_wait_ms": round(self._wait_time_total / completed * 1000, 2),
+                "avg_hash_ms": round(self._run_time_total / completed * 1000, 2),
+                "bcrypt_rounds": settings.BCRYPT_ROUNDS,
+            }
+
+    def shutdown(self) -> None:
+        """Остановить пул"""
+        self._executor.shutdown(wait=False)
+
+
+password_hash_executor = PasswordHashExecutor(settings.PASSWORD_HASH_WORKERS)
 
 
 def create_access_token(
@@ -39,12 +120,41 @@ def create_refresh_token(
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Проверить пароль"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_hash_executor.run(pwd_context.verify, plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """Получить хеш пароля"""
-    return pwd_context.hash(password)
+    return password_hash_executor.run(pwd_context.hash, password)
+
+
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Проверить пароль и, если хеш устарел (изменилась стоимость bcrypt),
+    вернуть новый хеш для сохранения
+    """
+    return password_hash_executor.run(pwd_context.verify_and_update, plain_password, hashed_password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Проверить пароль (асинхронно)"""
+    return await password_hash_executor.run_async(pwd_context.verify, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Получить хеш пароля (асинхронно)"""
+    return await password_hash_executor.run_async(pwd_context.hash, password)
+
+
+async def verify_and_update_password_async(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """Проверить пароль и получить новый хеш при необходимости (асинхронно)"""
+    return await password_hash_executor.run_async(
+        pwd_context.verify_and_update, plain_password, hashed_password
+    )
 
 
 def decode_token(token: str) -> Optional[dict]:
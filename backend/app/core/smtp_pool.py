@@ -0,0 +1,152 @@
+"""
+Пул SMTP соединений (aiosmtplib)
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from email.message import Message
+from typing import Optional
+
+import aiosmtplib
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PooledSMTPConnection:
+    """Авторизованное SMTP соединение с учетом использования"""
+
+    def __init__(self, client: aiosmtplib.SMTP):
+        self.client = client
+        self.last_used_at = time.monotonic()
+        self.messages_sent = 0
+
+
+class SMTPConnectionPool:
+    """
+    Пул долгоживущих авторизованных SMTP соединений.
+
+    Соединение, простаивавшее дольше `keepalive` секунд, проверяется
+    командой NOOP перед выдачей; разорванные соединения пересоздаются.
+    После `max_messages` писем соединение закрывается, так как многие
+    SMTP серверы ограничивают число писем на одну сессию.
+    """
+
+    def __init__(
+        self,
+        hostname: str = settings.SMTP_SERVER,
+        port: int = settings.SMTP_PORT,
+        username: Optional[str] = settings.SMTP_USERNAME,
+        password: Optional[str] = settings.SMTP_PASSWORD,
+        start_tls: bool = settings.SMTP_TLS,
+        size: int = settings.SMTP_POOL_SIZE,
+        keepalive: float = settings.SMTP_POOL_KEEPALIVE,
+        max_messages: int = settings.SMTP_MAX_MESSAGES_PER_CONNECTION,
+        timeout: float = settings.SMTP_TIMEOUT
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.start_tls = start_tls
+        self.size = size
+        self.keepalive = keepalive
+        self.max_messages = max_messages
+        self.timeout = timeout
+
+        self._idle: asyncio.LifoQueue = asyncio.LifoQueue()
+        self._slots = asyncio.Semaphore(size)
+        self._closed = False
+        self.stats = {"connects": 0, "reconnects": 0, "sent": 0}
+
+    async def _connect(self) -> PooledSMTPConnection:
+        client = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            start_tls=self.start_tls,
+            timeout=self.timeout
+        )
+        await client.connect()
+        if self.username:
+            await client.login(self.username, self.password or "")
+        self.stats["connects"] += 1
+        return PooledSMTPConnection(client)
+
+    async def _discard(self, connection: PooledSMTPConnection) -> None:
+        try:
+            if connection.client.is_connected:
+                await connection.client.quit()
+        except Exception:
+            connection.client.close()
+
+    async def _is_healthy(self, connection: PooledSMTPConnection) -> bool:
+        if not connection.client.is_connected:
+            return False
+        if time.monotonic() - connection.last_used_at < self.keepalive:
+            return True
+        try:
+            await connection.client.noop()
+            return True
+        except aiosmtplib.SMTPException:
+            return False
+
+    async def _acquire(self) -> PooledSMTPConnection:
+        await self._slots.acquire()
+        try:
+            while not self._idle.empty():
+                connection = self._idle.get_nowait()
+                if await self._is_healthy(connection):
+                    return connection
+                self.stats["reconnects"] += 1
+                await self._discard(connection)
+            return await self._connect()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def _release(self, connection: PooledSMTPConnection, broken: bool = False) -> None:
+        try:
+            if broken or self._closed or connection.messages_sent >= self.max_messages:
+                await self._discard(connection)
+            else:
+                connection.last_used_at = time.monotonic()
+                self._idle.put_nowait(connection)
+        finally:
+            self._slots.release()
+
+    @asynccontextmanager
+    async def connection(self):
+        """Получить соединение из пула"""
+        connection = await self._acquire()
+        broken = False
+        try:
+            yield connection
+        except (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPConnectError, asyncio.TimeoutError):
+            broken = True
+            raise
+        finally:
+            await self._release(connection, broken=broken)
+
+    async def send_message(self, message: Message) -> None:
+        """Отправить письмо; при обрыве соединения - одна повторная попытка"""
+        for attempt in range(2):
+            try:
+                async with self.connection() as connection:
+                    await connection.client.send_message(message)
+                    connection.messages_sent += 1
+                    self.stats["sent"] += 1
+                    return
+            except aiosmtplib.SMTPServerDisconnected:
+                if attempt:
+                    raise
+                self.stats["reconnects"] += 1
+                logger.warning("SMTP connection dropped, reconnecting")
+
+    async def close(self) -> None:
+        """Закрыть все соединения"""
+        self._closed = True
+        while not self._idle.empty():
+            await self._discard(self._idle.get_nowait())
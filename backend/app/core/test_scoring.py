@@ -0,0 +1,151 @@
+"""
+Проверка ответов на тесты на сервере
+Ключ ответов теста (правильные варианты по вопросам) строится один раз
+на версию теста и кэшируется; проверка попытки идет без запросов к базе данных
+"""
+
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.test import Answer, Question, QuestionType, Test
+
+# Типы вопросов, которые проверяются автоматически
+AUTO_GRADED_TYPES = (QuestionType.SINGLE_CHOICE, QuestionType.MULTIPLE_CHOICE, QuestionType.TRUE_FALSE)
+
+
+class QuestionKey(NamedTuple):
+    """Ключ одного вопроса"""
+    question_type: QuestionType
+    points: int
+    answer_ids: FrozenSet[int]   # все варианты вопроса
+    correct_ids: FrozenSet[int]  # правильные варианты
+
+
+class AnswerKey(NamedTuple):
+    """Ключ ответов теста"""
+    questions: Dict[int, QuestionKey]
+    max_points: int  # сумма баллов автоматически проверяемых вопросов
+
+
+class AnswerGrade(NamedTuple):
+    """Оценка одного ответа"""
+    is_correct: bool
+    points_earned: float
+
+
+class GradeResult(NamedTuple):
+    """Результат проверки попытки"""
+    score: float  # процент от максимума
+    points_earned: float
+    max_points: int
+    is_passed: bool
+    # Оценки в порядке ответов; None - ответ не проверяется автоматически
+    grades: List[Optional[AnswerGrade]]
+
+
+# (test_id, version) -> AnswerKey; изменение вопросов или вариантов
+# увеличивает версию теста, поэтому записи не нужно сбрасывать
+answer_key_cache = TTLCache(settings.ANSWER_KEY_CACHE_SIZE, settings.ANSWER_KEY_CACHE_TTL)
+
+
+def build_answer_key(db: Session, *, test_id: int) -> AnswerKey:
+    """Построить ключ ответов теста одним запросом"""
+    rows = db.execute(
+        select(Question.id, Question.question_type, Question.points, Answer.id, Answer.is_correct)
+        .outerjoin(Answer, Answer.question_id == Question.id)
+        .where(Question.test_id == test_id)
+    )
+    questions: Dict[int, dict] = {}
+    for question_id, question_type, points, answer_id, is_correct in rows:
+        question = questions.setdefault(
+            question_id, {"question_type": question_type, "points": points, "answer_ids": set(), "correct_ids": set()}
+        )
+        if answer_id is not None:
+            question["answer_ids"].add(answer_id)
+            if is_correct:
+                question["correct_ids"].add(answer_id)
+
+    keys = {
+        question_id: QuestionKey(
+            question["question_type"],
+            question["points"],
+            frozenset(question["answer_ids"]),
+            frozenset(question["correct_ids"])
+        )
+        for question_id, question in questions.items()
+    }
+    max_points = sum(key.points for key in keys.values() if key.question_type in AUTO_GRADED_TYPES)
+    return AnswerKey(keys, max_points)
+
+
+def get_answer_key(db: Session, test: Test) -> AnswerKey:
+    """Ключ ответов текущей версии теста (из кэша или из базы данных)"""
+    cache_key = (test.id, test.version)
+    answer_key = answer_key_cache.get(cache_key)
+    if answer_key is None:
+        answer_key = build_answer_key(db, test_id=test.id)
+        answer_key_cache.set(cache_key, answer_key)
+    return answer_key
+
+
+def check_answers(answer_key: AnswerKey, answers: Sequence[Any]) -> Optional[str]:
+    """Проверить пакет ответов по ключу теста; текст ошибки или None"""
+    selected: Dict[int, set] = {}
+    for answer in answers:
+        key = answer_key.questions.get(answer.question_id)
+        if key is None:
+            return f"Вопрос {answer.question_id} не относится к этому тесту"
+        if key.question_type not in AUTO_GRADED_TYPES:
+            if answer.selected_answer_id is not None or not answer.answer_text:
+                return f"На вопрос {answer.question_id} нужен текстовый ответ"
+            continue
+        if answer.selected_answer_id not in key.answer_ids:
+            return f"Вариант {answer.selected_answer_id} не относится к вопросу {answer.question_id}"
+        question_selected = selected.setdefault(answer.question_id, set())
+        if answer.selected_answer_id in question_selected:
+            return f"Вариант {answer.selected_answer_id} выбран повторно"
+        if question_selected and key.question_type != QuestionType.MULTIPLE_CHOICE:
+            return f"На вопрос {answer.question_id} можно выбрать только один вариант"
+        question_selected.add(answer.selected_answer_id)
+    return None
+
+
+def grade_answers(answer_key: AnswerKey, answers: Sequence[Any], passing_score: int) -> GradeResult:
+    """
+    Проверить ответы попытки (объекты с question_id и selected_answer_id).
+
+    Вопрос с одним ответом (single_choice, true_false) - один ответ
+    с selected_answer_id. Вопрос с несколькими ответами - ответ на каждый
+    выбранный вариант; баллы начисляются, только если выбраны ровно все
+    правильные варианты, и записываются в первый ответ вопроса.
+    Текстовые ответы проверяются вручную и в максимум баллов не входят.
+    """
+    by_question: Dict[int, List[int]] = {}
+    for index, answer in enumerate(answers):
+        by_question.setdefault(answer.question_id, []).append(index)
+
+    grades: List[Optional[AnswerGrade]] = [None] * len(answers)
+    points_earned = 0.0
+    for question_id, indexes in by_question.items():
+        key = answer_key.questions.get(question_id)
+        if key is None or key.question_type not in AUTO_GRADED_TYPES:
+            continue
+        selected = {
+            answers[index].selected_answer_id for index in indexes
+            if answers[index].selected_answer_id is not None
+        }
+        if key.question_type == QuestionType.MULTIPLE_CHOICE:
+            is_correct = bool(key.correct_ids) and selected == key.correct_ids
+        else:
+            is_correct = len(selected) == 1 and selected <= key.correct_ids
+        for position, index in enumerate(indexes):
+            grades[index] = AnswerGrade(is_correct, float(key.points) if is_correct and position == 0 else 0.0)
+        if is_correct:
+            points_earned += key.points
+
+    score = round(points_earned * 100 / answer_key.max_points, 2) if answer_key.max_points else 0.0
+    return GradeResult(score, points_earned, answer_key.max_points, score >= passing_score, grades)
@@ -1,26 +1,32 @@
-from .base import CRUDBase
-from .user import user_crud
-from .course import course_crud, module_crud, lesson_crud
+from .base import CRUDBase, AsyncCRUDBase
+from .user import user_crud, async_user_crud
+from .course import course_crud, module_crud, lesson_crud, async_lesson_crud
 from .assignment import assignment_crud, submission_crud
-from .test import test_crud, question_crud, answer_crud, test_attempt_crud
-from .payment import payment_crud, access_crud
-from .activity import activity_crud, notification_crud, progress_crud
+from .test import test_crud, question_crud, answer_crud, test_attempt_crud, test_answer_crud
+from .payment import payment_crud, access_crud, async_access_crud
+from .activity import activity_crud, notification_crud, progress_crud, lesson_progress_crud
 
 __all__ = [
     "CRUDBase",
+    "AsyncCRUDBase",
     "user_crud",
+    "async_user_crud",
     "course_crud",
     "module_crud", 
     "lesson_crud",
+    "async_lesson_crud",
     "assignment_crud",
     "submission_crud",
     "test_crud",
     "question_crud",
     "answer_crud",
     "test_attempt_crud",
+    "test_answer_crud",
     "payment_crud",
     "access_crud",
+    "async_access_crud",
     "activity_crud",
     "notification_crud",
-    "progress_crud"
+    "progress_crud",
+    "lesson_progress_crud"
 ] 
\ No newline at end of file
@@ -1,25 +1,67 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from sqlalchemy import and_, or_, func, case, insert, literal, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
 
+from app.core.pagination import PageCursor
 from app.crud.base import CRUDBase
 from app.models.activity import ActivityLog, Notification, CourseProgress, LessonProgress
+from app.models.course import Lesson, Module
 from app.schemas.activity import ActivityLogCreate, NotificationCreate, CourseProgressCreate, LessonProgressCreate
 
 
+# Диалекты с INSERT ... ON CONFLICT
+UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def _insert(db: Session, model):
+    """INSERT с поддержкой ON CONFLICT для диалекта сессии; None - диалект его не поддерживает"""
+    upsert_insert = UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    return upsert_insert(model) if upsert_insert is not None else None
+
+
+def _update_or_insert(db: Session, model, *, where: list, values: dict, set_: dict):
+    """
+    UPDATE существующей строки, а если ее нет - INSERT (для диалектов без ON CONFLICT).
+    Параллельная вставка той же строки завершится ошибкой уникального индекса.
+    """
+    result = db.execute(
+        update(model).where(*where).values(**set_).execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        db.execute(insert(model).values(**values))
+    return db.scalars(select(model).where(*where), execution_options={"populate_existing": True}).one()
+
+
+def _progress_percentage(completed, total):
+    """SQL выражение процента прохождения"""
+    return case((total > 0, completed * 100.0 / total), else_=0.0)
+
+
+def _completed_at(completed, total, now: datetime):
+    """SQL выражение даты завершения курса (сохраняется первая дата)"""
+    return case(
+        (and_(total > 0, completed >= total), func.coalesce(CourseProgress.completed_at, now)),
+        else_=CourseProgress.completed_at
+    )
+
+
 class CRUDActivityLog(CRUDBase[ActivityLog, ActivityLogCreate, ActivityLogCreate]):
-    def get_by_user(self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100) -> List[ActivityLog]:
+    def get_by_user(self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100, cursor: Optional[PageCursor] = None) -> List[ActivityLog]:
         """Получить активность пользователя"""
-        return db.query(ActivityLog).filter(ActivityLog.user_id == user_id).order_by(ActivityLog.created_at.desc()).offset(skip).limit(limit).all()
+        query = db.query(ActivityLog).filter(ActivityLog.user_id == user_id).order_by(ActivityLog.created_at.desc())
+        return self.paginate(query, skip=skip, limit=limit, cursor=cursor).all()
 
-    def get_by_course(self, db: Session, *, course_id: int, skip: int = 0, limit: int = 100) -> List[ActivityLog]:
+    def get_by_course(self, db: Session, *, course_id: int, skip: int = 0, limit: int = 100, cursor: Optional[PageCursor] = None) -> List[ActivityLog]:
         """Получить активность по курсу"""
-        return db.query(ActivityLog).filter(ActivityLog.course_id == course_id).order_by(ActivityLog.created_at.desc()).offset(skip).limit(limit).all()
+        query = db.query(ActivityLog).filter(ActivityLog.course_id == course_id).order_by(ActivityLog.created_at.desc())
+        return self.paginate(query, skip=skip, limit=limit, cursor=cursor).all()
 
-    def get_by_type(self, db: Session, *, activity_type: str, skip: int = 0, limit: int = 100) -> List[ActivityLog]:
+    def get_by_type(self, db: Session, *, activity_type: str, skip: int = 0, limit: int = 100, cursor: Optional[PageCursor] = None) -> List[ActivityLog]:
         """Получить активность по типу"""
-        return db.query(ActivityLog).filter(ActivityLog.activity_type == activity_type).order_by(ActivityLog.created_at.desc()).offset(skip).limit(limit).all()
+        query = db.query(ActivityLog).filter(ActivityLog.activity_type == activity_type).order_by(ActivityLog.created_at.desc())
+        return self.paginate(query, skip=skip, limit=limit, cursor=cursor).all()
 
     def log_activity(
         self, 
@@ -52,15 +94,17 @@ class CRUDActivityLog(CRUDBase[ActivityLog, ActivityLogCreate, ActivityLogCreate
 
 
 class CRUDNotification(CRUDBase[Notification, NotificationCreate, NotificationCreate]):
-    def get_by_user(self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100) -> List[Notification]:
+    def get_by_user(self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100, cursor: Optional[PageCursor] = None) -> List[Notification]:
         """Получить уведомления пользователя"""
-        return db.query(Notification).filter(Notification.user_id == user_id).order_by(Notification.created_at.desc()).offset(skip).limit(limit).all()
+        query = db.query(Notification).filter(Notification.user_id == user_id).order_by(Notification.created_at.desc())
+        return self.paginate(query, skip=skip, limit=limit, cursor=cursor).all()
 
-    def get_unread(self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100) -> List[Notification]:
+    def get_unread(self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100, cursor: Optional[PageCursor] = None) -> List[Notification]:
         """Получить непрочитанные уведомления"""
-        return db.query(Notification).filter(
+        query = db.query(Notification).filter(
             and_(Notification.user_id == user_id, Notification.status == "pending")
-        ).order_by(Notification.created_at.desc()).offset(skip).limit(limit).all()
+        ).order_by(Notification.created_at.desc())
+        return self.paginate(query, skip=skip, limit=limit, cursor=cursor).all()
 
     def mark_as_read(self, db: Session, *, notification_id: int) -> Notification:
         """Отметить уведомление как прочитанное"""
@@ -109,37 +153,50 @@ class CRUDCourseProgress(CRUDBase[CourseProgress, CourseProgressCreate, CoursePr
         completed_lessons: int = None, 
         total_lessons: int = None
     ) -> CourseProgress:
-        """Обновить прогресс по курсу"""
-        progress = self.get_user_course_progress(db, user_id=user_id, course_id=course_id)
-        
-        if not progress:
-            progress = CourseProgress(
-                user_id=user_id,
-                course_id=course_id,
-                completed_lessons=completed_lessons or 0,
-                total_lessons=total_lessons or 0
+        """
+        Обновить прогресс по курсу одним INSERT ... ON CONFLICT DO UPDATE.
+        Процент и дата завершения пересчитываются в том же запросе.
+        """
+        now = datetime.utcnow()
+        values = dict(
+            user_id=user_id,
+            course_id=course_id,
+            completed_lessons=completed_lessons or 0,
+            total_lessons=total_lessons or 0,
+            progress_percentage=(completed_lessons or 0) * 100.0 / total_lessons if total_lessons else 0.0,
+            last_accessed_at=now,
+            completed_at=now if total_lessons and (completed_lessons or 0) >= total_lessons else None,
+            created_at=now,
+            updated_at=now,
+        )
+        # Не переданные значения берутся из существующей строки
+        completed = literal(completed_lessons) if completed_lessons is not None else CourseProgress.completed_lessons
+        total = literal(total_lessons) if total_lessons is not None else CourseProgress.total_lessons
+        set_ = {
+            "completed_lessons": completed,
+            "total_lessons": total,
+            "progress_percentage": _progress_percentage(completed, total),
+            "completed_at": _completed_at(completed, total, now),
+            "last_accessed_at": now,
+            "updated_at": now,
+        }
+
+        stmt = _insert(db, CourseProgress)
+        if stmt is None:
+            progress = _update_or_insert(
+                db, CourseProgress,
+                where=[CourseProgress.user_id == user_id, CourseProgress.course_id == course_id],
+                values=values, set_=set_
             )
-            db.add(progress)
-        else:
-            if completed_lessons is not None:
-                progress.completed_lessons = completed_lessons
-            if total_lessons is not None:
-                progress.total_lessons = total_lessons
-        
-        # Обновляем процент прогресса
-        if progress.total_lessons > 0:
-            progress.progress_percentage = (progress.completed_lessons / progress.total_lessons) * 100
         else:
-            progress.progress_percentage = 0.0
-        
-        progress.last_accessed_at = datetime.utcnow()
-        
-        # Проверяем завершение курса
-        if progress.completed_lessons >= progress.total_lessons and progress.total_lessons > 0:
-            progress.completed_at = datetime.utcnow()
-        
+            stmt = stmt.values(**values).on_conflict_do_update(
+                index_elements=[CourseProgress.user_id, CourseProgress.course_id],
+                set_=set_
+            )
+            progress = db.scalars(
+                stmt.returning(CourseProgress), execution_options={"populate_existing": True}
+            ).one()
         db.commit()
-        db.refresh(progress)
         return progress
 
 
@@ -158,47 +215,171 @@ class CRUDLessonProgress(CRUDBase[LessonProgress, LessonProgressCreate, LessonPr
             and_(LessonProgress.user_id == user_id, LessonProgress.lesson_id == lesson_id)
         ).first()
 
+    def _upsert(self, db: Session, *, user_id: int, lesson_id: int, values: dict, set_: dict) -> LessonProgress:
+        """INSERT ... ON CONFLICT (user_id, lesson_id) DO UPDATE, возвращает строку"""
+        now = datetime.utcnow()
+        values = {"user_id": user_id, "lesson_id": lesson_id, "created_at": now, "updated_at": now, **values}
+        set_ = {**set_, "updated_at": now}
+        stmt = _insert(db, LessonProgress)
+        if stmt is None:
+            return _update_or_insert(
+                db, LessonProgress,
+                where=[LessonProgress.user_id == user_id, LessonProgress.lesson_id == lesson_id],
+                values=values, set_=set_
+            )
+        stmt = stmt.values(**values).on_conflict_do_update(
+            index_elements=[LessonProgress.user_id, LessonProgress.lesson_id],
+            set_=set_
+        )
+        return db.scalars(
+            stmt.returning(LessonProgress), execution_options={"populate_existing": True}
+        ).one()
+
     def mark_as_completed(self, db: Session, *, user_id: int, lesson_id: int, course_progress_id: int) -> LessonProgress:
-        """Отметить урок как завершенный"""
-        progress = self.get_user_lesson_progress(db, user_id=user_id, lesson_id=lesson_id)
-        
-        if not progress:
-            progress = LessonProgress(
-                user_id=user_id,
-                lesson_id=lesson_id,
-                course_progress_id=course_progress_id,
-                is_completed=True,
-                completed_at=datetime.utcnow()
+        """
+        Отметить урок как завершенный и пересчитать прогресс по курсу.
+
+        Два запроса в одной транзакции (upsert урока и UPDATE курса), один commit.
+        Число завершенных и всех уроков курса считается в SQL в запросе обновления.
+        В один запрос с CTE не объединено: UPDATE в PostgreSQL не видит строку,
+        вставленную CTE того же запроса, и пересчет был бы неверным.
+        """
+        now = datetime.utcnow()
+        progress = self._upsert(
+            db, user_id=user_id, lesson_id=lesson_id,
+            values={"course_progress_id": course_progress_id, "is_completed": True, "completed_at": now},
+            set_={"is_completed": True, "completed_at": func.coalesce(LessonProgress.completed_at, now)}
+        )
+
+        completed = (
+            select(func.count(LessonProgress.id))
+            .where(
+                LessonProgress.course_progress_id == CourseProgress.id,
+                LessonProgress.is_completed.is_(True)
             )
-            db.add(progress)
-        else:
-            progress.is_completed = True
-            progress.completed_at = datetime.utcnow()
-        
+            .scalar_subquery()
+        )
+        total = (
+            select(func.count(Lesson.id))
+            .join(Module, Lesson.module_id == Module.id)
+            .where(Module.course_id == CourseProgress.course_id)
+            .scalar_subquery()
+        )
+        db.execute(
+            update(CourseProgress)
+            .where(CourseProgress.id == course_progress_id)
+            .values(
+                completed_lessons=completed,
+                total_lessons=total,
+                progress_percentage=_progress_percentage(completed, total),
+                completed_at=_completed_at(completed, total, now),
+                last_accessed_at=now,
+                updated_at=now,
+            )
+            .execution_options(synchronize_session=False)
+        )
         db.commit()
-        db.refresh(progress)
         return progress
 
     def update_position(self, db: Session, *, user_id: int, lesson_id: int, position: int, course_progress_id: int) -> LessonProgress:
-        """Обновить позицию в уроке"""
-        progress = self.get_user_lesson_progress(db, user_id=user_id, lesson_id=lesson_id)
-        
-        if not progress:
-            progress = LessonProgress(
-                user_id=user_id,
-                lesson_id=lesson_id,
-                course_progress_id=course_progress_id,
-                last_position=position
+        """Обновить позицию в уроке (один upsert без предварительного чтения)"""
+        progress = self._upsert(
+            db, user_id=user_id, lesson_id=lesson_id,
+            values={"course_progress_id": course_progress_id, "last_position": position},
+            set_={"last_position": position}
+        )
+        db.commit()
+        return progress
+
+    def upsert_positions(self, db: Session, *, positions: List[Dict[str, Any]]) -> int:
+        """
+        Сохранить пачку позиций просмотра: {"user_id", "lesson_id", "course_id", "position", "updated_at"}.
+
+        Три запроса на всю пачку: создать недостающий прогресс по курсам,
+        получить его id и многострочный upsert позиций. Позиция не
+        перезаписывается более старым значением (сравнение по updated_at).
+        """
+        if not positions:
+            return 0
+        now = datetime.utcnow()
+        pairs = {(item["user_id"], item["course_id"]) for item in positions}
+        course_rows = [
+            {"user_id": user_id, "course_id": course_id, "created_at": now, "updated_at": now}
+            for user_id, course_id in pairs
+        ]
+        stmt = _insert(db, CourseProgress)
+        if stmt is None:
+            existing = set(db.execute(
+                select(CourseProgress.user_id, CourseProgress.course_id)
+                .where(tuple_(CourseProgress.user_id, CourseProgress.course_id).in_(list(pairs)))
+            ).tuples())
+            missing = [row for row in course_rows if (row["user_id"], row["course_id"]) not in existing]
+            if missing:
+                db.execute(insert(CourseProgress), missing)
+        else:
+            db.execute(
+                stmt.values(course_rows)
+                .on_conflict_do_nothing(index_elements=[CourseProgress.user_id, CourseProgress.course_id])
             )
-            db.add(progress)
+        course_progress_ids = {
+            (user_id, course_id): id
+            for id, user_id, course_id in db.execute(
+                select(CourseProgress.id, CourseProgress.user_id, CourseProgress.course_id)
+                .where(tuple_(CourseProgress.user_id, CourseProgress.course_id).in_(list(pairs)))
+            )
+        }
+
+        rows = [
+            {
+                "user_id": item["user_id"],
+                "lesson_id": item["lesson_id"],
+                "course_progress_id": course_progress_ids[(item["user_id"], item["course_id"])],
+                "last_position": item["position"],
+                "created_at": item["updated_at"],
+                "updated_at": item["updated_at"],
+            }
+            for item in positions
+        ]
+        stmt = _insert(db, LessonProgress)
+        if stmt is None:
+            self._write_positions(db, rows=rows)
         else:
-            progress.last_position = position
-        
+            stmt = stmt.values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[LessonProgress.user_id, LessonProgress.lesson_id],
+                set_={"last_position": stmt.excluded.last_position, "updated_at": stmt.excluded.updated_at},
+                where=LessonProgress.updated_at <= stmt.excluded.updated_at
+            )
+            db.execute(stmt)
         db.commit()
-        db.refresh(progress)
-        return progress
+        return len(positions)
+
+    def _write_positions(self, db: Session, *, rows: List[Dict[str, Any]]) -> None:
+        """Запись позиций для диалектов без ON CONFLICT: UPDATE существующих, INSERT новых"""
+        keys = [(row["user_id"], row["lesson_id"]) for row in rows]
+        existing = set(db.execute(
+            select(LessonProgress.user_id, LessonProgress.lesson_id)
+            .where(tuple_(LessonProgress.user_id, LessonProgress.lesson_id).in_(keys))
+        ).tuples())
+        for row in rows:
+            if (row["user_id"], row["lesson_id"]) not in existing:
+                continue
+            db.execute(
+                update(LessonProgress)
+                .where(
+                    LessonProgress.user_id == row["user_id"],
+                    LessonProgress.lesson_id == row["lesson_id"],
+                    LessonProgress.updated_at <= row["updated_at"]
+                )
+                .values(last_position=row["last_position"], updated_at=row["updated_at"])
+                .execution_options(synchronize_session=False)
+            )
+        new_rows = [row for row in rows if (row["user_id"], row["lesson_id"]) not in existing]
+        if new_rows:
+            db.execute(insert(LessonProgress), new_rows)
 
 
 activity_crud = CRUDActivityLog(ActivityLog)
 notification_crud = CRUDNotification(Notification)
-progress_crud = CRUDCourseProgress(CourseProgress) 
\ No newline at end of file
+progress_crud = CRUDCourseProgress(CourseProgress)
+lesson_progress_crud = CRUDLessonProgress(LessonProgress) 
\ No newline at end of file
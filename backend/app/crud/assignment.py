@@ -3,6 +3,7 @@ from datetime import datetime
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 
+from app.core.pagination import PageCursor
 from app.crud.base import CRUDBase
 from app.models.assignment import Assignment, AssignmentSubmission
 from app.schemas.assignment import AssignmentCreate, AssignmentUpdate, AssignmentSubmissionCreate, AssignmentSubmissionUpdate
@@ -31,11 +32,10 @@ class CRUDAssignmentSubmission(CRUDBase[AssignmentSubmission, AssignmentSubmissi
             AssignmentSubmission.assignment_id == assignment_id
         ).offset(skip).limit(limit).all()
 
-    def get_by_student(self, db: Session, *, student_id: int, skip: int = 0, limit: int = 100) -> List[AssignmentSubmission]:
+    def get_by_student(self, db: Session, *, student_id: int, skip: int = 0, limit: int = 100, cursor: Optional[PageCursor] = None) -> List[AssignmentSubmission]:
         """Получить отправки студента"""
-        return db.query(AssignmentSubmission).filter(
-            AssignmentSubmission.student_id == student_id
-        ).offset(skip).limit(limit).all()
+        query = db.query(AssignmentSubmission).filter(AssignmentSubmission.student_id == student_id)
+        return self.paginate(query, skip=skip, limit=limit, cursor=cursor).all()
 
     def get_by_student_and_assignment(self, db: Session, *, student_id: int, assignment_id: int) -> Optional[AssignmentSubmission]:
         """Получить отправку студента для конкретного задания"""
@@ -2,8 +2,10 @@ from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, or_, select, func, tuple_
 
+from app.core.pagination import PageCursor
 from app.models.base import Base
 
 ModelType = TypeVar("ModelType", bound=Base)
@@ -11,6 +13,23 @@ CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
 
+def paginate(query, model, *, skip: int = 0, limit: Optional[int] = 100, cursor: Optional[PageCursor] = None):
+    """
+    Применить пагинацию к запросу (Query или select).
+
+    Без курсора - offset/limit с сортировкой запроса. С курсором - keyset
+    по (created_at DESC, id DESC): страница начинается после записи курсора,
+    стоимость не зависит от глубины страницы.
+    """
+    if cursor is None:
+        return query.offset(skip).limit(limit)
+    if not cursor.is_first_page:
+        query = query.filter(
+            tuple_(model.created_at, model.id) < tuple_(cursor.created_at, cursor.id)
+        )
+    return query.order_by(None).order_by(model.created_at.desc(), model.id.desc()).limit(limit)
+
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType]):
         """
@@ -27,10 +46,14 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         return db.query(self.model).filter(self.model.id == id).first()
 
     def get_multi(
-        self, db: Session, *, skip: int = 0, limit: int = 100
+        self, db: Session, *, skip: int = 0, limit: int = 100, cursor: Optional[PageCursor] = None
     ) -> List[ModelType]:
-        """Получить список объектов с пагинацией"""
-        return db.query(self.model).offset(skip).limit(limit).all()
+        """Получить список объектов с пагинацией (skip или курсор)"""
+        return self.paginate(db.query(self.model), skip=skip, limit=limit, cursor=cursor).all()
+
+    def paginate(self, query, *, skip: int = 0, limit: Optional[int] = 100, cursor: Optional[PageCursor] = None):
+        """Пагинация запроса по модели CRUD объекта (см. `paginate`)"""
+        return paginate(query, self.model, skip=skip, limit=limit, cursor=cursor)
 
     def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
         """Создать новый объект"""
@@ -110,4 +133,119 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
                 .limit(limit)
                 .all()
             )
-        return [] 
\ No newline at end of file
+        return [] 
+
+
+class AsyncCRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
+    def __init__(self, model: Type[ModelType]):
+        """
+        Асинхронный CRUD объект для async def эндпоинтов.
+
+        Повторяет интерфейс `CRUDBase`, но работает с `AsyncSession`
+        и не блокирует event loop на запросах к базе данных.
+
+        **Параметры**
+        * `model`: SQLAlchemy модель класса
+        """
+        self.model = model
+
+    async def get(self, db: AsyncSession, id: Any) -> Optional[ModelType]:
+        """Получить объект по ID"""
+        return await db.get(self.model, id)
+
+    async def get_multi(
+        self, db: AsyncSession, *, skip: int = 0, limit: int = 100, cursor: Optional[PageCursor] = None
+    ) -> List[ModelType]:
+        """Получить список объектов с пагинацией (skip или курсор)"""
+        result = await db.execute(self.paginate(select(self.model), skip=skip, limit=limit, cursor=cursor))
+        return list(result.scalars().all())
+
+    def paginate(self, query, *, skip: int = 0, limit: Optional[int] = 100, cursor: Optional[PageCursor] = None):
+        """Пагинация запроса по модели CRUD объекта (см. `paginate`)"""
+        return paginate(query, self.model, skip=skip, limit=limit, cursor=cursor)
+
+    async def create(self, db: AsyncSession, *, obj_in: CreateSchemaType) -> ModelType:
+        """Создать новый объект"""
+        obj_in_data = jsonable_encoder(obj_in)
+        db_obj = self.model(**obj_in_data)
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def update(
+        self,
+        db: AsyncSession,
+        *,
+        db_obj: ModelType,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]]
+    ) -> ModelType:
+        """Обновить объект"""
+        obj_data = jsonable_encoder(db_obj)
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.dict(exclude_unset=True)
+        for field in obj_data:
+            if field in update_data:
+                setattr(db_obj, field, update_data[field])
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def remove(self, db: AsyncSession, *, id: int) -> Optional[ModelType]:
+        """Удалить объект"""
+        obj = await db.get(self.model, id)
+        if obj:
+            await db.delete(obj)
+            await db.commit()
+        return obj
+
+    async def count(self, db: AsyncSession) -> int:
+        """Подсчитать количество объектов"""
+        result = await db.execute(select(func.count()).select_from(self.model))
+        return result.scalar_one()
+
+    async def exists(self, db: AsyncSession, id: int) -> bool:
+        """Проверить существование объекта"""
+        result = await db.execute(select(self.model.id).filter(self.model.id == id).limit(1))
+        return result.first() is not None
+
+    async def get_by_field(self, db: AsyncSession, field: str, value: Any) -> Optional[ModelType]:
+        """Получить объект по произвольному полю"""
+        result = await db.execute(
+            select(self.model).filter(getattr(self.model, field) == value).limit(1)
+        )
+        return result.scalars().first()
+
+    async def get_multi_by_field(
+        self, db: AsyncSession, field: str, value: Any, skip: int = 0, limit: int = 100
+    ) -> List[ModelType]:
+        """Получить список объектов по произвольному полю"""
+        result = await db.execute(
+            select(self.model)
+            .filter(getattr(self.model, field) == value)
+            .offset(skip)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def search(
+        self, db: AsyncSession, search_term: str, fields: List[str], skip: int = 0, limit: int = 100
+    ) -> List[ModelType]:
+        """Поиск по нескольким полям"""
+        conditions = []
+        for field in fields:
+            if hasattr(self.model, field):
+                conditions.append(getattr(self.model, field).ilike(f"%{search_term}%"))
+
+        if conditions:
+            result = await db.execute(
+                select(self.model)
+                .filter(or_(*conditions))
+                .offset(skip)
+                .limit(limit)
+            )
+            return list(result.scalars().all())
+        return []
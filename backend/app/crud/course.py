@@ -1,12 +1,67 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+import html
+import re
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, or_, select, func, inspect, literal, literal_column
 
-from app.crud.base import CRUDBase
+from app.crud.base import CRUDBase, AsyncCRUDBase
+from app.models.assignment import Assignment
 from app.models.course import Course, Module, Lesson
+from app.models.test import Test
 from app.schemas.course import CourseCreate, CourseUpdate, ModuleCreate, ModuleUpdate, LessonCreate, LessonUpdate
 
 
+_SEARCH_TERM = re.compile(r"\w+")
+
+# Маркеры подсветки ts_headline: описание приходит из базы без экранирования,
+# поэтому фрагмент экранируется целиком, а маркеры заменяются на <mark> после
+_SNIPPET_START, _SNIPPET_STOP = "\x02", "\x03"
+_SNIPPET_OPTIONS = (
+    f'StartSel="{_SNIPPET_START}", StopSel="{_SNIPPET_STOP}", MaxWords=35, MinWords=15, MaxFragments=2'
+)
+
+# Наличие колонки courses.search_vector (миграция 0002) по URL базы данных
+_fts_available: Dict[str, bool] = {}
+
+
+def _search_terms(search_term: str) -> List[str]:
+    """Слова поискового запроса (без спецсимволов tsquery)"""
+    return [term.lower() for term in _SEARCH_TERM.findall(search_term)][:10]
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _highlight(text: Optional[str], terms: List[str], max_words: int = 35) -> Optional[str]:
+    """Фрагмент текста вокруг первого совпадения с подсветкой <mark> (для SQLite)"""
+    if not text:
+        return None
+    words = text.split()
+
+    def matches(word: str) -> bool:
+        word = word.lower().lstrip("«\"(")
+        return any(word.startswith(term) for term in terms)
+
+    first_match = next((i for i, word in enumerate(words) if matches(word)), 0)
+    start = max(first_match - max_words // 3, 0)
+    fragment = []
+    for word in words[start:start + max_words]:
+        escaped = html.escape(word)
+        if matches(word):
+            escaped = f"<mark>{escaped}</mark>"
+        fragment.append(escaped)
+    return " ".join(fragment)
+
+
+def _mark_snippet(snippet: Optional[str]) -> Optional[str]:
+    """Экранировать фрагмент ts_headline и заменить маркеры подсветки на <mark>"""
+    if not snippet:
+        return None
+    return html.escape(snippet).replace(_SNIPPET_START, "<mark>").replace(_SNIPPET_STOP, "</mark>")
+
+
 class CRUDCourse(CRUDBase[Course, CourseCreate, CourseUpdate]):
     def get_by_slug(self, db: Session, *, slug: str) -> Optional[Course]:
         """Получить курс по slug"""
@@ -26,17 +81,162 @@ class CRUDCourse(CRUDBase[Course, CourseCreate, CourseUpdate]):
         """Получить курсы куратора"""
         return db.query(Course).filter(Course.curator_id == curator_id).offset(skip).limit(limit).all()
 
-    def search_courses(self, db: Session, *, search_term: str, skip: int = 0, limit: int = 100) -> List[Course]:
-        """Поиск курсов по названию и описанию"""
-        return db.query(Course).filter(
-            and_(
+    def get_tree(self, db: Session, *, course_id: int) -> Optional[Course]:
+        """
+        Получить курс с модулями, уроками, тестами и заданиями.
+        Каждый уровень загружается одним запросом (selectinload),
+        у уроков, тестов и заданий выбираются только колонки для оглавления.
+        """
+        lessons = selectinload(Course.modules).selectinload(Module.lessons)
+        course = db.query(Course).options(
+            lessons.load_only(
+                Lesson.id, Lesson.module_id, Lesson.title, Lesson.order_index,
+                Lesson.lesson_type, Lesson.duration_minutes, Lesson.is_free, Lesson.updated_at
+            ),
+            lessons.selectinload(Lesson.tests).load_only(
+                Test.id, Test.lesson_id, Test.title, Test.status, Test.time_limit_minutes,
+                Test.passing_score, Test.max_attempts, Test.updated_at
+            ),
+            lessons.selectinload(Lesson.assignments).load_only(
+                Assignment.id, Assignment.lesson_id, Assignment.title, Assignment.assignment_type,
+                Assignment.status, Assignment.max_score, Assignment.due_date, Assignment.updated_at
+            )
+        ).filter(Course.id == course_id).first()
+        if course:
+            course.modules.sort(key=lambda module: module.order_index)
+            for module in course.modules:
+                module.lessons.sort(key=lambda lesson: lesson.order_index)
+        return course
+
+    def get_search_documents(self, db: Session, *, course_id: Optional[int] = None) -> List[Course]:
+        """Опубликованные курсы с названиями уроков для поискового индекса"""
+        query = db.query(Course).options(
+            selectinload(Course.modules).load_only(Module.id, Module.course_id)
+            .selectinload(Module.lessons).load_only(Lesson.id, Lesson.module_id, Lesson.title)
+        ).filter(Course.status == "published")
+        if course_id is not None:
+            query = query.filter(Course.id == course_id)
+        return query.all()
+
+    def get_search_fingerprint(self, db: Session, *, exclude_course_id: Optional[int] = None) -> List[Optional[str]]:
+        """
+        Отпечаток опубликованного каталога (для проверки снимка поискового индекса):
+        число курсов, последнее изменение курса, число уроков, последнее изменение урока
+        """
+        courses = db.query(func.count(Course.id), func.max(Course.updated_at)).filter(
+            Course.status == "published"
+        )
+        lessons = db.query(func.count(Lesson.id), func.max(Lesson.updated_at)).join(
+            Module, Lesson.module_id == Module.id
+        ).join(Course, Module.course_id == Course.id).filter(Course.status == "published")
+        if exclude_course_id is not None:
+            courses = courses.filter(Course.id != exclude_course_id)
+            lessons = lessons.filter(Course.id != exclude_course_id)
+        courses, lessons = courses.one(), lessons.one()
+        return [
+            str(value.isoformat() if hasattr(value, "isoformat") else value)
+            for value in (*courses, *lessons)
+        ]
+
+    def _use_fts(self, db: Session) -> bool:
+        """Postgres с примененной миграцией полнотекстового поиска"""
+        bind = db.get_bind()
+        if bind.dialect.name != "postgresql":
+            return False
+        key = str(bind.url)
+        if key not in _fts_available:
+            columns = inspect(bind).get_columns("courses")
+            _fts_available[key] = any(column["name"] == "search_vector" for column in columns)
+        return _fts_available[key]
+
+    def search_ranked(
+        self, db: Session, *, search_term: str, skip: int = 0, limit: int = 100
+    ) -> List[Tuple[Course, float, Optional[str]]]:
+        """
+        Поиск опубликованных курсов с ранжированием.
+        Каждое слово запроса ищется как префикс (автодополнение "фото" -> "фотография").
+        Возвращает (курс, релевантность, фрагмент описания с <mark>).
+        """
+        terms = _search_terms(search_term)
+        if not terms:
+            return []
+
+        if self._use_fts(db):
+            search_vector = literal_column("courses.search_vector")
+            prefix_query = " & ".join(f"{term}:*" for term in terms)
+            ts_query = func.to_tsquery("russian", prefix_query).op("||")(
+                func.to_tsquery("english", prefix_query)
+            )
+            rank = func.ts_rank_cd(search_vector, ts_query)
+            snippet = func.ts_headline(
+                "russian",
+                func.coalesce(Course.description, ""),
+                ts_query,
+                _SNIPPET_OPTIONS
+            )
+            rows = db.query(Course, rank, snippet).filter(
                 Course.status == "published",
-                or_(
-                    Course.title.ilike(f"%{search_term}%"),
-                    Course.description.ilike(f"%{search_term}%")
-                )
+                search_vector.op("@@")(ts_query)
+            ).order_by(rank.desc(), Course.id).offset(skip).limit(limit).all()
+            return [
+                (course, float(course_rank), _mark_snippet(course_snippet))
+                for course, course_rank, course_snippet in rows
+            ]
+
+        # Без полнотекстового индекса (SQLite, тесты): префиксы слов через LIKE,
+        # релевантность - совпадения в названии весомее, чем в описании
+        conditions = []
+        for term in terms:
+            pattern = _escape_like(term)
+            conditions.append(or_(
+                Course.title.ilike(f"{pattern}%", escape="\\"),
+                Course.title.ilike(f"% {pattern}%", escape="\\"),
+                Course.description.ilike(f"{pattern}%", escape="\\"),
+                Course.description.ilike(f"% {pattern}%", escape="\\")
+            ))
+        courses = db.query(Course).filter(Course.status == "published", *conditions).all()
+
+        def fallback_rank(course: Course) -> float:
+            title_words = (course.title or "").lower().split()
+            description_words = (course.description or "").lower().split()
+            return sum(
+                1.0 * any(word.startswith(term) for word in title_words)
+                + 0.4 * any(word.startswith(term) for word in description_words)
+                for term in terms
             )
-        ).offset(skip).limit(limit).all()
+
+        hits = [(course, fallback_rank(course), _highlight(course.description, terms)) for course in courses]
+        hits.sort(key=lambda hit: (-hit[1], hit[0].id))
+        return hits[skip:skip + limit]
+
+    def search_courses(self, db: Session, *, search_term: str, skip: int = 0, limit: int = 100) -> List[Course]:
+        """Поиск курсов по названию и описанию"""
+        return [
+            course for course, _, _ in
+            self.search_ranked(db, search_term=search_term, skip=skip, limit=limit)
+        ]
+
+    def suggest_titles(self, db: Session, *, prefix: str, limit: int = 10) -> List[Course]:
+        """Автодополнение названий опубликованных курсов"""
+        prefix = prefix.strip()
+        if not prefix:
+            return []
+        pattern = _escape_like(prefix)
+        query = db.query(Course).filter(Course.status == "published")
+
+        if self._use_fts(db):
+            # Индекс ix_courses_title_trgm обслуживает и ILIKE, и <% (word_similarity)
+            return query.filter(or_(
+                Course.title.ilike(f"{pattern}%", escape="\\"),
+                literal(prefix).op("<%")(Course.title)
+            )).order_by(
+                func.word_similarity(prefix, Course.title).desc(), Course.title
+            ).limit(limit).all()
+
+        return query.filter(or_(
+            Course.title.ilike(f"{pattern}%", escape="\\"),
+            Course.title.ilike(f"% {pattern}%", escape="\\")
+        )).order_by(Course.title).limit(limit).all()
 
 
 class CRUDModule(CRUDBase[Module, ModuleCreate, ModuleUpdate]):
@@ -67,6 +267,18 @@ class CRUDLesson(CRUDBase[Lesson, LessonCreate, LessonUpdate]):
         ).offset(skip).limit(limit).all()
 
 
+class AsyncCRUDLesson(AsyncCRUDBase[Lesson, LessonCreate, LessonUpdate]):
+    async def get_with_course(self, db: AsyncSession, *, lesson_id: int) -> Optional[Lesson]:
+        """Получить урок вместе с модулем и курсом"""
+        result = await db.execute(
+            select(Lesson)
+            .options(selectinload(Lesson.module).selectinload(Module.course))
+            .filter(Lesson.id == lesson_id)
+        )
+        return result.scalars().first()
+
+
 course_crud = CRUDCourse(Course)
 module_crud = CRUDModule(Module)
-lesson_crud = CRUDLesson(Lesson) 
\ No newline at end of file
+lesson_crud = CRUDLesson(Lesson) 
+async_lesson_crud = AsyncCRUDLesson(Lesson)
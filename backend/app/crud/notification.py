@@ -4,21 +4,37 @@ CRUD операции для уведомлений
 
 from typing import List, Optional, Dict, Any
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, insert, update, delete
 
-from app.crud.base import CRUDBase
-from app.models.notification import Notification
-from app.schemas.notification import NotificationCreate, NotificationUpdate
+from app.core.pagination import PageCursor
+from app.crud.base import CRUDBase, AsyncCRUDBase
+from app.models.activity import Notification
+from app.schemas.activity import NotificationCreate, NotificationUpdate
 
 
 class CRUDNotification(CRUDBase[Notification, NotificationCreate, NotificationUpdate]):
     """CRUD операции для уведомлений"""
     
-    def get_by_user(self, db: Session, user_id: int, skip: int = 0, limit: int = 100):
+    def create_many(self, db: Session, *, objs_in: List[Dict[str, Any]]) -> List[int]:
+        """
+        Создать уведомления многострочным INSERT ... RETURNING
+        (без загрузки ORM объектов). Возвращает id созданных записей.
+        """
+        if not objs_in:
+            return []
+        result = db.execute(
+            insert(self.model).returning(self.model.id),
+            objs_in
+        )
+        ids = list(result.scalars().all())
+        db.commit()
+        return ids
+    
+    def get_by_user(self, db: Session, user_id: int, skip: int = 0, limit: int = 100, cursor: Optional[PageCursor] = None):
         """Получить уведомления пользователя"""
-        return db.query(self.model).filter(
-            self.model.user_id == user_id
-        ).offset(skip).limit(limit).all()
+        query = db.query(self.model).filter(self.model.user_id == user_id)
+        return self.paginate(query, skip=skip, limit=limit, cursor=cursor).all()
     
     def get_unread_by_user(self, db: Session, user_id: int):
         """Получить непрочитанные уведомления пользователя"""
@@ -53,11 +69,10 @@ class CRUDNotification(CRUDBase[Notification, NotificationCreate, NotificationUp
         
         return {stat.notification_type: stat.count for stat in stats}
     
-    def get_by_priority(self, db: Session, priority: int, skip: int = 0, limit: int = 100):
+    def get_by_priority(self, db: Session, priority: int, skip: int = 0, limit: int = 100, cursor: Optional[PageCursor] = None):
         """Получить уведомления по приоритету"""
-        return db.query(self.model).filter(
-            self.model.priority == priority
-        ).offset(skip).limit(limit).all()
+        query = db.query(self.model).filter(self.model.priority == priority)
+        return self.paginate(query, skip=skip, limit=limit, cursor=cursor).all()
     
     def get_recent_notifications(self, db: Session, user_id: int, days: int = 7):
         """Получить недавние уведомления пользователя"""
@@ -70,4 +85,79 @@ class CRUDNotification(CRUDBase[Notification, NotificationCreate, NotificationUp
         ).order_by(self.model.created_at.desc()).all()
 
 
-notification_crud = CRUDNotification(Notification) 
\ No newline at end of file
+class AsyncCRUDNotification(AsyncCRUDBase[Notification, NotificationCreate, NotificationUpdate]):
+    """Асинхронные CRUD операции для уведомлений"""
+
+    async def create_many(self, db: AsyncSession, *, objs_in: List[Dict[str, Any]]) -> List[int]:
+        """
+        Создать уведомления многострочным INSERT ... RETURNING
+        (без загрузки ORM объектов). Возвращает id созданных записей.
+        """
+        if not objs_in:
+            return []
+        result = await db.execute(
+            insert(self.model).returning(self.model.id),
+            objs_in
+        )
+        ids = list(result.scalars().all())
+        await db.commit()
+        return ids
+
+    async def get_by_user(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        is_read: Optional[bool] = None,
+        cursor: Optional[PageCursor] = None
+    ) -> List[Notification]:
+        """Получить уведомления пользователя"""
+        query = select(self.model).filter(self.model.user_id == user_id)
+        if is_read is not None:
+            query = query.filter(self.model.is_read == is_read)
+        result = await db.execute(self.paginate(query, skip=skip, limit=limit, cursor=cursor))
+        return list(result.scalars().all())
+
+    async def get_unread_by_user(self, db: AsyncSession, user_id: int) -> List[Notification]:
+        """Получить непрочитанные уведомления пользователя"""
+        return await self.get_by_user(db, user_id=user_id, limit=None, is_read=False)
+
+    async def count_unread(self, db: AsyncSession) -> int:
+        """Подсчитать непрочитанные уведомления"""
+        result = await db.execute(
+            select(func.count(self.model.id)).filter(self.model.is_read == False)
+        )
+        return result.scalar_one()
+
+    async def mark_all_as_read(self, db: AsyncSession, user_id: int) -> int:
+        """Отметить все уведомления пользователя как прочитанные"""
+        result = await db.execute(
+            update(self.model)
+            .filter(self.model.user_id == user_id, self.model.is_read == False)
+            .values(is_read=True)
+        )
+        await db.commit()
+        return result.rowcount
+
+    async def delete_all_by_user(self, db: AsyncSession, user_id: int) -> int:
+        """Удалить все уведомления пользователя"""
+        result = await db.execute(
+            delete(self.model).filter(self.model.user_id == user_id)
+        )
+        await db.commit()
+        return result.rowcount
+
+    async def get_stats_by_type(self, db: AsyncSession) -> dict:
+        """Получить статистику уведомлений по типам"""
+        result = await db.execute(
+            select(
+                self.model.notification_type,
+                func.count(self.model.id).label('count')
+            ).group_by(self.model.notification_type)
+        )
+        return {row.notification_type: row.count for row in result}
+
+
+notification_crud = CRUDNotification(Notification)
+async_notification_crud = AsyncCRUDNotification(Notification) 
\ No newline at end of file
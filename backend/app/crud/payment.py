@@ -1,25 +1,32 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple, Union
 from datetime import datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, or_, func, select, update
 
-from app.crud.base import CRUDBase
-from app.models.payment import Payment, UserCourseAccess
+from app.core.config import settings
+from app.core.access_cache import AccessSet, access_cache, has_course_access, make_access_set
+from app.core.pagination import PageCursor
+from app.crud.base import CRUDBase, AsyncCRUDBase
+from app.models.payment import AccessStatus, Payment, UserCourseAccess
 from app.schemas.payment import PaymentCreate, PaymentUpdate, UserCourseAccessCreate, UserCourseAccessUpdate
 
 
 class CRUDPayment(CRUDBase[Payment, PaymentCreate, PaymentUpdate]):
-    def get_by_user(self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100) -> List[Payment]:
+    def get_by_user(self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100, cursor: Optional[PageCursor] = None) -> List[Payment]:
         """Получить платежи пользователя"""
-        return db.query(Payment).filter(Payment.user_id == user_id).order_by(Payment.created_at.desc()).offset(skip).limit(limit).all()
+        query = db.query(Payment).filter(Payment.user_id == user_id).order_by(Payment.created_at.desc())
+        return self.paginate(query, skip=skip, limit=limit, cursor=cursor).all()
 
-    def get_by_course(self, db: Session, *, course_id: int, skip: int = 0, limit: int = 100) -> List[Payment]:
+    def get_by_course(self, db: Session, *, course_id: int, skip: int = 0, limit: int = 100, cursor: Optional[PageCursor] = None) -> List[Payment]:
         """Получить платежи за курс"""
-        return db.query(Payment).filter(Payment.course_id == course_id).order_by(Payment.created_at.desc()).offset(skip).limit(limit).all()
+        query = db.query(Payment).filter(Payment.course_id == course_id).order_by(Payment.created_at.desc())
+        return self.paginate(query, skip=skip, limit=limit, cursor=cursor).all()
 
-    def get_by_status(self, db: Session, *, status: str, skip: int = 0, limit: int = 100) -> List[Payment]:
+    def get_by_status(self, db: Session, *, status: str, skip: int = 0, limit: int = 100, cursor: Optional[PageCursor] = None) -> List[Payment]:
         """Получить платежи по статусу"""
-        return db.query(Payment).filter(Payment.status == status).order_by(Payment.created_at.desc()).offset(skip).limit(limit).all()
+        query = db.query(Payment).filter(Payment.status == status).order_by(Payment.created_at.desc())
+        return self.paginate(query, skip=skip, limit=limit, cursor=cursor).all()
 
     def get_by_external_id(self, db: Session, *, external_id: str) -> Optional[Payment]:
         """Получить платеж по внешнему ID"""
@@ -75,20 +82,130 @@ class CRUDUserCourseAccess(CRUDBase[UserCourseAccess, UserCourseAccessCreate, Us
             )
         ).first()
 
+    def get_access_set(self, db: Session, *, user_id: int) -> AccessSet:
+        """Активные доступы пользователя: {course_id: expires_at}"""
+        rows = db.execute(
+            select(UserCourseAccess.course_id, UserCourseAccess.expires_at).where(
+                UserCourseAccess.user_id == user_id,
+                UserCourseAccess.status == AccessStatus.ACTIVE
+            )
+        )
+        return make_access_set(rows)
+
     def check_access(self, db: Session, *, user_id: int, course_id: int) -> bool:
-        """Проверить доступ пользователя к курсу"""
-        access = self.get_active_access(db, user_id=user_id, course_id=course_id)
-        if not access:
-            return False
-        
-        # Проверяем срок действия
-        if access.expires_at and access.expires_at < datetime.utcnow():
-            access.status = "expired"
-            db.add(access)
-            db.commit()
-            return False
-        
-        return True
+        """
+        Проверить доступ пользователя к курсу.
+        Срок действия проверяется по кэшу доступов; статус просроченных
+        доступов меняет фоновая задача, а не запрос на чтение.
+        """
+        accesses = access_cache.get(user_id)
+        if accesses is None:
+            accesses = self.get_access_set(db, user_id=user_id)
+            access_cache.set(user_id, accesses)
+        return has_course_access(accesses, course_id)
+
+    # Кэш доступов сбрасывается и до, и после commit: набор, прочитанный
+    # параллельным запросом до commit, не остается в кэше до истечения TTL
+
+    def create(self, db: Session, *, obj_in: UserCourseAccessCreate) -> UserCourseAccess:
+        """Выдать доступ (в том числе после оплаты)"""
+        access_cache.invalidate(obj_in.user_id)
+        access = super().create(db, obj_in=obj_in)
+        access_cache.invalidate(access.user_id)
+        return access
+
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: UserCourseAccess,
+        obj_in: Union[UserCourseAccessUpdate, Dict[str, Any]]
+    ) -> UserCourseAccess:
+        """Обновить доступ (статус, срок действия)"""
+        access_cache.invalidate(db_obj.user_id)
+        access = super().update(db, db_obj=db_obj, obj_in=obj_in)
+        access_cache.invalidate(access.user_id)
+        return access
+
+    def expire_overdue(
+        self,
+        db: Session,
+        *,
+        limit: int = settings.ACCESS_EXPIRY_BATCH_SIZE,
+        now: Optional[datetime] = None
+    ) -> List[Tuple[int, int]]:
+        """
+        Перевести пачку просроченных активных доступов в статус expired
+        одним UPDATE. Возвращает (user_id, course_id) истекших доступов;
+        пустой список - просроченных доступов больше нет.
+        Тот же UPDATE сбрасывает expiry_notified_at: уведомление ждет
+        отправки (get_pending_expiry_notifications) и не теряется при сбое.
+        """
+        now = now or datetime.utcnow()
+        # SKIP LOCKED: параллельные воркеры берут разные пачки, не дожидаясь друг друга
+        batch = (
+            select(UserCourseAccess.id)
+            .where(
+                UserCourseAccess.status == AccessStatus.ACTIVE,
+                UserCourseAccess.expires_at < now
+            )
+            .order_by(UserCourseAccess.expires_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        rows = db.execute(
+            update(UserCourseAccess)
+            .where(
+                UserCourseAccess.id.in_(batch.scalar_subquery()),
+                UserCourseAccess.status == AccessStatus.ACTIVE
+            )
+            .values(status=AccessStatus.EXPIRED, expiry_notified_at=None, updated_at=now)
+            .returning(UserCourseAccess.user_id, UserCourseAccess.course_id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        user_ids = {user_id for user_id, _ in rows}
+        for user_id in user_ids:
+            access_cache.invalidate(user_id)
+        db.commit()
+        for user_id in user_ids:
+            access_cache.invalidate(user_id)
+        return [(user_id, course_id) for user_id, course_id in rows]
+
+    def get_pending_expiry_notifications(
+        self,
+        db: Session,
+        *,
+        limit: int = settings.ACCESS_EXPIRY_BATCH_SIZE
+    ) -> List[Tuple[int, int, int]]:
+        """
+        Пачка истекших доступов без отправленного уведомления: (id, user_id, course_id).
+        Строки блокируются до commit вызывающего (SKIP LOCKED: параллельные
+        воркеры не отправят одно уведомление дважды).
+        """
+        return [
+            (id, user_id, course_id)
+            for id, user_id, course_id in db.execute(
+                select(UserCourseAccess.id, UserCourseAccess.user_id, UserCourseAccess.course_id)
+                .where(
+                    UserCourseAccess.status == AccessStatus.EXPIRED,
+                    UserCourseAccess.expiry_notified_at.is_(None)
+                )
+                .order_by(UserCourseAccess.id)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+        ]
+
+    def mark_expiry_notified(self, db: Session, *, access_ids: List[int], now: Optional[datetime] = None) -> None:
+        """Отметить, что уведомления об истечении доступов поставлены в очередь (фиксирует вызывающий)"""
+        if not access_ids:
+            return
+        db.execute(
+            update(UserCourseAccess)
+            .where(UserCourseAccess.id.in_(access_ids))
+            .values(expiry_notified_at=now or datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
 
     def update_last_accessed(self, db: Session, *, access_id: int) -> UserCourseAccess:
         """Обновить время последнего доступа"""
@@ -104,12 +221,48 @@ class CRUDUserCourseAccess(CRUDBase[UserCourseAccess, UserCourseAccessCreate, Us
         """Отозвать доступ"""
         access = self.get(db, id=access_id)
         if access:
+            access_cache.invalidate(access.user_id)
             access.status = "cancelled"
             db.add(access)
             db.commit()
             db.refresh(access)
+            access_cache.invalidate(access.user_id)
         return access
 
 
+class AsyncCRUDUserCourseAccess(AsyncCRUDBase[UserCourseAccess, UserCourseAccessCreate, UserCourseAccessUpdate]):
+    async def get_active_access(self, db: AsyncSession, *, user_id: int, course_id: int) -> Optional[UserCourseAccess]:
+        """Получить активный доступ пользователя к курсу"""
+        result = await db.execute(
+            select(UserCourseAccess).filter(
+                and_(
+                    UserCourseAccess.user_id == user_id,
+                    UserCourseAccess.course_id == course_id,
+                    UserCourseAccess.status == "active"
+                )
+            ).limit(1)
+        )
+        return result.scalars().first()
+
+    async def get_access_set(self, db: AsyncSession, *, user_id: int) -> AccessSet:
+        """Активные доступы пользователя: {course_id: expires_at}"""
+        result = await db.execute(
+            select(UserCourseAccess.course_id, UserCourseAccess.expires_at).where(
+                UserCourseAccess.user_id == user_id,
+                UserCourseAccess.status == AccessStatus.ACTIVE
+            )
+        )
+        return make_access_set(result)
+
+    async def check_access(self, db: AsyncSession, *, user_id: int, course_id: int) -> bool:
+        """Проверить доступ пользователя к курсу (по кэшу доступов, без записи)"""
+        accesses = await access_cache.aget(user_id)
+        if accesses is None:
+            accesses = await self.get_access_set(db, user_id=user_id)
+            await access_cache.aset(user_id, accesses)
+        return has_course_access(accesses, course_id)
+
+
 payment_crud = CRUDPayment(Payment)
-access_crud = CRUDUserCourseAccess(UserCourseAccess) 
\ No newline at end of file
+access_crud = CRUDUserCourseAccess(UserCourseAccess) 
+async_access_crud = AsyncCRUDUserCourseAccess(UserCourseAccess)
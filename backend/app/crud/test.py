@@ -1,11 +1,14 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Union
 from datetime import datetime
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from sqlalchemy import DateTime, Integer, and_, or_, bindparam, func, delete, insert, select, update
 
+from app.core.pagination import PageCursor
+from app.core.test_scoring import GradeResult, get_answer_key, grade_answers
 from app.crud.base import CRUDBase
 from app.models.test import Test, Question, Answer, TestAttempt, TestAnswer
-from app.schemas.test import TestCreate, TestUpdate, QuestionCreate, QuestionUpdate, AnswerCreate, AnswerUpdate, TestAttemptCreate, TestAttemptUpdate
+from app.schemas.test import TestCreate, TestUpdate, QuestionCreate, QuestionUpdate, AnswerCreate, AnswerUpdate, TestAttemptCreate, TestAttemptUpdate, TestAnswerCreate, TestAnswerUpdate, TestAnswerSubmit
 
 
 class CRUDTest(CRUDBase[Test, TestCreate, TestUpdate]):
@@ -24,6 +27,58 @@ class CRUDTest(CRUDBase[Test, TestCreate, TestUpdate]):
         return db.query(Test).filter(Test.created_by == creator_id).offset(skip).limit(limit).all()
 
 
+# Повторы вставки попытки при конфликте номера (параллельный старт того же студента)
+ATTEMPT_ADMISSION_RETRIES = 3
+
+
+class AttemptAdmissionConflict(RuntimeError):
+    """Попытку не удалось начать: все повторы проиграли параллельным стартам"""
+
+
+def _admission_statement():
+    """
+    INSERT ... SELECT новой попытки, если попыток студента меньше лимита.
+    Строится один раз: старт попытки - горячий путь, параметры передаются при выполнении.
+    """
+    test_id = bindparam("test_id", type_=Integer())
+    student_id = bindparam("student_id", type_=Integer())
+    now = bindparam("now", type_=DateTime())
+    same_student = and_(TestAttempt.test_id == test_id, TestAttempt.student_id == student_id)
+    attempts_count = select(func.count()).select_from(TestAttempt).where(same_student).scalar_subquery()
+    last_number = select(func.coalesce(func.max(TestAttempt.attempt_number), 0)).where(same_student).scalar_subquery()
+    admission = select(test_id, student_id, last_number + 1, now, now, now).where(
+        attempts_count < bindparam("max_attempts", type_=Integer())
+    )
+    # from_statement сопоставляет строку RETURNING с сущностью TestAttempt
+    return select(TestAttempt).from_statement(
+        insert(TestAttempt.__table__)
+        .from_select(
+            [
+                TestAttempt.test_id, TestAttempt.student_id, TestAttempt.attempt_number,
+                TestAttempt.started_at, TestAttempt.created_at, TestAttempt.updated_at
+            ],
+            admission
+        )
+        .returning(*TestAttempt.__table__.c)
+    )
+
+
+ADMISSION_STATEMENT = _admission_statement()
+
+
+def bump_test_version(db: Session, *, test_id: Any) -> None:
+    """
+    Увеличить версию теста в текущей транзакции (фиксирует вызывающий).
+    test_id может быть подзапросом - например, тест варианта ответа.
+    """
+    db.execute(
+        update(Test)
+        .where(Test.id == test_id)
+        .values(version=Test.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
 class CRUDQuestion(CRUDBase[Question, QuestionCreate, QuestionUpdate]):
     def get_by_test(self, db: Session, *, test_id: int, skip: int = 0, limit: int = 100) -> List[Question]:
         """Получить вопросы теста"""
@@ -33,6 +88,29 @@ class CRUDQuestion(CRUDBase[Question, QuestionCreate, QuestionUpdate]):
         """Получить вопрос с ответами"""
         return db.query(Question).filter(Question.id == question_id).first()
 
+    def create(self, db: Session, *, obj_in: QuestionCreate) -> Question:
+        """Создать вопрос (новая версия ключа ответов теста)"""
+        bump_test_version(db, test_id=obj_in.test_id)
+        return super().create(db, obj_in=obj_in)
+
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: Question,
+        obj_in: Union[QuestionUpdate, Dict[str, Any]]
+    ) -> Question:
+        """Обновить вопрос (новая версия ключа ответов теста)"""
+        bump_test_version(db, test_id=db_obj.test_id)
+        return super().update(db, db_obj=db_obj, obj_in=obj_in)
+
+    def remove(self, db: Session, *, id: int) -> Question:
+        """Удалить вопрос (новая версия ключа ответов теста)"""
+        question = self.get(db, id=id)
+        if question:
+            bump_test_version(db, test_id=question.test_id)
+        return super().remove(db, id=id)
+
 
 class CRUDAnswer(CRUDBase[Answer, AnswerCreate, AnswerUpdate]):
     def get_by_question(self, db: Session, *, question_id: int, skip: int = 0, limit: int = 100) -> List[Answer]:
@@ -45,15 +123,44 @@ class CRUDAnswer(CRUDBase[Answer, AnswerCreate, AnswerUpdate]):
             and_(Answer.question_id == question_id, Answer.is_correct == True)
         ).all()
 
+    def _bump_version(self, db: Session, *, question_id: int) -> None:
+        bump_test_version(
+            db, test_id=select(Question.test_id).where(Question.id == question_id).scalar_subquery()
+        )
+
+    def create(self, db: Session, *, obj_in: AnswerCreate) -> Answer:
+        """Создать вариант ответа (новая версия ключа ответов теста)"""
+        self._bump_version(db, question_id=obj_in.question_id)
+        return super().create(db, obj_in=obj_in)
+
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: Answer,
+        obj_in: Union[AnswerUpdate, Dict[str, Any]]
+    ) -> Answer:
+        """Обновить вариант ответа (новая версия ключа ответов теста)"""
+        self._bump_version(db, question_id=db_obj.question_id)
+        return super().update(db, db_obj=db_obj, obj_in=obj_in)
+
+    def remove(self, db: Session, *, id: int) -> Answer:
+        """Удалить вариант ответа (новая версия ключа ответов теста)"""
+        answer = self.get(db, id=id)
+        if answer:
+            self._bump_version(db, question_id=answer.question_id)
+        return super().remove(db, id=id)
+
 
 class CRUDTestAttempt(CRUDBase[TestAttempt, TestAttemptCreate, TestAttemptUpdate]):
     def get_by_test(self, db: Session, *, test_id: int, skip: int = 0, limit: int = 100) -> List[TestAttempt]:
         """Получить попытки теста"""
         return db.query(TestAttempt).filter(TestAttempt.test_id == test_id).offset(skip).limit(limit).all()
 
-    def get_by_student(self, db: Session, *, student_id: int, skip: int = 0, limit: int = 100) -> List[TestAttempt]:
+    def get_by_student(self, db: Session, *, student_id: int, skip: int = 0, limit: int = 100, cursor: Optional[PageCursor] = None) -> List[TestAttempt]:
         """Получить попытки студента"""
-        return db.query(TestAttempt).filter(TestAttempt.student_id == student_id).offset(skip).limit(limit).all()
+        query = db.query(TestAttempt).filter(TestAttempt.student_id == student_id)
+        return self.paginate(query, skip=skip, limit=limit, cursor=cursor).all()
 
     def get_by_student_and_test(self, db: Session, *, student_id: int, test_id: int) -> List[TestAttempt]:
         """Получить попытки студента для конкретного теста"""
@@ -67,6 +174,28 @@ class CRUDTestAttempt(CRUDBase[TestAttempt, TestAttemptCreate, TestAttemptUpdate
             and_(TestAttempt.student_id == student_id, TestAttempt.test_id == test_id)
         ).order_by(TestAttempt.created_at.desc()).first()
 
+    def admit_attempt(self, db: Session, *, test: Test, student_id: int) -> Optional[TestAttempt]:
+        """
+        Атомарно начать попытку, если лимит попыток не исчерпан.
+
+        Проверка лимита и номер попытки вычисляются в том же INSERT ... SELECT;
+        одновременные старты одного студента разводит уникальный индекс
+        (test_id, student_id, attempt_number): проигравший повторяет вставку
+        с новым номером. None - лимит попыток исчерпан; AttemptAdmissionConflict -
+        повторы исчерпаны.
+        """
+        params = {"test_id": test.id, "student_id": student_id, "max_attempts": test.max_attempts}
+        for _ in range(ATTEMPT_ADMISSION_RETRIES):
+            try:
+                # Строка попытки возвращается из RETURNING, без повторного чтения
+                attempt = db.scalar(ADMISSION_STATEMENT, {**params, "now": datetime.utcnow()})
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                continue
+            return attempt
+        raise AttemptAdmissionConflict(f"Could not admit attempt for test {test.id}, student {student_id}")
+
     def complete_attempt(
         self, 
         db: Session, 
@@ -74,20 +203,97 @@ class CRUDTestAttempt(CRUDBase[TestAttempt, TestAttemptCreate, TestAttemptUpdate
         attempt_id: int, 
         score: float, 
         is_passed: bool
-    ) -> TestAttempt:
-        """Завершить попытку теста"""
-        attempt = self.get(db, id=attempt_id)
-        if attempt:
-            attempt.completed_at = datetime.utcnow()
-            attempt.score = score
-            attempt.is_passed = is_passed
-            db.add(attempt)
-            db.commit()
-            db.refresh(attempt)
+    ) -> Optional[TestAttempt]:
+        """Завершить попытку теста; None - попытка уже завершена"""
+        attempt = self._lock_open_attempt(db, attempt_id=attempt_id)
+        if attempt is None:
+            return None
+        attempt.completed_at = datetime.utcnow()
+        attempt.score = score
+        attempt.is_passed = is_passed
+        db.add(attempt)
+        db.commit()
+        db.refresh(attempt)
+        return attempt
+
+    def grade_attempt(self, db: Session, *, attempt: TestAttempt, test: Test) -> GradeResult:
+        """
+        Проверить ответы попытки по ключу ответов теста и записать
+        оценки ответов одним пакетным UPDATE (фиксирует вызывающий).
+        """
+        answers = db.execute(
+            select(TestAnswer.id, TestAnswer.question_id, TestAnswer.selected_answer_id)
+            .where(TestAnswer.test_attempt_id == attempt.id)
+            .order_by(TestAnswer.id)
+        ).all()
+        result = grade_answers(get_answer_key(db, test), answers, test.passing_score)
+        rows = [
+            {"id": answer.id, "is_correct": grade.is_correct, "points_earned": grade.points_earned}
+            for answer, grade in zip(answers, result.grades)
+            if grade is not None
+        ]
+        if rows:
+            db.execute(update(TestAnswer), rows)
+        return result
+
+    def grade_and_complete(self, db: Session, *, attempt_id: int, test: Test) -> Optional[TestAttempt]:
+        """
+        Проверить ответы на сервере и завершить попытку.
+        None - попытка уже завершена (параллельным запросом).
+        """
+        attempt = self._lock_open_attempt(db, attempt_id=attempt_id)
+        if attempt is None:
+            return None
+        self._complete(db, attempt=attempt, result=self.grade_attempt(db, attempt=attempt, test=test))
+        db.commit()
+        db.refresh(attempt)
+        return attempt
+
+    def submit_answers(
+        self,
+        db: Session,
+        *,
+        attempt_id: int,
+        test: Test,
+        answers: List[TestAnswerSubmit],
+        complete: bool = False
+    ) -> Optional[TestAttempt]:
+        """
+        Сохранить пакет ответов одной транзакцией и при complete=True
+        сразу проверить и завершить попытку.
+        None - попытка уже завершена (параллельным запросом).
+        """
+        attempt = self._lock_open_attempt(db, attempt_id=attempt_id)
+        if attempt is None:
+            return None
+        test_answer_crud.replace_answers(db, attempt_id=attempt_id, answers=answers)
+        if complete:
+            self._complete(db, attempt=attempt, result=self.grade_attempt(db, attempt=attempt, test=test))
+        db.commit()
+        db.refresh(attempt)
         return attempt
 
+    def _lock_open_attempt(self, db: Session, *, attempt_id: int) -> Optional[TestAttempt]:
+        """
+        Заблокировать строку незавершенной попытки (SELECT ... FOR UPDATE)
+        до конца транзакции: параллельные отправки и завершения одной попытки
+        выполняются по очереди, и завершенная попытка не оценивается повторно.
+        None (транзакция откатывается) - попытки нет или она уже завершена.
+        """
+        attempt = db.query(TestAttempt).filter(TestAttempt.id == attempt_id).with_for_update().populate_existing().first()
+        if attempt is None or attempt.completed_at is not None:
+            db.rollback()
+            return None
+        return attempt
 
-class CRUDTestAnswer(CRUDBase[TestAnswer, TestAttemptCreate, TestAttemptUpdate]):
+    def _complete(self, db: Session, *, attempt: TestAttempt, result: GradeResult) -> None:
+        attempt.completed_at = datetime.utcnow()
+        attempt.score = result.score
+        attempt.is_passed = result.is_passed
+        db.add(attempt)
+
+
+class CRUDTestAnswer(CRUDBase[TestAnswer, TestAnswerCreate, TestAnswerUpdate]):
     def get_by_attempt(self, db: Session, *, attempt_id: int, skip: int = 0, limit: int = 100) -> List[TestAnswer]:
         """Получить ответы попытки"""
         return db.query(TestAnswer).filter(TestAnswer.test_attempt_id == attempt_id).offset(skip).limit(limit).all()
@@ -98,8 +304,33 @@ class CRUDTestAnswer(CRUDBase[TestAnswer, TestAttemptCreate, TestAttemptUpdate])
             and_(TestAnswer.question_id == question_id, TestAnswer.test_attempt_id == attempt_id)
         ).first()
 
+    def replace_answers(self, db: Session, *, attempt_id: int, answers: List[TestAnswerSubmit]) -> None:
+        """
+        Заменить ответы попытки на вопросы из пакета: один DELETE и одна
+        пакетная вставка (фиксирует вызывающий)
+        """
+        db.execute(
+            delete(TestAnswer)
+            .where(
+                TestAnswer.test_attempt_id == attempt_id,
+                TestAnswer.question_id.in_({answer.question_id for answer in answers})
+            )
+            .execution_options(synchronize_session=False)
+        )
+        # Core insert: один executemany (ORM делит пакет по пустым колонкам)
+        db.execute(insert(TestAnswer.__table__), [
+            {
+                "test_attempt_id": attempt_id,
+                "question_id": answer.question_id,
+                "selected_answer_id": answer.selected_answer_id,
+                "answer_text": answer.answer_text,
+            }
+            for answer in answers
+        ])
+
 
 test_crud = CRUDTest(Test)
 question_crud = CRUDQuestion(Question)
 answer_crud = CRUDAnswer(Answer)
-test_attempt_crud = CRUDTestAttempt(TestAttempt) 
\ No newline at end of file
+test_attempt_crud = CRUDTestAttempt(TestAttempt)
+test_answer_crud = CRUDTestAnswer(TestAnswer)
@@ -1,11 +1,13 @@
-from typing import Optional, List
+from typing import Any, AsyncIterator, Dict, Optional, List, Union
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, select
 
-from app.crud.base import CRUDBase
+from app.crud.base import CRUDBase, AsyncCRUDBase
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
-from app.core.security import get_password_hash, verify_password
+from app.core import auth_cache
+from app.core.security import get_password_hash, verify_and_update_password
 
 
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
@@ -17,14 +19,17 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         """Получить пользователя по username"""
         return db.query(User).filter(User.username == username).first()
 
-    def create(self, db: Session, *, obj_in: UserCreate) -> User:
-        """Создать нового пользователя с хешированным паролем"""
+    def create(self, db: Session, *, obj_in: UserCreate, hashed_password: Optional[str] = None) -> User:
+        """
+        Создать нового пользователя с хешированным паролем.
+        Хеш можно вычислить заранее (get_password_hash_async в async обработчиках).
+        """
         db_obj = User(
             email=obj_in.email,
             username=obj_in.username,
             first_name=obj_in.first_name,
             last_name=obj_in.last_name,
-            hashed_password=get_password_hash(obj_in.password),
+            hashed_password=hashed_password or get_password_hash(obj_in.password),
             role=obj_in.role if hasattr(obj_in, 'role') else None
         )
         db.add(db_obj)
@@ -32,13 +37,37 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         db.refresh(db_obj)
         return db_obj
 
+    def update(self, db: Session, *, db_obj: User, obj_in: Union[UserUpdate, Dict[str, Any]]) -> User:
+        """Обновить пользователя и сбросить его запись в кэше аутентификации"""
+        user = super().update(db, db_obj=db_obj, obj_in=obj_in)
+        auth_cache.invalidate_user(user.id)
+        return user
+
+    def remove(self, db: Session, *, id: int) -> User:
+        """Удалить пользователя и сбросить его запись в кэше аутентификации"""
+        user = super().remove(db, id=id)
+        auth_cache.invalidate_user(id)
+        return user
+
     def authenticate(self, db: Session, *, email: str, password: str) -> Optional[User]:
         """Аутентификация пользователя"""
         user = self.get_by_email(db, email=email)
         if not user:
             return None
-        if not verify_password(password, user.hashed_password):
+        verified, new_hash = verify_and_update_password(password, user.hashed_password)
+        if not verified:
             return None
+        if new_hash:
+            self.update_password_hash(db, user=user, hashed_password=new_hash)
+        return user
+
+    def update_password_hash(self, db: Session, *, user: User, hashed_password: str) -> User:
+        """Сохранить пересчитанный хеш пароля (например, после смены стоимости bcrypt)"""
+        user.hashed_password = hashed_password
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        auth_cache.invalidate_user(user.id)
         return user
 
     def is_active(self, user: User) -> bool:
@@ -74,6 +103,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             db.add(user)
             db.commit()
             db.refresh(user)
+            auth_cache.invalidate_user(user_id)
         return user
 
     def get_current_user(self, db: Session, user_id: int) -> Optional[User]:
@@ -81,4 +111,46 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         return self.get(db, id=user_id)
 
 
-user_crud = CRUDUser(User) 
\ No newline at end of file
+class AsyncCRUDUser(AsyncCRUDBase[User, UserCreate, UserUpdate]):
+    async def get_by_email(self, db: AsyncSession, *, email: str) -> Optional[User]:
+        """Получить пользователя по email"""
+        result = await db.execute(select(User).filter(User.email == email).limit(1))
+        return result.scalars().first()
+
+    async def get_by_username(self, db: AsyncSession, *, username: str) -> Optional[User]:
+        """Получить пользователя по username"""
+        result = await db.execute(select(User).filter(User.username == username).limit(1))
+        return result.scalars().first()
+
+    async def create(self, db: AsyncSession, *, obj_in: UserCreate, hashed_password: str) -> User:
+        """Создать пользователя с заранее вычисленным хешем пароля (get_password_hash_async)"""
+        db_obj = User(
+            email=obj_in.email,
+            username=obj_in.username,
+            first_name=obj_in.first_name,
+            last_name=obj_in.last_name,
+            hashed_password=hashed_password,
+            role=obj_in.role if hasattr(obj_in, 'role') else None
+        )
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def iter_active_ids(self, db: AsyncSession, *, chunk_size: int = 1000) -> AsyncIterator[List[int]]:
+        """
+        Потоково получить id активных пользователей пачками.
+        Строки читаются серверным курсором, ORM объекты не создаются.
+        """
+        result = await db.stream_scalars(
+            select(User.id)
+            .filter(User.is_active == True)
+            .order_by(User.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        async for chunk in result.partitions():
+            yield list(chunk)
+
+
+user_crud = CRUDUser(User)
+async_user_crud = AsyncCRUDUser(User) 
\ No newline at end of file
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, String, Text, Integer, Boolean, DateTime, ForeignKey, Enum, Float, JSON
+from sqlalchemy import Column, String, Text, Integer, Boolean, DateTime, ForeignKey, Enum, Float, JSON, Index
 from sqlalchemy.orm import relationship
 import enum
 
@@ -27,6 +27,12 @@ class NotificationStatus(str, enum.Enum):
 
 class ActivityLog(Base, BaseModel):
     __tablename__ = "activity_logs"
+    __table_args__ = (
+        # Ленты активности: фильтр + ORDER BY created_at DESC, id DESC (обратный обход индекса)
+        Index("ix_activity_logs_user_created", "user_id", "created_at", "id"),
+        Index("ix_activity_logs_course_created", "course_id", "created_at", "id"),
+        Index("ix_activity_logs_type_created", "activity_type", "created_at", "id"),
+    )
     
     activity_type = Column(Enum(ActivityType), nullable=False)
     description = Column(Text, nullable=True)
@@ -46,6 +52,9 @@ class ActivityLog(Base, BaseModel):
 
 class Notification(Base, BaseModel):
     __tablename__ = "notifications"
+    __table_args__ = (
+        Index("ix_notifications_user_created", "user_id", "created_at", "id"),
+    )
     
     title = Column(String(255), nullable=False)
     message = Column(Text, nullable=False)
@@ -63,6 +72,9 @@ class Notification(Base, BaseModel):
 
 class CourseProgress(Base, BaseModel):
     __tablename__ = "course_progress"
+    __table_args__ = (
+        Index("uq_course_progress_user_course", "user_id", "course_id", unique=True),
+    )
     
     progress_percentage = Column(Float, default=0.0, nullable=False)
     completed_lessons = Column(Integer, default=0, nullable=False)
@@ -81,6 +93,9 @@ class CourseProgress(Base, BaseModel):
 
 class LessonProgress(Base, BaseModel):
     __tablename__ = "lesson_progress"
+    __table_args__ = (
+        Index("uq_lesson_progress_user_lesson", "user_id", "lesson_id", unique=True),
+    )
     
     is_completed = Column(Boolean, default=False, nullable=False)
     completed_at = Column(DateTime, nullable=True)
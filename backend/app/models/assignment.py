@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, String, Text, Integer, Boolean, DateTime, ForeignKey, Enum, Float
+from sqlalchemy import Column, String, Text, Integer, Boolean, DateTime, ForeignKey, Enum, Float, Index
 from sqlalchemy.orm import relationship
 import enum
 
@@ -42,6 +42,10 @@ class Assignment(Base, BaseModel):
 
 class AssignmentSubmission(Base, BaseModel):
     __tablename__ = "assignment_submissions"
+    __table_args__ = (
+        Index("ix_assignment_submissions_student_assignment", "student_id", "assignment_id"),
+        Index("ix_assignment_submissions_student_created", "student_id", "created_at", "id"),
+    )
     
     content = Column(Text, nullable=True)
     file_url = Column(String(500), nullable=True)
@@ -58,5 +62,5 @@ class AssignmentSubmission(Base, BaseModel):
     
     # Отношения
     assignment = relationship("Assignment", back_populates="submissions")
-    student = relationship("User", foreign_keys=[student_id])
-    grader = relationship("User", foreign_keys=[graded_by]) 
\ No newline at end of file
+    student = relationship("User", foreign_keys=[student_id], back_populates="assignment_submissions")
+    grader = relationship("User", foreign_keys=[graded_by], back_populates="graded_submissions") 
\ No newline at end of file
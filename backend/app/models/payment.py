@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, String, Text, Integer, Boolean, DateTime, ForeignKey, Enum, Float, Numeric
+from sqlalchemy import Column, String, Text, Integer, Boolean, DateTime, ForeignKey, Enum, Float, Numeric, Index
 from sqlalchemy.orm import relationship
 import enum
 
@@ -27,6 +27,12 @@ class AccessStatus(str, enum.Enum):
 
 class Payment(Base, BaseModel):
     __tablename__ = "payments"
+    __table_args__ = (
+        Index("uq_payments_external_payment_id", "external_payment_id", unique=True),
+        Index("ix_payments_user_created", "user_id", "created_at", "id"),
+        Index("ix_payments_course_created", "course_id", "created_at", "id"),
+        Index("ix_payments_status_created", "status", "created_at", "id"),
+    )
     
     amount = Column(Numeric(10, 2), nullable=False)
     currency = Column(String(3), default="RUB", nullable=False)
@@ -49,11 +55,19 @@ class Payment(Base, BaseModel):
 
 class UserCourseAccess(Base, BaseModel):
     __tablename__ = "user_course_access"
+    __table_args__ = (
+        Index("ix_user_course_access_user_course_status", "user_id", "course_id", "status"),
+        # Поиск просроченных доступов фоновой задачей
+        Index("ix_user_course_access_status_expires", "status", "expires_at"),
+        # Истекшие доступы, об истечении которых еще не отправлено уведомление
+        Index("ix_user_course_access_status_expiry_notified", "status", "expiry_notified_at"),
+    )
     
     access_granted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     expires_at = Column(DateTime, nullable=True)  # null = бессрочный доступ
     status = Column(Enum(AccessStatus), default=AccessStatus.ACTIVE, nullable=False)
     last_accessed_at = Column(DateTime, nullable=True)
+    expiry_notified_at = Column(DateTime, nullable=True)  # уведомление об истечении поставлено в очередь
     
     # Внешние ключи
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, String, Text, Integer, Boolean, DateTime, ForeignKey, Enum, Float
+from sqlalchemy import Column, String, Text, Integer, Boolean, DateTime, ForeignKey, Enum, Float, Index
 from sqlalchemy.orm import relationship
 import enum
 
@@ -28,6 +28,7 @@ class Test(Base, BaseModel):
     max_attempts = Column(Integer, default=1, nullable=False)
     shuffle_questions = Column(Boolean, default=False, nullable=False)
     show_results = Column(Boolean, default=True, nullable=False)
+    version = Column(Integer, default=1, server_default="1", nullable=False)  # растет при изменении вопросов и вариантов
     
     # Внешние ключи
     lesson_id = Column(Integer, ForeignKey("lessons.id"), nullable=False)
@@ -71,6 +72,13 @@ class Answer(Base, BaseModel):
 
 class TestAttempt(Base, BaseModel):
     __tablename__ = "test_attempts"
+    __table_args__ = (
+        # Попытки студента по тесту (последняя попытка - обратный обход по created_at)
+        Index("ix_test_attempts_student_test_created", "student_id", "test_id", "created_at"),
+        Index("ix_test_attempts_student_created", "student_id", "created_at", "id"),
+        # Атомарный допуск к попытке: один номер попытки на студента и тест
+        Index("uq_test_attempts_test_student_number", "test_id", "student_id", "attempt_number", unique=True),
+    )
     
     started_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     completed_at = Column(DateTime, nullable=True)
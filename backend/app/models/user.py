@@ -51,8 +51,8 @@ class User(Base, BaseModel):
     notifications = relationship("Notification", back_populates="user")
     course_progress = relationship("CourseProgress", back_populates="user")
     lesson_progress = relationship("LessonProgress", back_populates="user")
-    assignment_submissions = relationship("AssignmentSubmission", back_populates="student")
-    graded_submissions = relationship("AssignmentSubmission", foreign_keys="AssignmentSubmission.grader_id", back_populates="grader")
+    assignment_submissions = relationship("AssignmentSubmission", foreign_keys="AssignmentSubmission.student_id", back_populates="student")
+    graded_submissions = relationship("AssignmentSubmission", foreign_keys="AssignmentSubmission.graded_by", back_populates="grader")
     test_attempts = relationship("TestAttempt", back_populates="student")
     
     def __repr__(self):
@@ -1,6 +1,6 @@
 from typing import Optional, Dict, Any
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from app.models.activity import ActivityType, NotificationType, NotificationStatus
 
@@ -134,4 +134,9 @@ class LessonProgressInDBBase(LessonProgressBase):
 
 
 class LessonProgress(LessonProgressInDBBase):
-    pass 
\ No newline at end of file
+    pass
+
+
+class LessonPositionUpdate(BaseModel):
+    """Heartbeat плеера: текущая позиция в уроке"""
+    position: int = Field(ge=0) 
\ No newline at end of file
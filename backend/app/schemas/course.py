@@ -2,7 +2,9 @@ from typing import Optional, List
 from datetime import datetime
 from pydantic import BaseModel
 
+from app.models.assignment import AssignmentStatus, AssignmentType
 from app.models.course import CourseStatus, LessonType
+from app.models.test import TestStatus
 
 
 class CourseBase(BaseModel):
@@ -44,6 +46,20 @@ class Course(CourseInDBBase):
     pass
 
 
+class CourseSearchResult(Course):
+    rank: float = 0.0
+    snippet: Optional[str] = None  # фрагмент описания, совпадения в <mark>
+
+
+class CourseSuggestion(BaseModel):
+    id: int
+    title: str
+    slug: str
+
+    class Config:
+        from_attributes = True
+
+
 class CourseWithModules(Course):
     modules: List["Module"] = []
 
@@ -117,6 +133,55 @@ class Lesson(LessonInDBBase):
     pass
 
 
+# Дерево курса (GET /courses/{id}/tree): без текста уроков и заданий
+
+class TestStub(BaseModel):
+    id: int
+    title: str
+    status: TestStatus
+    time_limit_minutes: Optional[int] = None
+    passing_score: int
+    max_attempts: int
+
+    class Config:
+        from_attributes = True
+
+
+class AssignmentStub(BaseModel):
+    id: int
+    title: str
+    assignment_type: AssignmentType
+    status: AssignmentStatus
+    max_score: int
+    due_date: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class LessonTreeItem(BaseModel):
+    id: int
+    title: str
+    order_index: int
+    lesson_type: LessonType
+    duration_minutes: Optional[int] = 0
+    is_free: bool
+    tests: List[TestStub] = []
+    assignments: List[AssignmentStub] = []
+
+    class Config:
+        from_attributes = True
+
+
+class ModuleTree(Module):
+    lessons: List[LessonTreeItem] = []
+
+
+class CourseTree(Course):
+    total_lessons: int = 0
+    modules: List[ModuleTree] = []
+
+
 # Обновляем схемы для циклических ссылок
 CourseWithModules.model_rebuild()
 ModuleWithLessons.model_rebuild() 
\ No newline at end of file
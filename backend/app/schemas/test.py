@@ -1,6 +1,6 @@
 from typing import Optional, List
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from app.models.test import QuestionType, TestStatus
 
@@ -29,6 +29,7 @@ class TestUpdate(TestBase):
 
 class TestInDBBase(TestBase):
     id: Optional[int] = None
+    version: Optional[int] = None
     lesson_id: Optional[int] = None
     created_by: Optional[int] = None
     created_at: Optional[datetime] = None
@@ -163,4 +164,27 @@ class TestAnswerInDBBase(TestAnswerBase):
 
 
 class TestAnswer(TestAnswerInDBBase):
-    pass 
\ No newline at end of file
+    pass
+
+
+class TestAnswerSubmit(BaseModel):
+    """Ответ в пакетной отправке: вариант (для выбора) или текст"""
+    question_id: int
+    selected_answer_id: Optional[int] = None
+    answer_text: Optional[str] = None
+
+
+class TestAnswerBatch(BaseModel):
+    """
+    Пакет ответов попытки. Ответы на вопросы из пакета заменяют
+    ранее сохраненные; для вопроса с несколькими ответами - по элементу
+    на каждый выбранный вариант. complete=True проверяет ответы
+    и завершает попытку в том же запросе.
+    """
+    answers: List[TestAnswerSubmit] = Field(..., min_length=1, max_length=1000)
+    complete: bool = False
+
+
+class TestAnswerBatchResult(BaseModel):
+    saved: int
+    attempt: TestAttempt
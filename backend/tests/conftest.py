@@ -0,0 +1,207 @@
+"""
+Общие фикстуры тестов
+Тесты идут на SQLite во временном каталоге, очереди и кэши - в памяти
+"""
+
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import types
+from collections import Counter
+from typing import Any, Dict, List, NamedTuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_DB_PATH = os.path.join(tempfile.mkdtemp(prefix="learning-platform-tests-"), "test.db")
+
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DB_PATH}"
+os.environ["ASYNC_DATABASE_URL"] = f"sqlite+aiosqlite:///{TEST_DB_PATH}"
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+
+# app/__init__.py создает FastAPI приложение и таблицы в рабочей базе при импорте,
+# поэтому пакет app регистрируется без выполнения __init__
+if "app" not in sys.modules:
+    app_package = types.ModuleType("app")
+    app_package.__path__ = [os.path.join(BACKEND_DIR, "app")]
+    sys.modules["app"] = app_package
+
+import pytest  # noqa: E402
+from aiosmtpd.controller import Controller  # noqa: E402
+from sqlalchemy.orm import configure_mappers  # noqa: E402
+
+from app.core.database import SessionLocal, engine  # noqa: E402
+from app.models import Base  # noqa: E402
+
+
+def pytest_terminal_summary(terminalreporter):
+    """Результаты замеров: значения record_property из тестов с меткой benchmark"""
+    reports = [
+        report for report in terminalreporter.stats.get("passed", [])
+        if "benchmark" in report.keywords and report.user_properties
+    ]
+    if not reports:
+        return
+    terminalreporter.section("benchmark")
+    for report in reports:
+        values = ", ".join(f"{name}={value}" for name, value in report.user_properties)
+        terminalreporter.write_line(f"{report.nodeid}: {values}")
+
+
+async def wait_for(condition, timeout: float = 5.0) -> None:
+    """Дождаться выполнения условия в цикле событий теста"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, "condition not reached"
+        await asyncio.sleep(0.01)
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class SMTPRecorder:
+    """Обработчик aiosmtpd: запоминает письма, проверки NOOP и соединения клиентов"""
+
+    def __init__(self):
+        self.messages: List[Any] = []
+        self.noops = 0
+        self.quits = 0
+        # Сессии SMTP сервера по соединениям, в порядке первого письма
+        self.connections: List[Any] = []
+        # Писем, принятых по каждому соединению
+        self.delivered: Counter = Counter()
+        # Сколько ближайших писем сервер оборвет, закрыв соединение
+        self.disconnects = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.disconnects:
+            self.disconnects -= 1
+            server.transport.close()
+            return "421 Closing connection"
+        self.messages.append(envelope)
+        if server not in self.connections:
+            self.connections.append(server)
+        self.delivered[server] += 1
+        return "250 Message accepted for delivery"
+
+    async def handle_NOOP(self, server, session, envelope, arg):
+        self.noops += 1
+        return "250 OK"
+
+    async def handle_QUIT(self, server, session, envelope):
+        self.quits += 1
+        return "221 Bye"
+
+    def disconnect_all(self, controller: Controller) -> None:
+        """Закрыть соединения всех клиентов со стороны сервера"""
+        for server in self.connections:
+            controller.loop.call_soon_threadsafe(server.transport.close)
+
+
+@pytest.fixture
+def smtp_server():
+    """Локальный SMTP сервер (aiosmtpd); письма в smtp_server.handler"""
+    controller = Controller(SMTPRecorder(), hostname="127.0.0.1", port=get_free_port())
+    controller.start()
+    yield controller
+    controller.stop()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    """Схема тестовой базы на всю сессию"""
+    configure_mappers()
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def db():
+    """Сессия базы данных; после теста таблицы очищаются"""
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        for table in reversed(Base.metadata.sorted_tables):
+            session.execute(table.delete())
+        session.commit()
+        session.close()
+
+
+@pytest.fixture
+def make_user(db):
+    """Фабрика пользователей"""
+    from app.models.user import User, UserRole
+
+    def make_user(role: UserRole = UserRole.STUDENT, **values) -> User:
+        number = db.query(User).count() + 1
+        user = User(
+            email=f"user{number}@example.com",
+            username=f"user{number}",
+            first_name="Тест",
+            last_name=f"Пользователь {number}",
+            hashed_password="hash",
+            role=role,
+            **values
+        )
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        return user
+
+    return make_user
+
+
+
+class Quiz(NamedTuple):
+    """Тест с id вопросов и вариантов по именам вопросов"""
+    test: Any
+    questions: Dict[str, int]
+    options: Dict[str, List[int]]
+
+
+@pytest.fixture
+def quiz(db, make_user) -> Quiz:
+    """
+    Опубликованный тест на 6 автоматически проверяемых баллов:
+    single (2), multiple (3, верны первые два варианта), true_false (1)
+    и текстовый вопрос text (5); верен первый вариант. Порог - 50%, три попытки.
+    """
+    from app.models import test as test_models
+    from app.models.test import QuestionType, TestStatus
+    from app.models.user import UserRole
+
+    curator = make_user(role=UserRole.CURATOR)
+    test = test_models.Test(
+        title="Итоговый тест", status=TestStatus.PUBLISHED, passing_score=50, max_attempts=3,
+        lesson_id=1, created_by=curator.id
+    )
+    db.add(test)
+    db.flush()
+    questions: Dict[str, int] = {}
+    options: Dict[str, List[int]] = {}
+    for name, question_type, points, correct in [
+        ("single", QuestionType.SINGLE_CHOICE, 2, [True, False, False]),
+        ("multiple", QuestionType.MULTIPLE_CHOICE, 3, [True, True, False]),
+        ("true_false", QuestionType.TRUE_FALSE, 1, [True, False]),
+        ("text", QuestionType.TEXT, 5, []),
+    ]:
+        question = test_models.Question(text=name, question_type=question_type, points=points, test_id=test.id)
+        db.add(question)
+        db.flush()
+        answers = [
+            test_models.Answer(text=f"{name} {index}", is_correct=is_correct, order_index=index, question_id=question.id)
+            for index, is_correct in enumerate(correct)
+        ]
+        db.add_all(answers)
+        db.flush()
+        questions[name] = question.id
+        options[name] = [answer.id for answer in answers]
+    db.commit()
+    return Quiz(test, questions, options)
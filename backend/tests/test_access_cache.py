@@ -0,0 +1,88 @@
+"""
+Тесты кэша доступов к курсам
+"""
+
+import calendar
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.core import access_cache as access_cache_module
+from app.core.access_cache import has_course_access, make_access_set
+from app.crud.payment import access_crud
+from app.models.payment import AccessStatus, UserCourseAccess
+from app.schemas.payment import UserCourseAccessCreate
+
+
+@pytest.fixture
+def local_timezone(monkeypatch):
+    """Часовой пояс процесса не UTC (как на сервере с TZ=Europe/Moscow)"""
+    monkeypatch.setenv("TZ", "Europe/Moscow")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_naive_expires_at_is_treated_as_utc(local_timezone):
+    expires_at = datetime(2030, 1, 1, 12, 0)
+
+    accesses = make_access_set([(1, expires_at), (2, None)])
+
+    assert accesses == {1: calendar.timegm(expires_at.timetuple()), 2: None}
+
+
+def test_expiry_check_does_not_depend_on_local_timezone(local_timezone):
+    now = datetime.utcnow()
+    accesses = make_access_set([(1, now - timedelta(minutes=30)), (2, now + timedelta(minutes=30))])
+
+    assert not has_course_access(accesses, 1)
+    assert has_course_access(accesses, 2)
+
+
+def test_longest_active_access_wins():
+    accesses = make_access_set([(1, datetime(2030, 1, 1)), (1, datetime(2031, 1, 1)), (2, datetime(2030, 1, 1)), (2, None)])
+
+    assert accesses[1] == calendar.timegm(datetime(2031, 1, 1).timetuple())
+    assert accesses[2] is None
+
+
+@pytest.fixture
+def calls(db, monkeypatch):
+    """Порядок сброса кэша и commit"""
+    calls = []
+
+    def on_commit(session):
+        calls.append(("commit",))
+
+    monkeypatch.setattr(access_cache_module.access_cache, "invalidate", lambda user_id: calls.append(("invalidate", user_id)))
+    event.listen(db, "after_commit", on_commit)
+    yield calls
+    event.remove(db, "after_commit", on_commit)
+
+
+def test_access_writes_invalidate_before_and_after_commit(db, make_user, calls):
+    user = make_user()
+    calls.clear()
+
+    access = access_crud.create(db, obj_in=UserCourseAccessCreate(user_id=user.id, course_id=1, payment_id=1))
+    access_crud.update(db, db_obj=access, obj_in={"expires_at": datetime.utcnow() + timedelta(days=30)})
+    access_crud.revoke_access(db, access_id=access.id)
+
+    expected = [("invalidate", user.id), ("commit",), ("invalidate", user.id)]
+    assert calls == expected * 3
+    assert access.status == AccessStatus.CANCELLED
+
+
+def test_expire_overdue_invalidates_before_and_after_commit(db, make_user, calls):
+    user = make_user()
+    db.add(UserCourseAccess(user_id=user.id, course_id=1, payment_id=1, expires_at=datetime.utcnow() - timedelta(days=1)))
+    db.commit()
+    calls.clear()
+
+    expired = access_crud.expire_overdue(db)
+
+    assert expired == [(user.id, 1)]
+    assert calls == [("invalidate", user.id), ("commit",), ("invalidate", user.id)]
@@ -0,0 +1,131 @@
+"""
+Тесты фонового истечения доступов к курсам
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.access_expiry import AccessExpirySweeper
+from app.core.notifications import notification_manager
+from app.models.course import Course
+from app.models.payment import AccessStatus, UserCourseAccess
+from app.models.user import UserRole
+
+
+@pytest.fixture
+def courses(db, make_user):
+    """Два курса; id по названиям"""
+    curator = make_user(role=UserRole.CURATOR)
+    courses = [
+        Course(title=title, slug=f"course-{index}", curator_id=curator.id)
+        for index, title in enumerate(["Python", "SQL"])
+    ]
+    db.add_all(courses)
+    db.commit()
+    return {course.title: course.id for course in courses}
+
+
+def add_access(db, user_id: int, course_id: int, expires_at: datetime, **values) -> UserCourseAccess:
+    access = UserCourseAccess(user_id=user_id, course_id=course_id, payment_id=1, expires_at=expires_at, **values)
+    db.add(access)
+    db.commit()
+    return access
+
+
+class SentNotifications(list):
+    """Список поставленных уведомлений с набором курсов, для которых очередь недоступна"""
+    failing: set
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Уведомления, поставленные в очередь: (курс, получатели); failing - курсы со сбоем очереди"""
+    sent = SentNotifications()
+    sent.failing = set()
+
+    async def send_bulk_notification(user_ids, template, notification_types, data, priority):
+        if data["course_name"] in sent.failing:
+            raise ConnectionError("queue is unavailable")
+        sent.append((data["course_name"], list(user_ids)))
+        return {user_id: {notification_type: True for notification_type in notification_types} for user_id in user_ids}
+
+    monkeypatch.setattr(notification_manager, "send_bulk_notification", send_bulk_notification)
+    return sent
+
+
+@pytest.fixture
+def overdue(db, courses):
+    """Пять просроченных доступов к двум курсам, действующий и уже обработанный истекший"""
+    past, future = datetime.utcnow() - timedelta(days=1), datetime.utcnow() + timedelta(days=1)
+    for user_id in (1, 2, 3):
+        add_access(db, user_id, courses["Python"], past)
+    for user_id in (4, 5):
+        add_access(db, user_id, courses["SQL"], past)
+    add_access(db, 6, courses["SQL"], future)
+    add_access(db, 7, courses["SQL"], past, status=AccessStatus.EXPIRED, expiry_notified_at=past)
+
+
+def statuses(db):
+    db.expire_all()
+    return {
+        access.user_id: (access.status, access.expiry_notified_at is not None)
+        for access in db.query(UserCourseAccess)
+    }
+
+
+async def test_sweep_drains_batches_and_notifies_per_course(db, overdue, sent):
+    sweeper = AccessExpirySweeper(interval=60, batch_size=2)
+
+    assert await sweeper.sweep() == 5
+
+    # Уведомления пачками по batch_size доступов, внутри пачки - по курсам
+    assert sent == [("Python", [1, 2]), ("Python", [3]), ("SQL", [4]), ("SQL", [5])]
+    assert statuses(db) == {
+        **{user_id: (AccessStatus.EXPIRED, True) for user_id in (1, 2, 3, 4, 5, 7)},
+        6: (AccessStatus.ACTIVE, False),
+    }
+    stats = sweeper.get_stats()
+    assert {key: stats[key] for key in ("expired", "batches", "notified", "notify_failures", "sweeps")} == {
+        "expired": 5, "batches": 3, "notified": 5, "notify_failures": 0, "sweeps": 1
+    }
+
+    assert await sweeper.sweep() == 0
+    assert len(sent) == 4
+
+
+async def test_failed_enqueue_is_retried_on_next_sweep(db, overdue, sent):
+    sweeper = AccessExpirySweeper(interval=60, batch_size=10)
+    sent.failing.add("SQL")
+
+    assert await sweeper.sweep() == 5
+    assert sent == [("Python", [1, 2, 3])]
+    assert {user_id: notified for user_id, (_, notified) in statuses(db).items() if user_id in (4, 5)} == {
+        4: False, 5: False
+    }
+    assert (sweeper.stats["notified"], sweeper.stats["notify_failures"]) == (3, 2)
+
+    sent.failing.clear()
+    assert await sweeper.sweep() == 0
+
+    assert sent == [("Python", [1, 2, 3]), ("SQL", [4, 5])]
+    assert all(notified for status, notified in statuses(db).values() if status == AccessStatus.EXPIRED)
+    assert sweeper.stats["notified"] == 5
+
+
+async def test_partially_enqueued_course_keeps_failed_users_pending(db, overdue, monkeypatch):
+    async def send_bulk_notification(user_ids, template, notification_types, data, priority):
+        # Пачка с пользователем 5 не попала в очередь
+        return {
+            user_id: {notification_type: user_id != 5 for notification_type in notification_types}
+            for user_id in user_ids
+        }
+
+    monkeypatch.setattr(notification_manager, "send_bulk_notification", send_bulk_notification)
+    sweeper = AccessExpirySweeper(interval=60, batch_size=10)
+
+    await sweeper.sweep()
+
+    assert statuses(db)[5] == (AccessStatus.EXPIRED, False)
+    assert statuses(db)[4] == (AccessStatus.EXPIRED, True)
+    assert sweeper.stats["notify_failures"] == 1
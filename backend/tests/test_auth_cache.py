@@ -0,0 +1,46 @@
+"""
+Тесты кэша аутентификации
+"""
+
+import pytest
+
+from app.core import auth_cache
+from app.crud.user import user_crud
+from app.models.user import User, UserRole
+
+
+@pytest.fixture
+def user(db):
+    user = User(email="student@example.com", username="student", hashed_password="old-hash",
+                first_name="Анна", last_name="Иванова", role=UserRole.STUDENT, is_active=True)
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    auth_cache.cache_user(user)
+    yield user
+    auth_cache.user_cache.delete(user.id)
+
+
+def test_cached_user_is_served_without_query(db, user):
+    cached = auth_cache.get_cached_user(db, user.id)
+
+    assert cached is not None
+    assert cached.email == "student@example.com"
+
+
+def test_update_password_hash_invalidates_cache(db, user):
+    user_crud.update_password_hash(db, user=user, hashed_password="new-hash")
+
+    assert auth_cache.user_cache.get(user.id) is None
+
+
+def test_update_last_login_invalidates_cache(db, user):
+    user_crud.update_last_login(db, user_id=user.id)
+
+    assert auth_cache.user_cache.get(user.id) is None
+
+
+def test_update_invalidates_cache(db, user):
+    user_crud.update(db, db_obj=user, obj_in={"is_active": False})
+
+    assert auth_cache.user_cache.get(user.id) is None
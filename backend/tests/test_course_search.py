@@ -0,0 +1,34 @@
+"""
+Тесты поиска курсов: фрагменты описания с подсветкой
+"""
+
+from app.crud.course import _SNIPPET_START, _SNIPPET_STOP, _mark_snippet, course_crud
+from app.models.course import Course, CourseStatus
+from app.models.user import UserRole
+
+
+def test_headline_snippet_is_escaped_around_marks():
+    # Так ts_headline возвращает описание с HTML: теги как есть, совпадение в маркерах
+    headline = f'<img src=x onerror="alert(1)"> курс {_SNIPPET_START}Python{_SNIPPET_STOP} & <b>SQL</b>'
+
+    assert _mark_snippet(headline) == (
+        '&lt;img src=x onerror=&quot;alert(1)&quot;&gt; курс <mark>Python</mark> &amp; &lt;b&gt;SQL&lt;/b&gt;'
+    )
+    assert _mark_snippet("") is None
+    assert _mark_snippet(None) is None
+
+
+def test_fallback_search_escapes_description(db, make_user):
+    curator = make_user(role=UserRole.CURATOR)
+    db.add(Course(
+        title="Python", slug="python", status=CourseStatus.PUBLISHED, curator_id=curator.id,
+        description='<script>alert(1)</script> основы python для <b>начинающих</b>'
+    ))
+    db.commit()
+
+    [(course, rank, snippet)] = course_crud.search_ranked(db, search_term="python")
+
+    assert course.slug == "python"
+    assert snippet == (
+        "&lt;script&gt;alert(1)&lt;/script&gt; основы <mark>python</mark> для &lt;b&gt;начинающих&lt;/b&gt;"
+    )
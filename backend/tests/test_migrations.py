@@ -0,0 +1,85 @@
+"""
+Тесты миграций
+"""
+
+import importlib.util
+import os
+
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine, inspect, text
+
+VERSIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic", "versions")
+
+
+def load_migration(filename: str):
+    spec = importlib.util.spec_from_file_location(filename[:-3], os.path.join(VERSIONS_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_lookup_indexes_merge_progress_duplicates():
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE course_progress (id INTEGER PRIMARY KEY, user_id INTEGER, course_id INTEGER,"
+            " completed_lessons INTEGER, created_at DATETIME, updated_at DATETIME)"
+        ))
+        connection.execute(text(
+            "CREATE TABLE lesson_progress (id INTEGER PRIMARY KEY, user_id INTEGER, lesson_id INTEGER,"
+            " course_progress_id INTEGER, last_position INTEGER, created_at DATETIME, updated_at DATETIME)"
+        ))
+        connection.execute(text(
+            "INSERT INTO course_progress VALUES"
+            " (1, 1, 10, 1, '2024-01-01', '2024-01-01'),"
+            " (2, 1, 10, 2, '2024-01-02', '2024-01-05'),"
+            " (3, 1, 10, 0, '2024-01-03', NULL),"
+            " (4, 2, 10, 5, '2024-01-01', '2024-01-01')"
+        ))
+        connection.execute(text(
+            "INSERT INTO lesson_progress VALUES"
+            " (1, 1, 100, 1, 30, '2024-01-01', '2024-01-01'),"
+            " (2, 1, 100, 3, 60, '2024-01-02', '2024-01-06'),"
+            " (3, 1, 101, 1, 10, '2024-01-01', '2024-01-01'),"
+            " (4, 2, 100, 4, 5, '2024-01-01', '2024-01-01')"
+        ))
+
+        migration = load_migration("0003_lookup_indexes.py")
+        with Operations.context(MigrationContext.configure(connection)):
+            migration.upgrade()
+
+        assert connection.execute(text("SELECT id, user_id FROM course_progress ORDER BY id")).all() == [(2, 1), (4, 2)]
+        assert connection.execute(text(
+            "SELECT id, course_progress_id, last_position FROM lesson_progress ORDER BY id"
+        )).all() == [(2, 2, 60), (3, 2, 10), (4, 4, 5)]
+        index_names = {
+            index["name"]
+            for table in ("course_progress", "lesson_progress")
+            for index in inspect(connection).get_indexes(table)
+        }
+        assert {"uq_course_progress_user_course", "uq_lesson_progress_user_lesson"} <= index_names
+
+
+def test_access_expiry_notifications_backfills_expired_accesses():
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE user_course_access (id INTEGER PRIMARY KEY, status VARCHAR(9), updated_at DATETIME)"
+        ))
+        connection.execute(text(
+            "INSERT INTO user_course_access VALUES"
+            " (1, 'ACTIVE', '2024-01-01'), (2, 'EXPIRED', '2024-01-02'), (3, 'expired', NULL)"
+        ))
+
+        migration = load_migration("0007_access_expiry_notifications.py")
+        with Operations.context(MigrationContext.configure(connection)):
+            migration.upgrade()
+
+        rows = connection.execute(text(
+            "SELECT id, expiry_notified_at IS NOT NULL FROM user_course_access ORDER BY id"
+        )).all()
+        assert rows == [(1, 0), (2, 1), (3, 1)]
+        assert "ix_user_course_access_status_expiry_notified" in {
+            index["name"] for index in inspect(connection).get_indexes("user_course_access")
+        }
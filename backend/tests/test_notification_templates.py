@@ -0,0 +1,92 @@
+"""
+Тесты компиляции шаблонов уведомлений
+"""
+
+import time
+
+import pytest
+
+from app.core.notification_queue import InMemoryNotificationQueue
+from app.core.notification_templates import CompiledTemplate, compile_template
+from app.core.notifications import NotificationManager, NotificationTemplate
+
+
+def test_render_substitutes_values():
+    template = CompiledTemplate("Здравствуйте, {user_name}! Курс: {course_title}")
+
+    assert template.fields == ("user_name", "course_title")
+    assert template.render({"user_name": "Анна", "course_title": "Python"}) == "Здравствуйте, Анна! Курс: Python"
+
+
+def test_render_keeps_missing_fields():
+    template = CompiledTemplate("{user_name}, оценка {grade} по {assignment_title}")
+
+    assert template.render({"grade": 5}) == "{user_name}, оценка 5 по {assignment_title}"
+    assert template.render({}) == template.source
+
+
+def test_render_without_fields_returns_source():
+    template = CompiledTemplate("Добро пожаловать!")
+
+    assert template.fields == ()
+    assert template.render({"user_name": "Анна"}) == "Добро пожаловать!"
+
+
+def test_render_repeated_field_and_edges():
+    template = CompiledTemplate("{a}-{a} {b}")
+
+    assert template.render({"a": 1, "b": None}) == "1-1 None"
+
+
+def test_compile_template_is_cached():
+    assert compile_template("Привет, {user_name}") is compile_template("Привет, {user_name}")
+
+
+def render_with_replace(template: str, values: dict) -> str:
+    """Прежний рендеринг: str.replace по каждому ключу данных"""
+    for key, value in values.items():
+        template = template.replace(f"{{{key}}}", str(value))
+    return template
+
+
+@pytest.mark.benchmark
+def test_render_100k_notifications(record_property):
+    manager = NotificationManager(queue=InMemoryNotificationQueue())
+    source = manager.templates[NotificationTemplate.LESSON_COMPLETED]["message"]
+    renders = 100_000
+    # Уникальные данные на каждое уведомление: кэш рендеринга не помогает
+    values = [
+        {"user_name": f"Студент {index}", "lesson_name": f"Урок {index % 40}",
+         "course_name": "Python", "user_email": f"student{index}@example.com"}
+        for index in range(renders)
+    ]
+    expected = source.format(**values[-1])
+
+    timings = {}
+    started = time.perf_counter()
+    for item in values:
+        result = source.format(**item)
+    timings["str_format"] = time.perf_counter() - started
+    assert result == expected
+
+    started = time.perf_counter()
+    for item in values:
+        result = render_with_replace(source, item)
+    timings["str_replace"] = time.perf_counter() - started
+    assert result == expected
+
+    started = time.perf_counter()
+    for item in values:
+        result = compile_template(source).render(item)
+    timings["compiled"] = time.perf_counter() - started
+    assert result == expected
+
+    started = time.perf_counter()
+    for item in values:
+        result = manager._render(NotificationTemplate.LESSON_COMPLETED, item)
+    timings["manager_render"] = time.perf_counter() - started
+    assert result == (manager.templates[NotificationTemplate.LESSON_COMPLETED]["subject"], expected)
+
+    record_property("renders", renders)
+    for name, seconds in timings.items():
+        record_property(f"{name}_seconds", round(seconds, 3))
@@ -0,0 +1,56 @@
+"""
+Тесты воркера доставки уведомлений
+"""
+
+from typing import Any, Dict, List
+
+from app.core.notification_queue import InMemoryNotificationQueue, NotificationJob
+from app.core.notification_worker import NotificationWorker
+from app.core.notifications import NotificationType
+from tests.conftest import wait_for
+
+
+class FlakyAckQueue(InMemoryNotificationQueue):
+    """Очередь, у которой первое подтверждение падает (как при обрыве Redis)"""
+
+    def __init__(self):
+        super().__init__()
+        self.ack_failures = 1
+        self.acked: List[str] = []
+
+    async def ack(self, job: NotificationJob) -> None:
+        if self.ack_failures:
+            self.ack_failures -= 1
+            raise ConnectionError("connection reset")
+        self.acked.append(job.id)
+
+
+class RecordingManager:
+    """Менеджер, который только запоминает доставленные уведомления"""
+
+    def __init__(self):
+        self.delivered: List[Dict[str, Any]] = []
+
+    async def deliver(self, payload: Dict[str, Any]) -> bool:
+        self.delivered.append(payload)
+        return True
+
+
+async def test_worker_keeps_consuming_after_ack_failure():
+    queue = FlakyAckQueue()
+    manager = RecordingManager()
+    worker = NotificationWorker(
+        queue=queue, manager=manager, concurrency={NotificationType.INTERNAL: 1}, rate_limits={}
+    )
+    first = NotificationJob.create(NotificationType.INTERNAL.value, {"n": 1})
+    second = NotificationJob.create(NotificationType.INTERNAL.value, {"n": 2})
+    await queue.enqueue_many([first, second])
+
+    await worker.start()
+    try:
+        await wait_for(lambda: queue.acked == [second.id])
+    finally:
+        await worker.stop()
+
+    assert manager.delivered == [{"n": 1}, {"n": 2}]
+    assert worker.stats["delivered"] == 1
@@ -0,0 +1,164 @@
+"""
+Тесты массовой отправки уведомлений
+"""
+
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List
+
+import pytest
+from aiohttp import web
+from sqlalchemy import insert
+
+from app.core import notifications
+from app.core.config import settings
+from app.core.notification_queue import InMemoryNotificationQueue, NotificationJob
+from app.core.notification_worker import NotificationWorker
+from app.core.notifications import NotificationManager, NotificationTemplate, NotificationType
+from app.core.smtp_pool import SMTPConnectionPool
+from app.models.activity import Notification
+from app.models.user import User, UserRole
+from tests.conftest import get_free_port, wait_for
+
+
+class TrackingQueue(InMemoryNotificationQueue):
+    """Очередь, которая считает построенные, но еще не поставленные задачи"""
+
+    def __init__(self):
+        super().__init__()
+        self.built = 0
+        self.enqueued = 0
+        self.max_in_flight = 0
+
+    def on_build(self) -> None:
+        self.built += 1
+        self.max_in_flight = max(self.max_in_flight, self.built - self.enqueued)
+
+    async def enqueue_many(self, jobs: List[NotificationJob]) -> None:
+        await asyncio.sleep(0.001)
+        await super().enqueue_many(jobs)
+        self.enqueued += len(jobs)
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    queue = TrackingQueue()
+
+    class CountingJob(NotificationJob):
+        @classmethod
+        def create(cls, notification_type, payload):
+            queue.on_build()
+            return NotificationJob.create(notification_type, payload)
+
+    monkeypatch.setattr(notifications, "NotificationJob", CountingJob)
+    return queue
+
+
+async def test_bulk_notification_builds_jobs_only_for_running_chunks(queue, monkeypatch):
+    monkeypatch.setattr(settings, "NOTIFICATION_BULK_CHUNK_SIZE", 50)
+    monkeypatch.setattr(settings, "NOTIFICATION_BULK_CONCURRENCY", 2)
+    manager = NotificationManager(queue=queue)
+    user_ids = list(range(1, 1001))
+
+    results = await manager.send_bulk_notification(
+        user_ids=user_ids,
+        template=NotificationTemplate.SYSTEM_ANNOUNCEMENT,
+        notification_types=[NotificationType.EMAIL, NotificationType.INTERNAL],
+        data={"announcement_title": "t", "announcement_content": "c"}
+    )
+
+    assert len(results) == len(user_ids)
+    assert all(user_results[NotificationType.EMAIL] for user_results in results.values())
+    # по задаче email на получателя и одна пакетная задача internal на пачку
+    assert queue.enqueued == len(user_ids) + len(user_ids) // 50
+    assert queue.max_in_flight <= 2 * (50 + 1)
+
+
+@asynccontextmanager
+async def telegram_api():
+    """Заглушка Bot API (aiohttp): базовый URL и принятые sendMessage"""
+    received: List[Dict[str, Any]] = []
+
+    async def send_message(request: web.Request) -> web.Response:
+        received.append(await request.json())
+        return web.json_response({"ok": True, "result": {}})
+
+    app = web.Application()
+    app.router.add_post("/bot{token}/sendMessage", send_message)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    port = get_free_port()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    try:
+        yield f"http://127.0.0.1:{port}", received
+    finally:
+        await runner.cleanup()
+
+
+@pytest.mark.benchmark
+async def test_bulk_notification_delivery_rate(db, monkeypatch, smtp_server, record_property):
+    """Массовое объявление от постановки в очередь до доставки SMTP, Bot API и в базу данных"""
+    recipients = 500
+    monkeypatch.setattr(settings, "TELEGRAM_GLOBAL_RATE_LIMIT", 10000.0)
+    db.execute(insert(User), [
+        {
+            "email": f"student{number}@example.com",
+            "username": f"student{number}",
+            "first_name": "Студент",
+            "last_name": str(number),
+            "hashed_password": "hash",
+            "role": UserRole.STUDENT,
+            "is_active": True,
+            "telegram_chat_id": str(100000 + number),
+        }
+        for number in range(recipients)
+    ])
+    db.commit()
+    user_ids = [user_id for (user_id,) in db.query(User.id).order_by(User.id)]
+
+    queue = InMemoryNotificationQueue()
+    manager = NotificationManager(queue=queue)
+    smtp_pool = SMTPConnectionPool(
+        hostname=smtp_server.hostname, port=smtp_server.port, username=None, start_tls=False,
+        size=4, max_messages=100
+    )
+    manager.providers[NotificationType.EMAIL]._pool = smtp_pool
+    worker = NotificationWorker(
+        queue=queue,
+        manager=manager,
+        concurrency={NotificationType.EMAIL: 4, NotificationType.TELEGRAM: 8, NotificationType.INTERNAL: 2},
+        rate_limits={}
+    )
+    jobs = 2 * recipients + math.ceil(recipients / settings.NOTIFICATION_BULK_CHUNK_SIZE)
+
+    async with telegram_api() as (api_url, telegram_messages):
+        manager.providers[NotificationType.TELEGRAM].api_url = f"{api_url}/bottest-token"
+        await manager.start()
+        await worker.start()
+        try:
+            started = time.perf_counter()
+            await manager.send_bulk_notification(
+                user_ids=user_ids,
+                template=NotificationTemplate.SYSTEM_ANNOUNCEMENT,
+                notification_types=[NotificationType.EMAIL, NotificationType.TELEGRAM, NotificationType.INTERNAL],
+                data={"announcement_title": "Обновление", "announcement_content": "Новые курсы"}
+            )
+            await wait_for(lambda: worker.stats["delivered"] >= jobs, timeout=120)
+            elapsed = time.perf_counter() - started
+        finally:
+            await worker.stop()
+            await manager.close()
+
+    assert worker.stats == {"delivered": jobs, "retried": 0, "dead": 0}
+    assert len(smtp_server.handler.messages) == recipients
+    # Соединения переиспользуются: новое - только при ротации после max_messages писем
+    assert len(smtp_server.handler.connections) == smtp_pool.stats["connects"] <= 4 + recipients // 100
+    assert sorted(message["chat_id"] for message in telegram_messages) == sorted(
+        str(100000 + number) for number in range(recipients)
+    )
+    assert db.query(Notification).count() == recipients
+    record_property("recipients", recipients)
+    record_property("seconds", round(elapsed, 2))
+    record_property("recipients_per_second", round(recipients / elapsed))
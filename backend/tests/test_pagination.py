@@ -0,0 +1,99 @@
+"""
+Тесты курсорной пагинации
+"""
+
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import Response
+from sqlalchemy import insert
+
+from app.core.pagination import NEXT_CURSOR_HEADER, PageCursor, decode_cursor, set_next_cursor
+from app.crud.notification import notification_crud
+from app.models.activity import Notification, NotificationType
+
+
+def add_notifications(db, user_id: int, count: int) -> None:
+    started = datetime(2024, 1, 1)
+    db.execute(insert(Notification.__table__), [
+        {
+            "user_id": user_id,
+            "title": f"Уведомление {number}",
+            "message": "Текст",
+            "notification_type": NotificationType.SYSTEM.name,
+            "status": "PENDING",
+            # пары с одинаковым created_at: порядок внутри пары задает id
+            "created_at": started + timedelta(seconds=number // 2),
+            "updated_at": started,
+        }
+        for number in range(count)
+    ])
+    db.commit()
+
+
+def test_next_cursor_only_in_cursor_mode(db, make_user):
+    add_notifications(db, make_user().id, 3)
+    items = db.query(Notification).limit(2).all()
+
+    skip_response = Response()
+    set_next_cursor(skip_response, items, 2, None)
+    cursor_response = Response()
+    set_next_cursor(cursor_response, items, 2, PageCursor())
+    last_page_response = Response()
+    set_next_cursor(last_page_response, items, 3, PageCursor())
+
+    assert NEXT_CURSOR_HEADER not in skip_response.headers
+    assert decode_cursor(cursor_response.headers[NEXT_CURSOR_HEADER]).id == items[-1].id
+    assert NEXT_CURSOR_HEADER not in last_page_response.headers
+
+
+def test_cursor_pages_cover_every_row_once(db, make_user):
+    user = make_user()
+    add_notifications(db, user.id, 25)
+
+    seen = []
+    cursor = PageCursor()
+    while True:
+        page = notification_crud.get_by_user(db, user_id=user.id, limit=10, cursor=cursor)
+        response = Response()
+        set_next_cursor(response, page, 10, cursor)
+        seen.extend(notification.id for notification in page)
+        if NEXT_CURSOR_HEADER not in response.headers:
+            break
+        cursor = decode_cursor(response.headers[NEXT_CURSOR_HEADER])
+
+    expected = [
+        notification.id for notification in
+        db.query(Notification).order_by(Notification.created_at.desc(), Notification.id.desc())
+    ]
+    assert seen == expected
+
+
+@pytest.mark.benchmark
+def test_deep_page_benchmark(db, make_user):
+    user = make_user()
+    total, limit = 50000, 50
+    add_notifications(db, user.id, total)
+    anchor = (
+        db.query(Notification)
+        .order_by(Notification.created_at.desc(), Notification.id.desc())
+        .offset(total - limit - 1).first()
+    )
+    cursor = PageCursor(anchor.created_at, anchor.id)
+
+    def measure(**kwargs) -> float:
+        timings = []
+        for _ in range(5):
+            started = time.perf_counter()
+            notification_crud.get_by_user(db, user_id=user.id, limit=limit, **kwargs)
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings)
+
+    offset_time = measure(skip=total - limit)
+    cursor_time = measure(cursor=cursor)
+
+    print(f"\nlast page of {total}: offset {offset_time * 1000:.1f} ms, cursor {cursor_time * 1000:.1f} ms")
+    assert len(notification_crud.get_by_user(db, user_id=user.id, limit=limit, cursor=cursor)) == limit
+    assert cursor_time < offset_time
@@ -0,0 +1,168 @@
+"""
+Тесты буфера позиций просмотра уроков
+"""
+
+from datetime import datetime, timedelta
+
+import fakeredis
+import pytest
+
+from app.core.position_buffer import InMemoryPositionBuffer, PositionFlusher, RedisPositionBuffer
+from app.crud.activity import lesson_progress_crud
+from app.models.activity import LessonProgress
+
+
+def positions(db):
+    """Сохраненные позиции: (user_id, lesson_id) -> last_position"""
+    db.expire_all()
+    return {(row.user_id, row.lesson_id): row.last_position for row in db.query(LessonProgress)}
+
+
+@pytest.fixture
+def flusher():
+    return PositionFlusher(InMemoryPositionBuffer(), interval=60, batch_size=2)
+
+
+async def record(flusher, user_id: int, lesson_id: int, position: int) -> None:
+    await flusher.record(user_id=user_id, lesson_id=lesson_id, course_id=1, position=position)
+
+
+async def test_heartbeats_coalesce_to_last_position(db, flusher):
+    for position in (10, 20, 30):
+        await record(flusher, 1, 1, position)
+    await record(flusher, 1, 2, 5)
+    await record(flusher, 2, 1, 7)
+
+    assert await flusher.flush() == 3
+
+    assert positions(db) == {(1, 1): 30, (1, 2): 5, (2, 1): 7}
+    stats = await flusher.get_stats()
+    assert (stats["received"], stats["coalesced"], stats["persisted"], stats["pending"]) == (5, 2, 3, 0)
+
+
+async def test_failed_flush_restores_positions(db, flusher, monkeypatch):
+    persist = flusher._persist
+
+    def failing_persist(entries):
+        # Во время неудачной записи приходит более новый heartbeat
+        flusher.buffer._entries["1:1"] = {**entries[0], "position": 40}
+        raise ConnectionError("database is unavailable")
+
+    await record(flusher, 1, 1, 30)
+    await record(flusher, 1, 2, 5)
+    monkeypatch.setattr(flusher, "_persist", failing_persist)
+
+    assert await flusher.flush() == 0
+    assert flusher.stats["failed_flushes"] == 1
+    assert await flusher.buffer.size() == 2
+
+    monkeypatch.setattr(flusher, "_persist", persist)
+    assert await flusher.flush() == 2
+    assert positions(db) == {(1, 1): 40, (1, 2): 5}
+
+
+async def test_flush_lesson_writes_only_that_lesson(db, flusher):
+    await record(flusher, 1, 1, 30)
+    await record(flusher, 1, 2, 5)
+
+    await flusher.flush_lesson(1, 1)
+
+    assert positions(db) == {(1, 1): 30}
+    assert await flusher.buffer.size() == 1
+
+
+async def test_stop_drains_buffer(db, flusher, monkeypatch):
+    persist = flusher._persist
+    calls = []
+
+    def flaky_persist(entries):
+        calls.append(len(entries))
+        if len(calls) == 1:
+            raise ConnectionError("database is unavailable")
+        persist(entries)
+
+    monkeypatch.setattr(flusher, "_persist", flaky_persist)
+    await flusher.start()
+    for lesson_id in range(1, 4):
+        await record(flusher, 1, lesson_id, lesson_id * 10)
+
+    await flusher.stop()
+
+    assert calls == [3, 3]
+    assert positions(db) == {(1, 1): 10, (1, 2): 20, (1, 3): 30}
+
+
+def test_upsert_positions_ignores_stale_updates(db):
+    now = datetime.utcnow()
+    lesson_progress_crud.upsert_positions(db, positions=[
+        {"user_id": 1, "lesson_id": 1, "course_id": 1, "position": 50, "updated_at": now},
+    ])
+
+    lesson_progress_crud.upsert_positions(db, positions=[
+        {"user_id": 1, "lesson_id": 1, "course_id": 1, "position": 20, "updated_at": now - timedelta(seconds=5)},
+        {"user_id": 1, "lesson_id": 2, "course_id": 1, "position": 15, "updated_at": now},
+    ])
+    assert positions(db) == {(1, 1): 50, (1, 2): 15}
+
+    lesson_progress_crud.upsert_positions(db, positions=[
+        {"user_id": 1, "lesson_id": 1, "course_id": 1, "position": 60, "updated_at": now + timedelta(seconds=5)},
+    ])
+    assert positions(db) == {(1, 1): 60, (1, 2): 15}
+
+
+@pytest.fixture
+def redis_buffers():
+    """Буферы двух процессов одного контейнера на общем Redis"""
+    server = fakeredis.FakeServer()
+    buffers = []
+
+    def make_buffer() -> RedisPositionBuffer:
+        buffer = RedisPositionBuffer(worker_name="web-1")
+        buffer.redis = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+        buffers.append(buffer)
+        return buffer
+
+    return make_buffer
+
+
+def entry(lesson_id: int, position: int) -> dict:
+    return {"user_id": 1, "lesson_id": lesson_id, "course_id": 1, "position": position, "ts": 0}
+
+
+async def test_processes_of_one_host_have_own_processing_keys(redis_buffers):
+    first, second = redis_buffers(), redis_buffers()
+    await first.put(entry(1, 10))
+
+    assert first.worker_id != second.worker_id
+    assert [item["position"] for item in await first.drain()] == [10]
+    # Второй процесс не видит и не подтверждает позиции, которые пишет первый
+    assert await second.drain() == []
+    await second.ack()
+    assert await second.recover() == 0
+    assert await first.redis.hlen(first._processing_key) == 1
+
+
+async def test_positions_of_crashed_process_are_recovered(redis_buffers):
+    crashed, alive = redis_buffers(), redis_buffers()
+    await crashed.put(entry(1, 10))
+    await crashed.put(entry(2, 20))
+    await crashed.drain()
+    # Процесс упал: аренда истекла, ключ обработки остался; позиция урока 1 уже новее
+    await crashed.redis.delete(crashed._get_lease_key(crashed.worker_id))
+    await alive.put(entry(1, 15))
+
+    assert await alive.recover() == 2
+
+    drained = {item["lesson_id"]: item["position"] for item in await alive.drain()}
+    assert drained == {1: 15, 2: 20}
+    assert not await alive.redis.exists(crashed._processing_key)
+    assert not await alive.redis.sismember(alive._workers_key, crashed.worker_id)
+
+
+async def test_startup_recovers_unregistered_processing_keys(redis_buffers):
+    buffer = redis_buffers()
+    # Ключ обработки прежнего формата (по имени узла), без реестра и аренды
+    await buffer.redis.hset("positions:processing:web-1", "1:1", '{"user_id": 1, "lesson_id": 1}')
+
+    assert await buffer.recover() == 1
+    assert await buffer.size() == 1
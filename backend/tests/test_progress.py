@@ -0,0 +1,160 @@
+"""
+Тесты записи прогресса по курсам и урокам
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import settings
+from app.crud import activity
+from app.crud.activity import lesson_progress_crud, progress_crud
+from app.models.activity import CourseProgress, LessonProgress
+from app.models.course import Course, CourseStatus, Lesson, Module
+from app.models.user import UserRole
+
+
+@pytest.fixture(params=["on_conflict", "fallback"])
+def upsert(request, monkeypatch):
+    """Запись через INSERT ... ON CONFLICT и через UPDATE/INSERT для прочих диалектов"""
+    if request.param == "fallback":
+        monkeypatch.setattr(activity, "UPSERT_INSERTS", {})
+    return request.param
+
+
+@pytest.fixture
+def course_lessons(db, make_user):
+    """Курс из двух модулей по два урока; id курса и уроков"""
+    curator = make_user(role=UserRole.CURATOR)
+    course = Course(title="Курс", slug="course", status=CourseStatus.PUBLISHED, curator_id=curator.id)
+    db.add(course)
+    db.flush()
+    lessons = []
+    for module_index in range(2):
+        module = Module(title=f"Модуль {module_index}", order_index=module_index, course_id=course.id)
+        db.add(module)
+        db.flush()
+        for lesson_index in range(2):
+            lesson = Lesson(title=f"Урок {lesson_index}", order_index=lesson_index, module_id=module.id)
+            db.add(lesson)
+            lessons.append(lesson)
+    db.commit()
+    return course.id, [lesson.id for lesson in lessons]
+
+
+def test_update_progress_inserts_then_updates(db, upsert):
+    first = progress_crud.update_progress(db, user_id=1, course_id=1, completed_lessons=1, total_lessons=4)
+    assert (first.completed_lessons, first.total_lessons, first.progress_percentage) == (1, 4, 25.0)
+    assert first.completed_at is None
+
+    second = progress_crud.update_progress(db, user_id=1, course_id=1, completed_lessons=2, total_lessons=4)
+
+    assert second.id == first.id
+    assert (second.completed_lessons, second.progress_percentage) == (2, 50.0)
+    assert db.query(CourseProgress).count() == 1
+
+
+def test_update_progress_keeps_omitted_values(db, upsert):
+    progress_crud.update_progress(db, user_id=1, course_id=1, completed_lessons=2, total_lessons=4)
+
+    progress = progress_crud.update_progress(db, user_id=1, course_id=1, completed_lessons=3)
+    assert (progress.completed_lessons, progress.total_lessons, progress.progress_percentage) == (3, 4, 75.0)
+
+    progress = progress_crud.update_progress(db, user_id=1, course_id=1, total_lessons=6)
+    assert (progress.completed_lessons, progress.total_lessons, progress.progress_percentage) == (3, 6, 50.0)
+
+
+def test_update_progress_keeps_first_completion_date(db, upsert):
+    progress = progress_crud.update_progress(db, user_id=1, course_id=1, completed_lessons=4, total_lessons=4)
+    completed_at = progress.completed_at
+    assert progress.progress_percentage == 100.0 and completed_at is not None
+
+    progress = progress_crud.update_progress(db, user_id=1, course_id=1, completed_lessons=4)
+
+    assert progress.completed_at == completed_at
+
+
+def test_mark_as_completed_recomputes_course_progress(db, upsert, course_lessons):
+    course_id, lesson_ids = course_lessons
+    course_progress = progress_crud.update_progress(db, user_id=1, course_id=course_id)
+
+    for lesson_id in lesson_ids[:3]:
+        lesson_progress_crud.mark_as_completed(
+            db, user_id=1, lesson_id=lesson_id, course_progress_id=course_progress.id
+        )
+    db.refresh(course_progress)
+    assert (course_progress.completed_lessons, course_progress.total_lessons) == (3, 4)
+    assert (course_progress.progress_percentage, course_progress.completed_at) == (75.0, None)
+
+    lesson_progress_crud.mark_as_completed(
+        db, user_id=1, lesson_id=lesson_ids[3], course_progress_id=course_progress.id
+    )
+    db.refresh(course_progress)
+    completed_at = course_progress.completed_at
+    assert course_progress.progress_percentage == 100.0 and completed_at is not None
+
+    # Повторное завершение урока не меняет ни урок, ни дату завершения курса
+    lesson = lesson_progress_crud.mark_as_completed(
+        db, user_id=1, lesson_id=lesson_ids[0], course_progress_id=course_progress.id
+    )
+    db.refresh(course_progress)
+    assert course_progress.completed_at == completed_at
+    assert lesson.is_completed
+    assert db.query(LessonProgress).count() == 4
+
+
+def test_update_position_keeps_completion(db, upsert):
+    lesson_progress_crud.mark_as_completed(db, user_id=1, lesson_id=1, course_progress_id=1)
+
+    progress = lesson_progress_crud.update_position(db, user_id=1, lesson_id=1, position=120, course_progress_id=1)
+
+    assert (progress.last_position, progress.is_completed) == (120, True)
+    assert db.query(LessonProgress).count() == 1
+
+
+def test_upsert_positions_fallback_matches_on_conflict(db, monkeypatch):
+    monkeypatch.setattr(activity, "UPSERT_INSERTS", {})
+    now = datetime.utcnow()
+    lesson_progress_crud.upsert_positions(db, positions=[
+        {"user_id": 1, "lesson_id": 1, "course_id": 1, "position": 50, "updated_at": now},
+    ])
+
+    lesson_progress_crud.upsert_positions(db, positions=[
+        {"user_id": 1, "lesson_id": 1, "course_id": 1, "position": 20, "updated_at": now - timedelta(seconds=5)},
+        {"user_id": 1, "lesson_id": 2, "course_id": 1, "position": 15, "updated_at": now},
+    ])
+
+    db.expire_all()
+    assert {row.lesson_id: row.last_position for row in db.query(LessonProgress)} == {1: 50, 2: 15}
+    assert db.query(CourseProgress).count() == 1
+
+
+def test_concurrent_position_updates_leave_one_row(db):
+    engine = create_engine(
+        settings.DATABASE_URL,
+        poolclass=QueuePool,
+        pool_size=8,
+        connect_args={"timeout": 30, "check_same_thread": False}
+    )
+    worker_sessions = sessionmaker(bind=engine)
+
+    def heartbeat(position: int) -> int:
+        with worker_sessions() as session:
+            progress = lesson_progress_crud.update_position(
+                session, user_id=1, lesson_id=1, position=position, course_progress_id=1
+            )
+            return progress.id
+
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            ids = list(executor.map(heartbeat, range(1, 9)))
+    finally:
+        engine.dispose()
+
+    assert len(set(ids)) == 1
+    assert db.query(LessonProgress).count() == 1
+    assert db.query(LessonProgress).one().last_position in range(1, 9)
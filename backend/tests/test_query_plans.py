@@ -0,0 +1,73 @@
+"""
+Регрессионные тесты планов запросов: горячие выборки идут по индексам
+(SQLite EXPLAIN QUERY PLAN на схеме моделей)
+"""
+
+import pytest
+from sqlalchemy import select, text
+
+from app.models.activity import CourseProgress, LessonProgress, Notification
+from app.models.assignment import AssignmentSubmission
+from app.models.payment import Payment, UserCourseAccess
+from app.models.test import TestAttempt
+
+
+def query_plan(db, query) -> str:
+    sql = query.compile(db.get_bind(), compile_kwargs={"literal_binds": True})
+    return "\n".join(row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+
+@pytest.mark.parametrize("query, index", [
+    (
+        select(CourseProgress).where(CourseProgress.user_id == 1, CourseProgress.course_id == 2),
+        "uq_course_progress_user_course",
+    ),
+    (
+        select(LessonProgress).where(LessonProgress.user_id == 1, LessonProgress.lesson_id == 2),
+        "uq_lesson_progress_user_lesson",
+    ),
+    (
+        select(UserCourseAccess).where(
+            UserCourseAccess.user_id == 1, UserCourseAccess.course_id == 2, UserCourseAccess.status == "ACTIVE"
+        ),
+        "ix_user_course_access_user_course_status",
+    ),
+    (
+        select(AssignmentSubmission).where(
+            AssignmentSubmission.student_id == 1, AssignmentSubmission.assignment_id == 2
+        ),
+        "ix_assignment_submissions_student_assignment",
+    ),
+    (
+        select(Payment).where(Payment.external_payment_id == "pay_1"),
+        "uq_payments_external_payment_id",
+    ),
+    (
+        select(TestAttempt).where(TestAttempt.student_id == 1, TestAttempt.test_id == 2)
+        .order_by(TestAttempt.created_at.desc()),
+        "ix_test_attempts_student_test_created",
+    ),
+])
+def test_lookup_uses_index(db, query, index):
+    plan = query_plan(db, query)
+
+    assert f"USING INDEX {index}" in plan or f"USING COVERING INDEX {index}" in plan, plan
+    assert "TEMP B-TREE" not in plan, plan
+
+
+@pytest.mark.parametrize("model, column, index", [
+    (Notification, "user_id", "ix_notifications_user_created"),
+    (Payment, "user_id", "ix_payments_user_created"),
+    (Payment, "course_id", "ix_payments_course_created"),
+    (TestAttempt, "student_id", "ix_test_attempts_student_created"),
+    (AssignmentSubmission, "student_id", "ix_assignment_submissions_student_created"),
+])
+def test_created_at_listing_is_served_by_index(db, model, column, index):
+    query = (
+        select(model).where(getattr(model, column) == 1)
+        .where(model.created_at < "2024-01-01").order_by(model.created_at.desc(), model.id.desc()).limit(20)
+    )
+    plan = query_plan(db, query)
+
+    assert index in plan, plan
+    assert "TEMP B-TREE" not in plan, plan
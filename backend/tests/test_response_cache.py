@@ -0,0 +1,50 @@
+"""
+Тесты кэша ответов API
+"""
+
+from typing import List
+
+from app.core import response_cache
+from app.core.config import settings
+from app.core.response_cache import InMemoryCacheBackend, RedisCacheBackend, create_response_cache
+
+
+def test_single_worker_uses_memory_cache(monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_BACKEND", None)
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 1)
+
+    cache = create_response_cache()
+
+    assert isinstance(cache.backend, InMemoryCacheBackend)
+    assert cache.ttl == settings.CACHE_TTL
+
+
+def test_multiple_workers_default_to_redis(monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_BACKEND", None)
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 4)
+
+    cache = create_response_cache()
+
+    assert isinstance(cache.backend, RedisCacheBackend)
+    connection_kwargs = cache.backend.redis.connection_pool.connection_kwargs
+    assert connection_kwargs["socket_timeout"] == settings.REDIS_SOCKET_TIMEOUT
+    assert connection_kwargs["socket_connect_timeout"] == settings.REDIS_SOCKET_CONNECT_TIMEOUT
+
+
+def test_memory_cache_with_multiple_workers_uses_short_ttl(monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_BACKEND", "memory")
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 4)
+
+    cache = create_response_cache()
+
+    assert isinstance(cache.backend, InMemoryCacheBackend)
+    assert cache.ttl == settings.CACHE_MEMORY_TTL
+
+
+def test_unreachable_redis_falls_back_to_producer(monkeypatch):
+    monkeypatch.setattr(settings, "REDIS_SOCKET_CONNECT_TIMEOUT", 0.1)
+    cache = response_cache.ResponseCache(RedisCacheBackend("redis://127.0.0.1:1/0"))
+
+    response = cache.get_or_set("courses", "list", {"page": 1}, lambda: [1, 2], List[int])
+
+    assert response.body == b"[1,2]"
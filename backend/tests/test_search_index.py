@@ -0,0 +1,155 @@
+"""
+Тесты поискового индекса каталога
+"""
+
+import os
+import threading
+
+import pytest
+
+from app.core import search_index
+from app.core.search_index import CourseSearchIndex
+from app.crud.course import course_crud
+from app.models.course import Course, CourseStatus, Lesson, Module
+from app.models.user import UserRole
+
+
+def make_document(course_id: int, title: str, description: str = "") -> dict:
+    return {
+        "id": course_id,
+        "payload": {"id": course_id, "title": title, "slug": f"course-{course_id}"},
+        "fields": {"title": title, "description": description},
+    }
+
+
+def test_remove_course_prunes_index_structures():
+    index = CourseSearchIndex()
+    index.add_course(make_document(1, "Программирование на Python", "Основы синтаксиса"))
+
+    index.remove_course(1)
+
+    assert dict(index._postings) == {}
+    assert dict(index._delete_variants) == {}
+    assert index._tokens == []
+    assert index._token_stems == {}
+    assert index.search("python") == []
+
+
+def test_remove_course_keeps_shared_terms():
+    index = CourseSearchIndex()
+    index.add_course(make_document(1, "Python для анализа данных"))
+    index.add_course(make_document(2, "Python для веба"))
+
+    index.remove_course(1)
+
+    assert [result["id"] for result in index.search("python")] == [2]
+    assert index.search("анализ") == []
+    assert "анализа" not in index._token_stems
+    assert "python" in index._token_stems
+    assert all(postings for postings in index._postings.values())
+
+
+def test_replacing_course_drops_old_terms():
+    index = CourseSearchIndex()
+    index.add_course(make_document(1, "Django"))
+
+    index.add_course(make_document(1, "FastAPI"))
+
+    assert index.search("django") == []
+    assert index.search("djnago") == []
+    assert [result["id"] for result in index.search("fastapi")] == [1]
+    assert [result["id"] for result in index.search("fastap")] == [1]
+    assert index._tokens == ["fastapi"]
+
+
+def test_typo_search_after_prune_and_readd():
+    index = CourseSearchIndex()
+    index.add_course(make_document(1, "Алгоритмы"))
+    index.remove_course(1)
+    index.add_course(make_document(2, "Алгоритмы"))
+
+    assert [result["id"] for result in index.search("алгоритмв")] == [2]
+
+
+def test_concurrent_snapshots_do_not_share_temp_file(tmp_path):
+    index = CourseSearchIndex()
+    index.build([make_document(course_id, f"Курс {course_id}") for course_id in range(1, 51)])
+    path = str(tmp_path / "search" / "index.json")
+
+    threads = [threading.Thread(target=index.save_snapshot, args=(path,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert os.listdir(tmp_path / "search") == ["index.json"]
+    restored = CourseSearchIndex()
+    assert restored.load_snapshot(path)
+    assert [result["id"] for result in restored.search("курс 7")][:1] == [7]
+
+
+def add_course(db, curator, slug: str, lessons: int = 1) -> Course:
+    course = Course(title=f"Курс {slug}", slug=slug, status=CourseStatus.PUBLISHED, curator_id=curator.id)
+    db.add(course)
+    db.flush()
+    module = Module(title="Модуль", course_id=course.id)
+    db.add(module)
+    db.flush()
+    db.add_all(Lesson(title=f"Урок {index}", order_index=index, module_id=module.id) for index in range(lessons))
+    db.commit()
+    return course
+
+
+@pytest.fixture
+def catalog_index(db, make_user, monkeypatch):
+    index = CourseSearchIndex()
+    monkeypatch.setattr(search_index, "course_search_index", index)
+    curator = make_user(role=UserRole.CURATOR)
+    courses = [add_course(db, curator, "python"), add_course(db, curator, "sql", lessons=2)]
+    search_index.rebuild_index(db)
+    return index, curator, courses
+
+
+def test_reindex_course_keeps_fingerprint_current(db, catalog_index):
+    index, curator, (python, sql) = catalog_index
+
+    python.title = "Python для анализа данных"
+    db.commit()
+    search_index.reindex_course(db, python.id)
+    assert index.fingerprint == course_crud.get_search_fingerprint(db)
+
+    module = python.modules[0]
+    db.add(Lesson(title="Pandas", order_index=5, module_id=module.id))
+    db.commit()
+    search_index.reindex_course(db, python.id)
+    assert index.fingerprint == course_crud.get_search_fingerprint(db)
+
+    rust = add_course(db, curator, "rust", lessons=3)
+    search_index.reindex_course(db, rust.id)
+    assert index.fingerprint == course_crud.get_search_fingerprint(db)
+
+    sql.status = CourseStatus.ARCHIVED
+    db.commit()
+    search_index.reindex_course(db, sql.id)
+    assert index.fingerprint == course_crud.get_search_fingerprint(db)
+    assert [result["id"] for result in index.search("анализ")] == [python.id]
+
+
+def test_reindex_course_leaves_other_changes_to_refresh(db, catalog_index):
+    index, curator, (python, sql) = catalog_index
+    stored = index.fingerprint
+
+    # Курс sql изменен другим воркером, его индекс об этом не знает
+    sql.title = "SQL для аналитиков"
+    python.title = "Python для анализа данных"
+    db.commit()
+    search_index.reindex_course(db, python.id)
+    assert index.fingerprint == stored
+
+    # Удаленный другим воркером урок тоже не скрывается
+    search_index.rebuild_index(db)
+    stored = index.fingerprint
+    db.delete(sql.modules[0].lessons[0])
+    db.commit()
+    search_index.reindex_course(db, python.id)
+    assert index.fingerprint == stored != course_crud.get_search_fingerprint(db)
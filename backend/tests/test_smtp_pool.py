@@ -0,0 +1,124 @@
+"""
+Тесты пула SMTP соединений на локальном SMTP сервере (aiosmtpd)
+"""
+
+from email.message import EmailMessage
+
+import aiosmtplib
+import pytest
+
+from app.core.smtp_pool import SMTPConnectionPool
+from tests.conftest import wait_for
+
+
+def make_pool(smtp_server, **kwargs) -> SMTPConnectionPool:
+    options = {"hostname": smtp_server.hostname, "port": smtp_server.port, "username": None,
+               "start_tls": False, "size": 2, "keepalive": 60, "max_messages": 100, "timeout": 5}
+    options.update(kwargs)
+    return SMTPConnectionPool(**options)
+
+
+def make_message(index: int = 0) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = "noreply@example.com"
+    message["To"] = f"student{index}@example.com"
+    message["Subject"] = f"Уведомление {index}"
+    message.set_content(f"hello {index}")
+    return message
+
+
+async def test_connection_is_reused(smtp_server):
+    handler = smtp_server.handler
+    pool = make_pool(smtp_server)
+    for index in range(3):
+        await pool.send_message(make_message(index))
+
+    assert pool.stats == {"connects": 1, "reconnects": 0, "sent": 3}
+    assert len(handler.connections) == 1
+    assert handler.noops == 0
+    assert [envelope.rcpt_tos for envelope in handler.messages] == [
+        [f"student{index}@example.com"] for index in range(3)
+    ]
+    assert b"hello 2" in handler.messages[2].content
+    await pool.close()
+
+
+async def test_idle_connection_is_checked_with_noop(smtp_server):
+    handler = smtp_server.handler
+    pool = make_pool(smtp_server, keepalive=0)
+    await pool.send_message(make_message(1))
+    await pool.send_message(make_message(2))
+
+    assert pool.stats["connects"] == 1
+    assert handler.noops == 1
+    assert len(handler.connections) == 1
+    assert len(handler.messages) == 2
+    await pool.close()
+
+
+async def test_connection_closed_by_server_is_replaced(smtp_server):
+    handler = smtp_server.handler
+    pool = make_pool(smtp_server, keepalive=0)
+    await pool.send_message(make_message(1))
+
+    handler.disconnect_all(smtp_server)
+    connection = pool._idle._queue[0]
+    await wait_for(lambda: not connection.client.is_connected)
+    await pool.send_message(make_message(2))
+
+    assert pool.stats == {"connects": 2, "reconnects": 1, "sent": 2}
+    assert len(handler.connections) == 2
+    assert [handler.delivered[server] for server in handler.connections] == [1, 1]
+    await pool.close()
+
+
+async def test_connection_rotates_after_max_messages(smtp_server):
+    handler = smtp_server.handler
+    pool = make_pool(smtp_server, max_messages=2)
+    for index in range(5):
+        await pool.send_message(make_message(index))
+
+    assert pool.stats["connects"] == 3
+    assert [handler.delivered[server] for server in handler.connections] == [2, 2, 1]
+    assert handler.quits == 2
+    await pool.close()
+
+
+async def test_disconnect_is_retried_once(smtp_server):
+    handler = smtp_server.handler
+    pool = make_pool(smtp_server)
+    await pool.send_message(make_message(1))
+    handler.disconnects = 1
+    await pool.send_message(make_message(2))
+
+    assert pool.stats == {"connects": 2, "reconnects": 1, "sent": 2}
+    assert [envelope.rcpt_tos for envelope in handler.messages] == [
+        ["student1@example.com"], ["student2@example.com"]
+    ]
+    assert len(handler.connections) == 2
+    await pool.close()
+
+
+async def test_second_disconnect_is_raised(smtp_server):
+    handler = smtp_server.handler
+    pool = make_pool(smtp_server)
+    handler.disconnects = 2
+    with pytest.raises(aiosmtplib.SMTPServerDisconnected):
+        await pool.send_message(make_message())
+
+    assert pool.stats["sent"] == 0
+    assert pool.stats["connects"] == 2
+    assert handler.messages == []
+    await pool.close()
+
+
+async def test_close_quits_idle_connections(smtp_server):
+    handler = smtp_server.handler
+    pool = make_pool(smtp_server, size=2)
+    async with pool.connection() as first, pool.connection() as second:
+        await first.client.send_message(make_message(1))
+        await second.client.send_message(make_message(2))
+    await pool.close()
+
+    assert len(handler.connections) == 2
+    assert handler.quits == 2
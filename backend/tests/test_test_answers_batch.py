@@ -0,0 +1,141 @@
+"""
+Тесты пакетной отправки ответов попытки (POST /tests/attempts/{id}/answers:batch)
+"""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import deps
+from app.api.v1.endpoints import tests as tests_endpoints
+from app.crud.test import test_attempt_crud
+from app.models.test import TestAnswer
+
+
+@pytest.fixture
+def student(make_user):
+    return make_user()
+
+
+@pytest.fixture
+def client(db, student):
+    app = FastAPI()
+    app.include_router(tests_endpoints.router, prefix="/tests")
+    app.dependency_overrides[deps.get_db] = lambda: db
+    app.dependency_overrides[deps.get_current_student_user] = lambda: student
+    return TestClient(app)
+
+
+@pytest.fixture
+def attempt(db, quiz, student):
+    return test_attempt_crud.admit_attempt(db, test=quiz.test, student_id=student.id)
+
+
+def submit(client, attempt, answers, complete=False):
+    return client.post(
+        f"/tests/attempts/{attempt.id}/answers:batch",
+        json={"answers": answers, "complete": complete}
+    )
+
+
+def saved_answers(db, attempt):
+    db.expire_all()
+    return sorted(
+        (answer.question_id, answer.selected_answer_id, answer.answer_text)
+        for answer in db.query(TestAnswer).filter(TestAnswer.test_attempt_id == attempt.id)
+    )
+
+
+def test_invalid_batches_are_rejected_without_saving(client, db, quiz, attempt):
+    questions, options = quiz.questions, quiz.options
+    invalid_batches = [
+        ([{"question_id": 999999, "selected_answer_id": options["single"][0]}], "не относится к этому тесту"),
+        ([{"question_id": questions["single"], "selected_answer_id": options["multiple"][0]}], "не относится к вопросу"),
+        ([
+            {"question_id": questions["single"], "selected_answer_id": options["single"][0]},
+            {"question_id": questions["single"], "selected_answer_id": options["single"][1]},
+        ], "только один вариант"),
+        ([
+            {"question_id": questions["multiple"], "selected_answer_id": options["multiple"][0]},
+            {"question_id": questions["multiple"], "selected_answer_id": options["multiple"][0]},
+        ], "выбран повторно"),
+        ([{"question_id": questions["text"]}], "нужен текстовый ответ"),
+    ]
+    for answers, message in invalid_batches:
+        response = submit(client, attempt, answers)
+
+        assert response.status_code == 400
+        assert message in response.json()["detail"]
+    assert submit(client, attempt, []).status_code == 422
+    assert saved_answers(db, attempt) == []
+
+
+def test_batch_replaces_answers_only_for_its_questions(client, db, quiz, attempt):
+    questions, options = quiz.questions, quiz.options
+    first = submit(client, attempt, [
+        {"question_id": questions["single"], "selected_answer_id": options["single"][1]},
+        {"question_id": questions["multiple"], "selected_answer_id": options["multiple"][2]},
+        {"question_id": questions["text"], "answer_text": "Черновик"},
+    ])
+    second = submit(client, attempt, [
+        {"question_id": questions["multiple"], "selected_answer_id": options["multiple"][0]},
+        {"question_id": questions["multiple"], "selected_answer_id": options["multiple"][1]},
+        {"question_id": questions["text"], "answer_text": "Ответ"},
+    ])
+
+    assert first.status_code == 200 and first.json()["saved"] == 3
+    assert second.status_code == 200 and second.json()["saved"] == 3
+    assert second.json()["attempt"]["completed_at"] is None
+    assert saved_answers(db, attempt) == sorted([
+        (questions["single"], options["single"][1], None),
+        (questions["multiple"], options["multiple"][0], None),
+        (questions["multiple"], options["multiple"][1], None),
+        (questions["text"], None, "Ответ"),
+    ])
+
+
+def test_complete_grades_and_completes_the_attempt(client, db, quiz, attempt):
+    questions, options = quiz.questions, quiz.options
+    response = submit(client, attempt, [
+        {"question_id": questions["single"], "selected_answer_id": options["single"][0]},
+        {"question_id": questions["multiple"], "selected_answer_id": options["multiple"][0]},
+        {"question_id": questions["multiple"], "selected_answer_id": options["multiple"][1]},
+        {"question_id": questions["true_false"], "selected_answer_id": options["true_false"][1]},
+        {"question_id": questions["text"], "answer_text": "Развернутый ответ"},
+    ], complete=True)
+
+    assert response.status_code == 200
+    result = response.json()["attempt"]
+    assert result["completed_at"] is not None
+    assert (result["score"], result["is_passed"]) == (83.33, True)
+    db.expire_all()
+    grades = {
+        (answer.question_id, answer.selected_answer_id): (answer.is_correct, answer.points_earned)
+        for answer in db.query(TestAnswer).filter(TestAnswer.test_attempt_id == attempt.id)
+    }
+    assert grades == {
+        (questions["single"], options["single"][0]): (True, 2.0),
+        (questions["multiple"], options["multiple"][0]): (True, 3.0),
+        (questions["multiple"], options["multiple"][1]): (True, 0.0),
+        (questions["true_false"], options["true_false"][1]): (False, 0.0),
+        (questions["text"], None): (None, 0.0),
+    }
+
+    again = submit(client, attempt, [{"question_id": questions["single"], "selected_answer_id": options["single"][1]}])
+    assert again.status_code == 400
+
+
+def test_complete_saves_nothing_if_grading_fails(client, db, quiz, attempt, monkeypatch):
+    def failing_grade_attempt(*args, **kwargs):
+        raise RuntimeError("grading failed")
+
+    monkeypatch.setattr(test_attempt_crud, "grade_attempt", failing_grade_attempt)
+    answers = [{"question_id": quiz.questions["single"], "selected_answer_id": quiz.options["single"][0]}]
+
+    with pytest.raises(RuntimeError):
+        submit(client, attempt, answers, complete=True)
+
+    db.rollback()
+    assert saved_answers(db, attempt) == []
+    db.refresh(attempt)
+    assert attempt.completed_at is None
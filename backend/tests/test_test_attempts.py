@@ -0,0 +1,117 @@
+"""
+Тесты попыток прохождения тестов
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from app.api import deps
+from app.api.v1.endpoints import tests as tests_endpoints
+from app.core.config import settings
+from app.crud.test import AttemptAdmissionConflict, test_attempt_crud, test_crud
+from app.models.test import TestAnswer, TestAttempt
+
+
+def add_answers(db, attempt_id, *answers) -> None:
+    db.add_all(
+        TestAnswer(test_attempt_id=attempt_id, question_id=question_id, selected_answer_id=selected_answer_id)
+        for question_id, selected_answer_id in answers
+    )
+    db.commit()
+
+
+def test_grade_and_complete_scores_on_server(db, make_user, quiz):
+    attempt = test_attempt_crud.admit_attempt(db, test=quiz.test, student_id=make_user().id)
+    add_answers(
+        db, attempt.id,
+        (quiz.questions["single"], quiz.options["single"][0]),
+        (quiz.questions["true_false"], quiz.options["true_false"][1]),
+    )
+
+    completed = test_attempt_crud.grade_and_complete(db, attempt_id=attempt.id, test=quiz.test)
+
+    assert completed.completed_at is not None
+    assert (completed.score, completed.is_passed) == (33.33, False)
+
+
+def test_completed_attempt_is_not_graded_again(db, make_user, quiz):
+    attempt = test_attempt_crud.admit_attempt(db, test=quiz.test, student_id=make_user().id)
+    first = test_attempt_crud.grade_and_complete(db, attempt_id=attempt.id, test=quiz.test)
+    completed_at = first.completed_at
+    add_answers(db, attempt.id, (quiz.questions["single"], quiz.options["single"][0]))
+
+    assert test_attempt_crud.grade_and_complete(db, attempt_id=attempt.id, test=quiz.test) is None
+    assert test_attempt_crud.complete_attempt(db, attempt_id=attempt.id, score=100, is_passed=True) is None
+    db.refresh(attempt)
+    assert (attempt.score, attempt.completed_at) == (0.0, completed_at)
+
+
+@pytest.fixture
+def worker_sessions():
+    """Фабрика сессий с пулом соединений (как у воркера сервера), по соединению на поток"""
+    engine = create_engine(
+        settings.DATABASE_URL,
+        poolclass=QueuePool,
+        pool_size=8,
+        connect_args={"timeout": 30, "check_same_thread": False}
+    )
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def admit(worker_sessions, test_id: int, student_id: int):
+    """Старт попытки так же, как в эндпоинте: тест читается в сессии запроса"""
+    with worker_sessions() as session:
+        test = test_crud.get(session, id=test_id)
+        attempt = test_attempt_crud.admit_attempt(session, test=test, student_id=student_id)
+        return attempt.attempt_number if attempt is not None else None
+
+
+def test_concurrent_starts_of_one_student_respect_limit(db, quiz, worker_sessions):
+    test_id = quiz.test.id
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        numbers = list(executor.map(lambda _: admit(worker_sessions, test_id, 500), range(10)))
+
+    assert sorted(number for number in numbers if number is not None) == [1, 2, 3]
+    assert numbers.count(None) == 7
+
+
+@pytest.mark.benchmark
+def test_admission_load_2000_students(db, quiz, worker_sessions, record_property):
+    test_id, students = quiz.test.id, range(10000, 12000)
+
+    started = time.perf_counter()
+    # SQLite пишет последовательно, больше потоков дает только ожидание блокировки
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        numbers = list(executor.map(lambda student_id: admit(worker_sessions, test_id, student_id), students))
+    elapsed = time.perf_counter() - started
+
+    assert numbers == [1] * len(students)
+    assert db.query(func.count(TestAttempt.id)).filter(TestAttempt.test_id == test_id).scalar() == len(students)
+    record_property("students", len(students))
+    record_property("seconds", round(elapsed, 2))
+    record_property("admissions_per_second", round(len(students) / elapsed))
+
+
+def test_exhausted_admission_retries_return_409(db, quiz, make_user, monkeypatch):
+    student = make_user()
+    app = FastAPI()
+    app.include_router(tests_endpoints.router, prefix="/tests")
+    app.dependency_overrides[deps.get_db] = lambda: db
+    app.dependency_overrides[deps.get_current_student_user] = lambda: student
+
+    def conflict(*args, **kwargs):
+        raise AttemptAdmissionConflict("retries exhausted")
+
+    monkeypatch.setattr(test_attempt_crud, "admit_attempt", conflict)
+    response = TestClient(app).post(f"/tests/{quiz.test.id}/start")
+
+    assert response.status_code == 409
+    assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,75 @@
+"""
+Тесты проверки ответов на тесты
+"""
+
+from typing import NamedTuple, Optional
+
+from app.core.test_scoring import AnswerGrade, AnswerKey, QuestionKey, grade_answers
+from app.models.test import QuestionType
+
+ANSWER_KEY = AnswerKey(
+    questions={
+        1: QuestionKey(QuestionType.SINGLE_CHOICE, 2, frozenset({11, 12, 13}), frozenset({11})),
+        2: QuestionKey(QuestionType.MULTIPLE_CHOICE, 3, frozenset({21, 22, 23}), frozenset({21, 22})),
+        3: QuestionKey(QuestionType.TRUE_FALSE, 1, frozenset({31, 32}), frozenset({31})),
+        4: QuestionKey(QuestionType.TEXT, 5, frozenset(), frozenset()),
+    },
+    max_points=6,
+)
+
+
+class Submitted(NamedTuple):
+    question_id: int
+    selected_answer_id: Optional[int] = None
+
+
+def test_single_choice():
+    correct = grade_answers(ANSWER_KEY, [Submitted(1, 11)], passing_score=30)
+    wrong = grade_answers(ANSWER_KEY, [Submitted(1, 12)], passing_score=30)
+
+    assert correct.grades == [AnswerGrade(True, 2.0)]
+    assert (correct.points_earned, correct.score, correct.is_passed) == (2.0, 33.33, True)
+    assert wrong.grades == [AnswerGrade(False, 0.0)]
+    assert (wrong.points_earned, wrong.score, wrong.is_passed) == (0.0, 0.0, False)
+
+
+def test_true_false():
+    assert grade_answers(ANSWER_KEY, [Submitted(3, 31)], 0).grades == [AnswerGrade(True, 1.0)]
+    assert grade_answers(ANSWER_KEY, [Submitted(3, 32)], 0).grades == [AnswerGrade(False, 0.0)]
+
+
+def test_single_answer_question_with_two_selections_is_wrong():
+    result = grade_answers(ANSWER_KEY, [Submitted(1, 11), Submitted(1, 12)], 0)
+
+    assert result.points_earned == 0
+    assert result.grades == [AnswerGrade(False, 0.0), AnswerGrade(False, 0.0)]
+
+
+def test_multiple_choice_is_all_or_nothing():
+    exact = grade_answers(ANSWER_KEY, [Submitted(2, 22), Submitted(2, 21)], 0)
+    partial = grade_answers(ANSWER_KEY, [Submitted(2, 21)], 0)
+    extra = grade_answers(ANSWER_KEY, [Submitted(2, 21), Submitted(2, 22), Submitted(2, 23)], 0)
+
+    # баллы записываются в первый ответ вопроса
+    assert exact.grades == [AnswerGrade(True, 3.0), AnswerGrade(True, 0.0)]
+    assert exact.points_earned == 3
+    assert partial.points_earned == 0 and partial.grades == [AnswerGrade(False, 0.0)]
+    assert extra.points_earned == 0
+
+
+def test_text_answers_are_not_graded_and_not_in_maximum():
+    answers = [Submitted(4), Submitted(1, 11), Submitted(2, 21), Submitted(2, 22), Submitted(3, 31)]
+
+    result = grade_answers(ANSWER_KEY, answers, passing_score=100)
+
+    assert result.grades[0] is None
+    assert result.max_points == 6
+    assert (result.points_earned, result.score, result.is_passed) == (6.0, 100.0, True)
+
+
+def test_unanswered_and_unknown_questions():
+    result = grade_answers(ANSWER_KEY, [Submitted(99, 1)], passing_score=0)
+
+    assert result.grades == [None]
+    assert (result.points_earned, result.score) == (0.0, 0.0)
+    assert result.is_passed